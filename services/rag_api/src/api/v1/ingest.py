@@ -1,13 +1,17 @@
 """
-Ingestion endpoint for processing and ingesting documents.
+Ingestion endpoints.
+Ingestion runs as a background job: POST /ingest submits it and returns a job
+ID, GET /ingest/{job_id} reports its stage and progress, DELETE cancels it.
 """
 
+import asyncio
 import os
-from pathlib import Path
 from fastapi import APIRouter, HTTPException
 from pydantic import BaseModel
 from dotenv import load_dotenv
 
+from services.rag_api.src.ingestion.jobs import IngestionJob, ingestion_jobs
+
 load_dotenv()
 
 router = APIRouter()
@@ -19,81 +23,257 @@ class IngestResponse(BaseModel):
     nodes_created: int
     relationships_created: int
     chunks_embedded: int
+    extraction_cache_hits: int = 0
+    extraction_cache_misses: int = 0
+    files_skipped: int = 0
+    files_removed: int = 0
+    files_failed: int = 0
+
+
+class IngestJobStatus(BaseModel):
+    job_id: str
+    status: str  # queued | running | succeeded | failed | cancelled
+    stage: str
+    progress: dict[str, int] = {}
+    result: IngestResponse | None = None
+    error: str | None = None
+    created_at: float
+    started_at: float | None = None
+    finished_at: float | None = None
 
 
-@router.post("/ingest", response_model=IngestResponse)
-async def ingest_documents():
+async def run_ingestion(job: IngestionJob, force: bool = False) -> dict:
     """
-    Process all files in raw_data/ folder and ingest them into Qdrant and Neo4j.
+    Process new and modified files in raw_data/ folder and ingest them into Qdrant and Neo4j.
     
-    This endpoint:
-    1. Reads all files from raw_data/
-    2. Chunks and embeds the content
-    3. Extracts entities and relationships using LLM
-    4. Stores vectors in Qdrant
-    5. Stores graph in Neo4j
+    This job:
+    1. Reads all files from raw_data/ and diffs them against the ingestion manifest
+       (unless `force` is set), retracting chunks of modified or deleted files
+    2. Streams the changed files through the ingestion pipeline in bounded batches:
+       chunk -> embed and extract entities/relationships using LLM -> store
+       vectors in Qdrant and the graph in Neo4j
+    
+    `job.stage` and `job.progress` are updated as it goes. Blocking steps run in
+    threads so the API's event loop keeps serving requests.
     """
-    try:
-        from services.rag_api.src.ingestion.file_reader import FileReader
-        from services.rag_api.src.ingestion.chunker_embedder import ChunkerEmbedder
-        from services.rag_api.src.ingestion.orchestration import Orchestrator
-        from services.rag_api.src.storage.neo4j_client import Neo4jOrchestrator
-        from services.rag_api.src.storage.qdrant_client import QdrantOrchestrator
-        
-        # Get configuration
-        raw_data_folder = os.getenv("RAW_DATA_FOLDER", "./raw_data")
-        llm_model = os.getenv("LLM_MODEL")
-        llm_api_key = os.getenv("LLM_API_KEY")
-        qdrant_url = f"{os.getenv('QDRANT_URL')}:{os.getenv('QDRANT_HTTP_PORT', '6333')}"
-        neo4j_url = f"{os.getenv('NEO4J_URL')}:{os.getenv('NEO4J_BOLT_PORT')}"
-        neo4j_auth = tuple(os.getenv("NEO4J_AUTH").split("/"))
-        
-        # 1. Read files
-        file_reader = FileReader(raw_data_folder)
-        all_files = file_reader.read_files()
-        
-        total_files = sum(len(v) for v in all_files.values())
-        if total_files == 0:
-            raise HTTPException(status_code=400, detail="No files found in raw_data/ folder")
-        
-        # 2. Chunk and embed
-        chunker = ChunkerEmbedder(
-            all_files=all_files,
-            chunk_size=int(os.getenv("CHUNK_SIZE", 512)),
-            chunk_overlap=int(os.getenv("CHUNK_OVERLAP", 100))
+    from services.rag_api.src.ingestion.file_reader import FileReader
+    from services.rag_api.src.ingestion.chunker_embedder import ChunkerEmbedder
+    from services.rag_api.src.ingestion.orchestration import Orchestrator
+    from services.rag_api.src.ingestion.extraction_cache import ExtractionCache
+    from services.rag_api.src.ingestion.entity_resolution import ClusterStore, EntityResolver
+    from services.rag_api.src.ingestion.manifest import IngestionManifest
+    from services.rag_api.src.ingestion.pipeline import IngestionPipeline
+    from services.rag_api.src.storage.neo4j_client import Neo4jOrchestrator
+    from services.rag_api.src.storage.qdrant_client import QdrantOrchestrator
+    from services.rag_api.src.storage.clients import clients
+    from services.rag_api.src.core.entity_index import entity_index
+    from services.rag_api.src.core.answer_cache import answer_cache
+    
+    # Get configuration
+    raw_data_folder = os.getenv("RAW_DATA_FOLDER", "./raw_data")
+    llm_model = os.getenv("LLM_MODEL")
+    llm_api_key = os.getenv("LLM_API_KEY")
+    qdrant_url = f"{os.getenv('QDRANT_URL')}:{os.getenv('QDRANT_HTTP_PORT', '6333')}"
+    neo4j_url = f"{os.getenv('NEO4J_URL')}:{os.getenv('NEO4J_BOLT_PORT')}"
+    neo4j_auth = tuple(os.getenv("NEO4J_AUTH").split("/"))
+    
+    manifest_path = os.getenv(
+        "INGEST_MANIFEST_PATH", os.path.join(raw_data_folder, ".ingest_manifest.json")
+    )
+    
+    # 1. Read files and work out what changed since the last run
+    job.stage = "diffing"
+    file_reader = FileReader(raw_data_folder)
+    all_files = await asyncio.to_thread(file_reader.read_files)
+    
+    manifest = IngestionManifest(manifest_path)
+    diff = await asyncio.to_thread(manifest.diff, all_files, force=force)
+    changed_files = diff["changed"]
+    
+    total_files = sum(len(v) for v in changed_files.values())
+    if total_files == 0 and not diff["deleted"]:
+        if not diff["unchanged"]:
+            raise ValueError("No files found in raw_data/ folder")
+        manifest.save()
+        return IngestResponse(
+            success=True,
+            files_processed=0,
+            nodes_created=0,
+            relationships_created=0,
+            chunks_embedded=0,
+            files_skipped=len(diff["unchanged"]),
+        ).model_dump()
+    
+    qdrant_client = QdrantOrchestrator(qdrant_url=qdrant_url, client=clients.qdrant_client)
+    await asyncio.to_thread(qdrant_client.create_collection)
+    neo4j_client = Neo4jOrchestrator(
+        neo4j_url=neo4j_url, auth=neo4j_auth, driver=clients.neo4j_driver
+    )
+    
+    # Retract chunks previously produced by modified and deleted files
+    modified = [path for paths in changed_files.values() for path in paths if path in manifest.files]
+    stale_paths = modified + diff["deleted"]
+    stale_chunk_ids = manifest.stale_chunk_ids(stale_paths)
+    if stale_paths:
+        job.stage = "retracting"
+        await asyncio.to_thread(qdrant_client.delete_points, "QdrantRagCollection", stale_chunk_ids)
+        await asyncio.to_thread(
+            neo4j_client.delete_chunks,
+            stale_chunk_ids,
+            # Relationships are backed by paths relative to the raw data folder
+            # (as named by ChunkerEmbedder), not base names
+            source_files=[os.path.relpath(path, raw_data_folder) for path in stale_paths],
         )
-        
-        # Process all file types
-        chunked_data = []
-        chunked_data.extend(chunker.chunk_pdf())
-        chunked_data.extend(chunker.chunk_text())
-        chunked_data.extend(chunker.chunk_markdown())
-        
-        embedded_data = chunker.embed_chunks(chunked_data)
-        
-        # 3. Extract graph components
-        orchestrator = Orchestrator(llm_model=llm_model, llm_api_key=llm_api_key)
-        nodes, relationships, chunk_node_mapping = orchestrator.extract_graph_components(chunked_data)
-        
-        # 4. Ingest to Qdrant
-        qdrant_client = QdrantOrchestrator(qdrant_url=qdrant_url)
-        qdrant_client.create_collection()
-        qdrant_client.ingest_to_qdrant("QdrantRagCollection", embedded_data, chunk_node_mapping)
-        
-        # 5. Ingest to Neo4j
-        neo4j_client = Neo4jOrchestrator(neo4j_url=neo4j_url, auth=neo4j_auth)
-        neo4j_client.ingest_to_neo4j(nodes, relationships, chunk_node_mapping)
-        
+        # Orphaned entities may have been deleted with the chunks
+        entity_index.invalidate()
+        answer_cache.invalidate()
+        for path in diff["deleted"]:
+            manifest.remove(path)
+    
+    if total_files == 0:
+        manifest.save()
         return IngestResponse(
             success=True,
-            files_processed=total_files,
-            nodes_created=len(nodes),
-            relationships_created=len(relationships),
-            chunks_embedded=len(chunk_node_mapping)
+            files_processed=0,
+            nodes_created=0,
+            relationships_created=0,
+            chunks_embedded=0,
+            files_skipped=len(diff["unchanged"]),
+            files_removed=len(diff["deleted"]),
+        ).model_dump()
+    
+    # 2. Chunk lazily, file by file; nothing is read until the pipeline pulls it
+    chunker = ChunkerEmbedder(
+        all_files=changed_files,
+        chunk_size=int(os.getenv("CHUNK_SIZE", 512)),
+        chunk_overlap=int(os.getenv("CHUNK_OVERLAP", 100)),
+        conversion_workers=int(os.getenv("CONVERSION_WORKERS", 1)),
+        conversion_timeout=float(os.getenv("CONVERSION_TIMEOUT", 600)),
+        source_root=raw_data_folder,
+    )
+    
+    # 3. Graph extraction (cached by chunk text, prompt and model)
+    cache_path = os.getenv("EXTRACTION_CACHE_PATH", "./.cache/extraction_cache.sqlite3")
+    extraction_cache = (
+        ExtractionCache(
+            cache_path,
+            max_bytes=int(os.getenv("EXTRACTION_CACHE_MAX_MB", 512)) * 1024 * 1024,
         )
-        
-    except HTTPException:
-        raise
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=f"Ingestion failed: {str(e)}")
+        if cache_path
+        else None
+    )
+    # Entity clusters (embedding similarity) persist so entity IDs stay stable across runs
+    similarity_threshold = float(os.getenv("ENTITY_SIMILARITY_THRESHOLD", 0))
+    cluster_path = os.getenv("ENTITY_CLUSTERS_PATH", "./.cache/entity_clusters.sqlite3")
+    cluster_store = (
+        ClusterStore(cluster_path) if similarity_threshold > 0 and cluster_path else None
+    )
+    orchestrator = Orchestrator(
+        llm_model=llm_model,
+        llm_api_key=llm_api_key,
+        concurrency=int(os.getenv("EXTRACTION_CONCURRENCY", 4)),
+        requests_per_minute=int(os.getenv("EXTRACTION_RPM", 0)),
+        tokens_per_minute=int(os.getenv("EXTRACTION_TPM", 0)),
+        max_retries=int(os.getenv("EXTRACTION_MAX_RETRIES", 3)),
+        cache=extraction_cache,
+        resolver=EntityResolver.from_alias_file(
+            os.getenv("ENTITY_ALIASES_PATH"),
+            similarity_threshold=similarity_threshold,
+            embedding_model=os.getenv("EMBEDDING_MODEL"),
+            cluster_store=cluster_store,
+        ),
+    )
+    
+    # 4. Stream batches through embed/extract and into Qdrant and Neo4j;
+    # each file is recorded in the manifest once its batch is in both stores
+    pipeline = IngestionPipeline(
+        chunker=chunker,
+        orchestrator=orchestrator,
+        qdrant_client=qdrant_client,
+        neo4j_client=neo4j_client,
+        collection_name="QdrantRagCollection",
+        manifest=manifest,
+        file_stats=diff["stats"],
+        entity_index=entity_index,
+    )
+    job.stage = "streaming"
+    job.progress = pipeline.progress
+    await asyncio.to_thread(qdrant_client.begin_bulk_load)
+    try:
+        progress = await pipeline.run()
+    finally:
+        # Cached answers predate the batches written (even if the job failed)
+        answer_cache.invalidate()
+        if extraction_cache is not None:
+            extraction_cache.close()
+        if cluster_store is not None:
+            cluster_store.close()
+        # Shielded so a cancelled job still turns indexing back on
+        await asyncio.shield(asyncio.to_thread(qdrant_client.end_bulk_load))
+    
+    return IngestResponse(
+        success=True,
+        files_processed=total_files - progress["files_failed"],
+        nodes_created=progress["nodes_created"],
+        relationships_created=progress["relationships_created"],
+        chunks_embedded=progress["points_upserted"],
+        extraction_cache_hits=extraction_cache.hits if extraction_cache else 0,
+        extraction_cache_misses=extraction_cache.misses if extraction_cache else 0,
+        files_skipped=len(diff["unchanged"]),
+        files_removed=len(diff["deleted"]),
+        files_failed=progress["files_failed"],
+    ).model_dump()
+
+
+def _job_status(job: IngestionJob) -> IngestJobStatus:
+    return IngestJobStatus(**job.snapshot())
+
+
+@router.post("/ingest", response_model=IngestJobStatus, status_code=202)
+async def ingest_documents(force: bool = False):
+    """
+    Submit an ingestion job (see `run_ingestion`) and return its status.
+    If a job is already queued or running, that job is returned instead of
+    starting a second one.
+    """
+    job, _ = ingestion_jobs.submit(run_ingestion, force=force)
+    return _job_status(job)
+
+
+@router.get("/ingest/{job_id}", response_model=IngestJobStatus)
+async def get_ingestion_job(job_id: str):
+    """Report the status, current stage and progress counters of an ingestion job."""
+    job = ingestion_jobs.get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail=f"Ingestion job {job_id} not found")
+    return _job_status(job)
+
+
+@router.delete("/ingest/{job_id}", response_model=IngestJobStatus)
+async def cancel_ingestion_job(job_id: str):
+    """
+    Cancel an ingestion job. Batches already written stay ingested and recorded,
+    so the next run only processes the remaining files. A batch interrupted
+    mid-write is rewritten in place by the next run (chunk IDs are deterministic).
+    """
+    job = ingestion_jobs.cancel(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail=f"Ingestion job {job_id} not found")
+    # Let the task observe the cancellation before reporting
+    if job.task is not None and not job.task.done():
+        await asyncio.wait({job.task}, timeout=1)
+    return _job_status(job)
+
+
+@router.post("/caches/invalidate")
+async def invalidate_caches():
+    """
+    Drop the answer cache and mark the entity name index stale, for when the
+    stores were changed outside an ingestion job (e.g. wiped from the admin panel).
+    """
+    from services.rag_api.src.core.entity_index import entity_index
+    from services.rag_api.src.core.answer_cache import answer_cache
 
+    answer_cache.invalidate()
+    entity_index.invalidate()
+    return {"success": True, "invalidated": ["answer_cache", "entity_index"]}
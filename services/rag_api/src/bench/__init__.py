@@ -0,0 +1,4 @@
+"""
+Offline benchmarks of the ingestion and retrieval pipelines, run against local
+stand-ins for the LLM and embedding provider, Qdrant and Neo4j (see runner).
+"""
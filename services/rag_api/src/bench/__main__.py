@@ -0,0 +1,3 @@
+from services.rag_api.src.bench.runner import main
+
+main()
@@ -0,0 +1,110 @@
+"""
+Deterministic synthetic corpora for the benchmark.
+Entities are pseudo-words built from syllables; each paragraph mixes
+"Entity verb Entity" facts (which the fake LLM extracts as relationships)
+with filler sentences. Entity popularity is skewed, so a few hub entities
+appear in many files, as in real corpora. The same seed always produces the
+same files and questions.
+"""
+
+import os
+import random
+
+_SYLLABLES = [
+    "ka", "lo", "mi", "ren", "tor", "va", "xi", "zu", "bel", "cor", "dan", "el",
+    "fin", "gar", "hal", "ix", "jor", "kel", "lun", "mor", "nex", "or", "pel", "quin",
+]
+_VERBS = [
+    "acquired", "supplies", "funds", "audits", "partners", "licenses", "hosts",
+    "employs", "advises", "owns", "regulates", "distributes",
+]
+_FILLER = [
+    "The quarterly report notes steady growth across the region.",
+    "Analysts expect the market to remain stable through the next year.",
+    "Several agreements were signed after months of negotiation.",
+    "The board reviewed the operating costs and the hiring plan.",
+    "Demand rose sharply after the new regulations came into force.",
+    "Most of the proceeds were reinvested in research and logistics.",
+]
+
+
+class SyntheticCorpus:
+    """
+    This class is responsible for generating benchmark documents and questions.
+    """
+
+    def __init__(
+        self,
+        files: int = 20,
+        paragraphs: int = 8,
+        sentences: int = 6,
+        entities: int = 200,
+        seed: int = 0,
+    ):
+        """
+        Args:
+            files: Number of documents.
+            paragraphs: Paragraphs per document.
+            sentences: Sentences per paragraph (about half of them facts).
+            entities: Distinct entity names.
+            seed: Random seed.
+        """
+        self.files = files
+        self.paragraphs = paragraphs
+        self.sentences = sentences
+        self.random = random.Random(seed)
+        self.entities = self._entity_names(max(2, entities))
+        # Zipf-like popularity: entity i is picked with weight 1 / (i + 1)
+        self.weights = [1 / (i + 1) for i in range(len(self.entities))]
+
+    def _entity_names(self, count: int) -> list[str]:
+        names: dict[str, None] = {}
+        while len(names) < count:
+            word = "".join(self.random.choices(_SYLLABLES, k=self.random.randint(2, 3)))
+            names[word.capitalize()] = None
+        return list(names)
+
+    def _entity(self) -> str:
+        return self.random.choices(self.entities, weights=self.weights)[0]
+
+    def _fact(self) -> str:
+        source, target = self._entity(), self._entity()
+        while target == source:
+            target = self._entity()
+        return f"{source} {self.random.choice(_VERBS)} {target} since {self.random.randint(1990, 2024)}."
+
+    def document(self) -> str:
+        paragraphs = []
+        for _ in range(self.paragraphs):
+            sentences = [
+                self._fact() if self.random.random() < 0.5 else self.random.choice(_FILLER)
+                for _ in range(self.sentences)
+            ]
+            paragraphs.append(" ".join(sentences))
+        return "\n\n".join(paragraphs) + "\n"
+
+    def write(self, folder: str) -> list[str]:
+        """Write the documents as .txt files; returns their paths."""
+        os.makedirs(folder, exist_ok=True)
+        paths = []
+        for i in range(self.files):
+            path = os.path.join(folder, f"doc_{i:05d}.txt")
+            with open(path, "w", encoding="utf-8") as f:
+                f.write(self.document())
+            paths.append(os.path.abspath(path))
+        return paths
+
+    def questions(self, count: int) -> list[str]:
+        """Questions naming one or two entities, in the style of real chat queries."""
+        templates = [
+            "Who {verb} {a}?",
+            "What is the relationship between {a} and {b}?",
+            "Since when does {a} work with {b}?",
+            "Which companies does {a} depend on?",
+        ]
+        return [
+            self.random.choice(templates).format(
+                a=self._entity(), b=self._entity(), verb=self.random.choice(_VERBS)
+            )
+            for _ in range(count)
+        ]
@@ -0,0 +1,282 @@
+"""
+In-memory stand-in for the Neo4j drivers.
+There is no embedded Neo4j, so the benchmark replaces the sync driver (used
+by Neo4jOrchestrator) and the async driver (used by retrieval) with a small
+property graph that recognizes the repo's own Cypher statements and answers
+them with the same records: the UNWIND batch writes, the entity name scan,
+the graph expansion and the rerank mention counts. Every round trip waits a
+fixed, configurable latency. Any other statement raises, so a new query
+shows up as a benchmark failure rather than as silently empty results.
+"""
+
+import asyncio
+import re
+import threading
+import time
+
+_REL_TYPE = re.compile(r"\[r:`([^`]+)`")
+_HOP_DEPTH = re.compile(r"\*1\.\.(\d+)")
+_SCHEMA = ("CREATE CONSTRAINT", "CREATE INDEX")
+
+
+class FakeGraph:
+    """
+    This class is responsible for storing the graph and answering the queries
+    of the ingestion and retrieval code.
+    """
+
+    def __init__(self, latency: float = 0.0):
+        """
+        Args:
+            latency: Seconds each query (round trip) takes.
+        """
+        self.latency = latency
+        self.entities: dict[str, str] = {}  # id -> name
+        self.chunks: dict[str, dict] = {}
+        self.mentions: dict[str, set[str]] = {}  # chunk id -> entity ids
+        self.mentioned_by: dict[str, set[str]] = {}  # entity id -> chunk ids
+        # (source id, type, original type, target id) -> source files
+        self.relationships: dict[tuple, list] = {}
+        self.neighbours: dict[str, set[tuple]] = {}  # entity id -> relationship keys
+        self.queries = 0
+        self._lock = threading.Lock()
+
+    def degree(self, entity_id: str) -> int:
+        return len(self.neighbours.get(entity_id, ())) + len(self.mentioned_by.get(entity_id, ()))
+
+    # --- Writes (Neo4jOrchestrator) ---
+
+    def write(self, query: str, rows: list[dict]):
+        with self._lock:
+            self.queries += 1
+            if "MERGE (n:Entity" in query:
+                for row in rows:
+                    self.entities.setdefault(row["id"], row["name"])
+            elif "MERGE (c:Chunk" in query:
+                for row in rows:
+                    self.chunks[row["id"]] = row
+            elif "[:MENTIONS]" in query:
+                for row in rows:
+                    if row["chunk_id"] in self.chunks and row["entity_id"] in self.entities:
+                        self.mentions.setdefault(row["chunk_id"], set()).add(row["entity_id"])
+                        self.mentioned_by.setdefault(row["entity_id"], set()).add(row["chunk_id"])
+            elif (match := _REL_TYPE.search(query)) is not None:
+                for row in rows:
+                    if row["source_id"] not in self.entities or row["target_id"] not in self.entities:
+                        continue
+                    key = (row["source_id"], match.group(1), row["type"], row["target_id"])
+                    files = self.relationships.setdefault(key, [])
+                    files.extend(f for f in row["source_files"] if f not in files)
+                    self.neighbours.setdefault(key[0], set()).add(key)
+                    self.neighbours.setdefault(key[3], set()).add(key)
+            else:
+                raise NotImplementedError(f"FakeGraph cannot run: {query[:80]}")
+
+    # --- Reads (retrieval) ---
+
+    def entity_names(self) -> list[dict]:
+        with self._lock:
+            self.queries += 1
+            return [{"id": entity_id, "name": name} for entity_id, name in self.entities.items()]
+
+    def mention_counts(self, chunk_ids: list[str], entity_ids: list[str]) -> list[dict]:
+        with self._lock:
+            self.queries += 1
+            wanted = set(entity_ids)
+            return [
+                {"chunk_id": chunk_id, "mentions": len(self.mentions[chunk_id] & wanted)}
+                for chunk_id in chunk_ids
+                if self.mentions.get(chunk_id, set()) & wanted
+            ]
+
+    def _paths(self, start: str, hop_depth: int, max_degree: int):
+        """Simple entity-to-entity paths from `start`, as (end node, relationship keys)."""
+        stack = [(start, [], {start})]
+        while stack:
+            node, path, visited = stack.pop()
+            if len(path) == hop_depth:
+                continue
+            for key in self.neighbours.get(node, ()):
+                other = key[3] if key[0] == node else key[0]
+                if other in visited:
+                    continue
+                yield other, path + [key]
+                # Paths never pass through hubs
+                if self.degree(other) <= max_degree:
+                    stack.append((other, path + [key], visited | {other}))
+
+    def expand(self, query: str, params: dict) -> list[dict]:
+        """The GraphExpander query: seeds, bounded expansion, ranked relationships."""
+        with self._lock:
+            self.queries += 1
+            hop_depth = int(_HOP_DEPTH.search(query).group(1))
+
+            weights: dict[str, int] = {}
+            for chunk_id in params["chunk_ids"]:
+                for entity_id in self.mentions.get(chunk_id, ()):
+                    weights[entity_id] = weights.get(entity_id, 0) + 1
+            for entity_id in params["entity_ids"]:
+                if entity_id in self.entities:
+                    weights[entity_id] = weights.get(entity_id, 0) + params["query_entity_weight"]
+            seeds = dict(
+                sorted(weights.items(), key=lambda item: -item[1])[: params["max_seeds"]]
+            )
+
+            found: dict[tuple, None] = {}
+            for seed in seeds:
+                paths = list(self._paths(seed, hop_depth, params["max_degree"]))
+                if self.degree(seed) > params["max_degree"]:
+                    # Hub seeds only reach other seeds, by shortest paths
+                    shortest: dict[str, int] = {}
+                    for other, path in paths:
+                        if other in seeds:
+                            shortest[other] = min(shortest.get(other, len(path)), len(path))
+                    paths = [(other, path) for other, path in paths if shortest.get(other) == len(path)]
+                paths.sort(key=lambda p: (p[0] not in seeds, len(p[1]), self.degree(p[0])))
+                for _, path in paths[: params["fanout"]]:
+                    found.update(dict.fromkeys(path))
+
+            ranked = sorted(
+                (
+                    (seeds.get(key[0], 0) + (seeds.get(key[3], 0) if key[3] != key[0] else 0), key)
+                    for key in found
+                ),
+                key=lambda item: -item[0],
+            )
+            return [
+                {
+                    "entity": self.entities[key[0]],
+                    "rel": key[1],
+                    "related_node": self.entities[key[3]],
+                    "score": score,
+                }
+                for score, key in ranked[: params["limit"]]
+            ]
+
+    def read(self, query: str, params: dict) -> list[dict]:
+        if "CALL {" in query and "$max_seeds" in query:
+            return self.expand(query, params)
+        if "AS mentions" in query and "$chunk_ids" in query:
+            return self.mention_counts(params["chunk_ids"], params["entity_ids"])
+        if "RETURN e.id AS id, e.name AS name" in query:
+            return self.entity_names()
+        raise NotImplementedError(f"FakeGraph cannot run: {query[:80]}")
+
+    def stats(self) -> dict:
+        return {
+            "entities": len(self.entities),
+            "chunks": len(self.chunks),
+            "mentions": sum(len(ids) for ids in self.mentions.values()),
+            "relationships": len(self.relationships),
+            "queries": self.queries,
+        }
+
+
+# --- Sync driver (ingestion) ---
+
+
+class _Result:
+    def consume(self):
+        return None
+
+
+class _Transaction:
+    def __init__(self, graph: FakeGraph):
+        self.graph = graph
+
+    def run(self, query: str, rows: list[dict] | None = None, **params):
+        time.sleep(self.graph.latency)
+        self.graph.write(query, rows or [])
+        return _Result()
+
+
+class _Session:
+    def __init__(self, graph: FakeGraph):
+        self.graph = graph
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+    def run(self, query: str, **params):
+        if not query.startswith(_SCHEMA):
+            raise NotImplementedError(f"FakeGraph cannot run: {query[:80]}")
+        time.sleep(self.graph.latency)
+        return _Result()
+
+    def execute_write(self, work, *args, **kwargs):
+        return work(_Transaction(self.graph), *args, **kwargs)
+
+
+class FakeNeo4jDriver:
+    """
+    This class is responsible for the sync driver interface Neo4jOrchestrator uses.
+    """
+
+    def __init__(self, graph: FakeGraph):
+        self.graph = graph
+
+    def session(self, **kwargs):
+        return _Session(self.graph)
+
+    def verify_connectivity(self):
+        return None
+
+    def close(self):
+        return None
+
+
+# --- Async driver (retrieval) ---
+
+
+class _AsyncResult:
+    def __init__(self, records: list[dict]):
+        self._records = iter(records)
+
+    def __aiter__(self):
+        return self
+
+    async def __anext__(self):
+        try:
+            return next(self._records)
+        except StopIteration:
+            raise StopAsyncIteration from None
+
+
+class _AsyncSession:
+    def __init__(self, graph: FakeGraph):
+        self.graph = graph
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc):
+        return False
+
+    async def run(self, query: str, **params):
+        await asyncio.sleep(self.graph.latency)
+        return _AsyncResult(self.graph.read(query, params))
+
+
+class FakeAsyncNeo4jDriver:
+    """
+    This class is responsible for the async driver interface retrieval uses.
+    """
+
+    def __init__(self, graph: FakeGraph):
+        self.graph = graph
+
+    def session(self, **kwargs):
+        return _AsyncSession(self.graph)
+
+    async def execute_query(self, query: str, routing_=None, **params):
+        await asyncio.sleep(self.graph.latency)
+        return self.graph.read(query, params), None, None
+
+    async def verify_connectivity(self):
+        return None
+
+    async def close(self):
+        return None
@@ -0,0 +1,166 @@
+"""
+Deterministic stand-in for the LLM and embedding providers.
+A small OpenAI-compatible HTTP server (POST /v1/embeddings and
+/v1/chat/completions) runs in a background thread, so the benchmark goes
+through the real litellm client code. Every request waits a fixed,
+configurable latency. Embeddings are hashed bag-of-words vectors, so similar
+texts get similar vectors and retrieval results are meaningful. Completions
+answer the graph extraction prompt with "Entity verb Entity" triples found
+in the chunk text (the synthetic corpus is written that way).
+"""
+
+import base64
+import json
+import re
+import threading
+import time
+import zlib
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import numpy as np
+
+_WORD = re.compile(r"\w+")
+# "Kelmora acquired Tyvex": two capitalized names around a lowercase verb
+_TRIPLE = re.compile(r"\b([A-Z][a-z]{2,})\s+([a-z]+)\s+([A-Z][a-z]{2,})\b")
+
+
+def hashed_embedding(text: str, dimension: int) -> list[float]:
+    """Unit vector of signed word-hash counts (deterministic across runs)."""
+    vector = np.zeros(dimension, dtype=np.float32)
+    for word in _WORD.findall(text.casefold()):
+        code = zlib.crc32(word.encode("utf-8"))
+        vector[code % dimension] += 1.0 if code & 0x80000000 else -1.0
+    norm = np.linalg.norm(vector)
+    if norm:
+        vector /= norm
+    else:
+        vector[0] = 1.0
+    return vector.tolist()
+
+
+def extract_graph(text: str) -> dict:
+    """GraphComponents-shaped JSON for the triples in `text`."""
+    return {
+        "graph": [
+            {"node": source, "relationship": verb.upper(), "target_node": target}
+            for source, verb, target in _TRIPLE.findall(text)
+        ]
+    }
+
+
+class FakeProviderServer:
+    """
+    This class is responsible for serving fake embedding and chat completion
+    responses over HTTP.
+    """
+
+    def __init__(
+        self,
+        dimension: int = 256,
+        embedding_latency: float = 0.0,
+        llm_latency: float = 0.0,
+        host: str = "127.0.0.1",
+        port: int = 0,
+    ):
+        """
+        Args:
+            dimension: Embedding dimension.
+            embedding_latency: Seconds each embedding request takes.
+            llm_latency: Seconds each chat completion request takes.
+            host: Interface to bind.
+            port: Port to bind (0 = any free port).
+        """
+        self.dimension = dimension
+        self.embedding_latency = embedding_latency
+        self.llm_latency = llm_latency
+        self.requests = {"embeddings": 0, "chat_completions": 0}
+        self._lock = threading.Lock()
+        self._server = ThreadingHTTPServer((host, port), self._handler())
+        self._server.daemon_threads = True
+        self._thread: threading.Thread | None = None
+
+    @property
+    def base_url(self) -> str:
+        host, port = self._server.server_address[:2]
+        return f"http://{host}:{port}/v1"
+
+    def _count(self, kind: str):
+        with self._lock:
+            self.requests[kind] += 1
+
+    def embeddings(self, body: dict) -> dict:
+        time.sleep(self.embedding_latency)
+        self._count("embeddings")
+        inputs = body.get("input", [])
+        if isinstance(inputs, str):
+            inputs = [inputs]
+        vectors = [hashed_embedding(text, self.dimension) for text in inputs]
+        if body.get("encoding_format") == "base64":
+            vectors = [
+                base64.b64encode(np.asarray(vector, dtype=np.float32).tobytes()).decode("ascii")
+                for vector in vectors
+            ]
+        return {
+            "object": "list",
+            "model": body.get("model"),
+            "data": [
+                {"object": "embedding", "index": i, "embedding": vector}
+                for i, vector in enumerate(vectors)
+            ],
+            "usage": {"prompt_tokens": 0, "total_tokens": 0},
+        }
+
+    def chat_completions(self, body: dict) -> dict:
+        time.sleep(self.llm_latency)
+        self._count("chat_completions")
+        text = body["messages"][-1].get("content") or ""
+        if isinstance(text, list):
+            text = " ".join(part.get("text", "") for part in text)
+        return {
+            "id": "chatcmpl-bench",
+            "object": "chat.completion",
+            "created": int(time.time()),
+            "model": body.get("model"),
+            "choices": [
+                {
+                    "index": 0,
+                    "message": {"role": "assistant", "content": json.dumps(extract_graph(text))},
+                    "finish_reason": "stop",
+                }
+            ],
+            "usage": {"prompt_tokens": len(text) // 4, "completion_tokens": 0, "total_tokens": len(text) // 4},
+        }
+
+    def _handler(self):
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_POST(self):
+                body = json.loads(self.rfile.read(int(self.headers.get("Content-Length", 0))) or b"{}")
+                if self.path.endswith("/embeddings"):
+                    payload = server.embeddings(body)
+                elif self.path.endswith("/chat/completions"):
+                    payload = server.chat_completions(body)
+                else:
+                    self.send_error(404)
+                    return
+                data = json.dumps(payload).encode("utf-8")
+                self.send_response(200)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(data)))
+                self.end_headers()
+                self.wfile.write(data)
+
+            def log_message(self, *args):
+                pass
+
+        return Handler
+
+    def start(self) -> "FakeProviderServer":
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._server.shutdown()
+        self._server.server_close()
@@ -0,0 +1,465 @@
+"""
+Offline benchmark of ingestion and retrieval.
+A synthetic corpus is ingested through the real ChunkerEmbedder, Orchestrator,
+QdrantOrchestrator (Qdrant local in-memory mode), Neo4jOrchestrator (on the
+in-memory graph stand-in) and IngestionPipeline, with the LLM and embedding
+provider replaced by a local fake server. Generated questions are then run
+through the retrieval tool's pipeline (`retrieve_context`) on the same data.
+The JSON report gives, per stage, the calls, items, throughput and
+p50/p95/p99 latency; per phase, the resident memory it started with, peaked
+at and added (sampled while it runs); and the process's overall peak RSS:
+
+    python -m services.rag_api.src.bench --files 50 --queries 200 --output bench.json
+"""
+
+import argparse
+import asyncio
+import contextlib
+import functools
+import inspect
+import json
+import os
+import platform
+import resource
+import sys
+import tempfile
+import threading
+import time
+import tracemalloc
+import warnings
+
+import numpy as np
+
+from services.rag_api.src.bench.corpus import SyntheticCorpus
+from services.rag_api.src.bench.fake_neo4j import (
+    FakeAsyncNeo4jDriver,
+    FakeGraph,
+    FakeNeo4jDriver,
+)
+from services.rag_api.src.bench.fake_servers import FakeProviderServer
+
+# Expected in local mode, where search is exact and payload indexes are ignored
+warnings.filterwarnings("ignore", message="Payload indexes have no effect in the local Qdrant")
+warnings.filterwarnings("ignore", message="Local mode performs exact")
+
+COLLECTION_NAME = "QdrantRagCollection"
+
+
+class StageTimer:
+    """
+    This class is responsible for timing calls and counting the items they process.
+    """
+
+    def __init__(self):
+        self.samples: dict[str, list[float]] = {}
+        self.items: dict[str, int] = {}
+
+    def record(self, stage: str, seconds: float, items: int = 1):
+        self.samples.setdefault(stage, []).append(seconds)
+        self.items[stage] = self.items.get(stage, 0) + items
+
+    def wrap(self, stage: str, fn, count=None):
+        """
+        Time every call of `fn` (sync or async) under `stage`.
+
+        Args:
+            count: Function (result, *args) -> items processed by the call (default 1).
+        """
+        if inspect.iscoroutinefunction(fn):
+
+            @functools.wraps(fn)
+            async def timed_async(*args, **kwargs):
+                started = time.perf_counter()
+                result = await fn(*args, **kwargs)
+                elapsed = time.perf_counter() - started
+                self.record(stage, elapsed, count(result, *args) if count else 1)
+                return result
+
+            return timed_async
+
+        @functools.wraps(fn)
+        def timed(*args, **kwargs):
+            started = time.perf_counter()
+            result = fn(*args, **kwargs)
+            elapsed = time.perf_counter() - started
+            self.record(stage, elapsed, count(result, *args) if count else 1)
+            return result
+
+        return timed
+
+    def report(self) -> dict:
+        stages = {}
+        for stage, samples in self.samples.items():
+            milliseconds = np.array(samples) * 1000
+            busy = float(np.sum(samples))
+            stages[stage] = {
+                "calls": len(samples),
+                "items": self.items[stage],
+                "total_s": round(busy, 4),
+                # Items per second spent in the stage (overlapping calls included)
+                "items_per_s": round(self.items[stage] / busy, 2) if busy else None,
+                "p50_ms": round(float(np.percentile(milliseconds, 50)), 3),
+                "p95_ms": round(float(np.percentile(milliseconds, 95)), 3),
+                "p99_ms": round(float(np.percentile(milliseconds, 99)), 3),
+                "max_ms": round(float(np.max(milliseconds)), 3),
+            }
+        return stages
+
+
+class LocalAsyncQdrant:
+    """
+    This class is responsible for exposing the local-mode Qdrant client that
+    ingestion wrote to through the async client interface retrieval uses.
+    Local mode runs in-process either way (AsyncQdrantClient(":memory:") does
+    not yield while searching either), so calls simply run inline.
+    """
+
+    def __init__(self, client):
+        self._client = client
+
+    def __getattr__(self, name):
+        attr = getattr(self._client, name)
+        if not callable(attr):
+            return attr
+
+        async def call(*args, **kwargs):
+            return attr(*args, **kwargs)
+
+        return call
+
+
+def peak_rss_mb() -> float:
+    """Peak resident set size of the whole process so far (not of one phase)."""
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Bytes on macOS, kilobytes elsewhere
+    return round(peak / (1024 * 1024 if sys.platform == "darwin" else 1024), 1)
+
+
+def current_rss_mb() -> float | None:
+    """Resident set size right now (from /proc, so None outside Linux)."""
+    try:
+        with open("/proc/self/statm", "rb") as f:
+            pages = int(f.read().split()[1])
+    except (OSError, ValueError, IndexError):
+        return None
+    return round(pages * os.sysconf("SC_PAGE_SIZE") / (1024 * 1024), 1)
+
+
+class RssSampler:
+    """
+    This class is responsible for sampling the process's current RSS in a
+    background thread and keeping the highest value seen, so a phase's peak is
+    its own rather than the process's high-water mark.
+    """
+
+    def __init__(self, interval: float = 0.01):
+        self.interval = interval
+        self.start_mb = current_rss_mb()
+        self.peak_mb = self.start_mb
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+
+    def _sample(self):
+        rss = current_rss_mb()
+        if rss is not None and (self.peak_mb is None or rss > self.peak_mb):
+            self.peak_mb = rss
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            self._sample()
+
+    def __enter__(self) -> "RssSampler":
+        if self.start_mb is not None:
+            self._thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        if self._thread.is_alive():
+            self._stop.set()
+            self._thread.join()
+        self._sample()
+        return False
+
+
+@contextlib.contextmanager
+def measure_phase(report: dict, trace_memory: bool):
+    """
+    Record the wall time, the sampled RSS at the start, peak and increase of a
+    phase (None where RSS cannot be sampled) and, optionally, its peak traced
+    Python allocations.
+    """
+    if trace_memory:
+        tracemalloc.reset_peak()
+    started = time.perf_counter()
+    with RssSampler() as rss:
+        yield
+    report["wall_s"] = round(time.perf_counter() - started, 4)
+    report["rss_start_mb"] = rss.start_mb
+    report["rss_peak_mb"] = rss.peak_mb
+    report["rss_increase_mb"] = (
+        round(rss.peak_mb - rss.start_mb, 1) if rss.start_mb is not None else None
+    )
+    if trace_memory:
+        report["traced_peak_mb"] = round(tracemalloc.get_traced_memory()[1] / (1024 * 1024), 1)
+
+
+def configure_environment(server: FakeProviderServer, args):
+    """
+    Point the provider settings at the fake server. Several modules read their
+    settings at import time, so this runs before any of them is imported.
+    """
+    os.environ.update(
+        {
+            "EMBEDDING_MODEL": "openai/bench-embedding",
+            "EMBEDDING_DIMENSION": str(args.dimension),
+            "LLM_MODEL": "openai/bench-llm",
+            "LLM_API_KEY": "bench",
+            "OPENAI_API_KEY": "bench",
+            "OPENAI_API_BASE": server.base_url,
+            "OPENAI_BASE_URL": server.base_url,
+            "LITELLM_TELEMETRY": "False",
+            # Offline: the bundled model cost map, not the one fetched at import
+            "LITELLM_LOCAL_MODEL_COST_MAP": "True",
+            # The index is filled by ingestion; no background reloads mid-run
+            "ENTITY_INDEX_REFRESH": "0",
+        }
+    )
+
+
+async def bench_ingestion(args, paths: list[str], graph: FakeGraph, qdrant, timer: StageTimer) -> dict:
+    from services.rag_api.src.core.entity_index import entity_index
+    from services.rag_api.src.ingestion.chunker_embedder import ChunkerEmbedder
+    from services.rag_api.src.ingestion.orchestration import Orchestrator
+    from services.rag_api.src.ingestion.pipeline import IngestionPipeline
+    from services.rag_api.src.storage.neo4j_client import Neo4jOrchestrator
+    from services.rag_api.src.storage.qdrant_client import QdrantOrchestrator
+
+    chunker = ChunkerEmbedder(
+        all_files={"pdf": [], "text": paths, "markdown": [], "image": []},
+        chunk_size=int(os.getenv("CHUNK_SIZE", 512)),
+        chunk_overlap=int(os.getenv("CHUNK_OVERLAP", 100)),
+        source_root=os.path.dirname(paths[0]) if paths else None,
+    )
+    orchestrator = Orchestrator(
+        llm_model=os.getenv("LLM_MODEL"),
+        llm_api_key=os.getenv("LLM_API_KEY"),
+        concurrency=int(os.getenv("EXTRACTION_CONCURRENCY", 4)),
+    )
+    # Local mode is not thread-safe, so batches are upserted one at a time
+    qdrant_orchestrator = QdrantOrchestrator(
+        qdrant_url=":memory:", collection_name=COLLECTION_NAME, client=qdrant, upsert_parallel=1
+    )
+    neo4j_orchestrator = Neo4jOrchestrator(
+        neo4j_url="bench", auth=("bench", "bench"), driver=FakeNeo4jDriver(graph)
+    )
+
+    # Items are chunks for every stage except the single extraction calls
+    chunker.chunk_file = timer.wrap(
+        "chunk", chunker.chunk_file, count=lambda result, *args: len(result["chunks"])
+    )
+    chunker.aembed_chunks = timer.wrap(
+        "embed",
+        chunker.aembed_chunks,
+        count=lambda result, *args: sum(len(entry["chunks"]) for entry in result),
+    )
+    orchestrator.aparse_chunk = timer.wrap("extract_call", orchestrator.aparse_chunk)
+    orchestrator.aextract_graph_components = timer.wrap(
+        "extract",
+        orchestrator.aextract_graph_components,
+        count=lambda result, *args: len(result[2]),
+    )
+    qdrant_orchestrator.ingest_to_qdrant = timer.wrap(
+        "qdrant_write",
+        qdrant_orchestrator.ingest_to_qdrant,
+        count=lambda result, collection_name, embedded_data, chunk_node_mapping: len(
+            chunk_node_mapping
+        ),
+    )
+    neo4j_orchestrator.ingest_to_neo4j = timer.wrap(
+        "neo4j_write",
+        neo4j_orchestrator.ingest_to_neo4j,
+        count=lambda result, nodes, relationships, chunk_node_mapping: len(chunk_node_mapping),
+    )
+
+    qdrant_orchestrator.create_collection()
+    pipeline = IngestionPipeline(
+        chunker=chunker,
+        orchestrator=orchestrator,
+        qdrant_client=qdrant_orchestrator,
+        neo4j_client=neo4j_orchestrator,
+        collection_name=COLLECTION_NAME,
+        entity_index=entity_index,
+    )
+    qdrant_orchestrator.begin_bulk_load()
+    try:
+        progress = await pipeline.run()
+    finally:
+        qdrant_orchestrator.end_bulk_load()
+    return progress
+
+
+async def bench_retrieval(args, questions: list[str], graph: FakeGraph, qdrant, timer: StageTimer) -> dict:
+    from services.rag_api.src.core import retrieval
+    from services.rag_api.src.core.entity_index import entity_index
+    from services.rag_api.src.storage.clients import clients
+
+    neo4j_driver = FakeAsyncNeo4jDriver(graph)
+    clients.use(async_neo4j_driver=neo4j_driver, async_qdrant_client=LocalAsyncQdrant(qdrant))
+
+    # Ingestion only adds to the index; the first lookup loads it from the
+    # graph, as in a freshly started API worker
+    started = time.perf_counter()
+    await entity_index.ensure_loaded(neo4j_driver)
+    timer.record("entity_index_load", time.perf_counter() - started, len(entity_index))
+
+    # Each pipeline step is looked up on the module at call time, so wrapping
+    # the module attributes times them inside `retrieve_context`
+    steps = {
+        "embed": ("get_embedding", None),
+        "vector_search": ("search_qdrant", lambda points, *args: len(points)),
+        "entity_lookup": ("find_query_entities", lambda entity_ids, *args: len(entity_ids)),
+        "rerank": ("rerank_results", lambda points, *args: len(points)),
+        "graph_expand": ("fetch_graph_context", lambda relationships, *args: len(relationships)),
+        "pack": ("pack_context", lambda packed, *args: len(packed.chunks)),
+    }
+    originals = {name: getattr(retrieval, name) for name, _ in steps.values()}
+    for stage, (name, count) in steps.items():
+        setattr(retrieval, name, timer.wrap(stage, originals[name], count=count))
+
+    errors = []
+    context_chars = []
+    semaphore = asyncio.Semaphore(max(1, args.concurrency))
+
+    async def ask(question: str):
+        async with semaphore:
+            started = time.perf_counter()
+            context = await retrieval.retrieve_context(question)
+            timer.record("retrieve", time.perf_counter() - started, 1)
+            if retrieval.is_tool_error(context):
+                errors.append(context)
+            else:
+                context_chars.append(len(context))
+
+    try:
+        await asyncio.gather(*(ask(question) for question in questions))
+    finally:
+        for name, original in originals.items():
+            setattr(retrieval, name, original)
+
+    return {
+        "errors": len(errors),
+        "first_error": errors[0] if errors else None,
+        "context_chars_p50": int(np.percentile(context_chars, 50)) if context_chars else 0,
+        "context_packing": retrieval.context_packer.stats(),
+        "query_embedding_cache": retrieval.query_embedding_cache.stats(),
+    }
+
+
+async def run(args) -> dict:
+    from qdrant_client import QdrantClient
+
+    graph = FakeGraph(latency=args.neo4j_latency_ms / 1000)
+    qdrant = QdrantClient(":memory:")
+    corpus = SyntheticCorpus(
+        files=args.files,
+        paragraphs=args.paragraphs,
+        sentences=args.sentences,
+        entities=args.entities,
+        seed=args.seed,
+    )
+
+    report = {
+        "config": {
+            **{key: value for key, value in vars(args).items() if key not in ("output", "verbose")},
+            "python": platform.python_version(),
+            "hybrid_search": os.getenv("HYBRID_SEARCH", "true"),
+            "qdrant_profile": os.getenv("QDRANT_PROFILE", "default"),
+        },
+        "ingestion": {},
+        "retrieval": {},
+    }
+
+    with tempfile.TemporaryDirectory(prefix="rag-bench-") as folder:
+        paths = corpus.write(args.corpus_dir or folder)
+        report["config"]["corpus_bytes"] = sum(os.path.getsize(path) for path in paths)
+
+        ingestion_timer = StageTimer()
+        with measure_phase(report["ingestion"], args.trace_memory):
+            progress = await bench_ingestion(args, paths, graph, qdrant, ingestion_timer)
+        wall = report["ingestion"]["wall_s"]
+        report["ingestion"].update(
+            {
+                "progress": progress,
+                "chunks_per_s": round(progress["points_upserted"] / wall, 2) if wall else None,
+                "graph": graph.stats(),
+                "stages": ingestion_timer.report(),
+            }
+        )
+
+    questions = corpus.questions(args.queries)
+    retrieval_timer = StageTimer()
+    with measure_phase(report["retrieval"], args.trace_memory):
+        summary = await bench_retrieval(args, questions, graph, qdrant, retrieval_timer)
+    wall = report["retrieval"]["wall_s"]
+    report["retrieval"].update(
+        {
+            "queries": len(questions),
+            "queries_per_s": round(len(questions) / wall, 2) if wall else None,
+            **summary,
+            "stages": retrieval_timer.report(),
+        }
+    )
+    qdrant.close()
+    report["process_peak_rss_mb"] = peak_rss_mb()
+    return report
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[1])
+    parser.add_argument("--files", type=int, default=20, help="Documents in the corpus")
+    parser.add_argument("--paragraphs", type=int, default=8, help="Paragraphs per document")
+    parser.add_argument("--sentences", type=int, default=6, help="Sentences per paragraph")
+    parser.add_argument("--entities", type=int, default=200, help="Distinct entity names")
+    parser.add_argument("--queries", type=int, default=100, help="Retrieval queries")
+    parser.add_argument("--concurrency", type=int, default=8, help="Retrieval queries in flight")
+    parser.add_argument("--embedding-latency-ms", type=float, default=10, help="Per embedding request")
+    parser.add_argument("--llm-latency-ms", type=float, default=50, help="Per chat completion request")
+    parser.add_argument("--neo4j-latency-ms", type=float, default=1, help="Per Neo4j round trip")
+    parser.add_argument("--dimension", type=int, default=256, help="Embedding dimension")
+    parser.add_argument("--seed", type=int, default=0, help="Corpus and question seed")
+    parser.add_argument("--corpus-dir", help="Write the corpus here (and keep it) instead of a temp dir")
+    parser.add_argument("--trace-memory", action="store_true", help="Also report peak Python allocations (slower)")
+    parser.add_argument("--verbose", action="store_true", help="Show the pipeline's own output")
+    parser.add_argument("--output", help="Write the JSON report to this file instead of stdout")
+    args = parser.parse_args()
+
+    server = FakeProviderServer(
+        dimension=args.dimension,
+        embedding_latency=args.embedding_latency_ms / 1000,
+        llm_latency=args.llm_latency_ms / 1000,
+    ).start()
+    configure_environment(server, args)
+    if args.trace_memory:
+        tracemalloc.start()
+
+    try:
+        with contextlib.ExitStack() as stack:
+            if not args.verbose:
+                # The pipeline prints progress and DEBUG lines; keep the report clean
+                devnull = stack.enter_context(open(os.devnull, "w"))
+                stack.enter_context(contextlib.redirect_stdout(devnull))
+            report = asyncio.run(run(args))
+        report["provider_requests"] = dict(server.requests)
+    finally:
+        server.stop()
+
+    output = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            f.write(output + "\n")
+    else:
+        print(output)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,136 @@
+"""
+Peak memory of handing ingestion embeddings to Qdrant.
+Compares the float32 matrix path (embeddings kept as one matrix per batch,
+converted to Python floats one upsert batch at a time by `ingest_to_qdrant`)
+with the path it replaced (embeddings kept as lists of Python floats and sent
+as one list of PointStructs). Qdrant is a client that drops every upsert, so
+only the ingestion side is measured. Each path runs in its own subprocess, so
+its peak RSS is not inflated by the other:
+
+    python -m services.rag_api.src.bench.upsert_memory --chunks 50000 --dimension 768
+"""
+
+import argparse
+import json
+import resource
+import subprocess
+import sys
+import uuid
+
+import numpy as np
+
+PATHS = ("lists", "matrix")
+
+
+class NullQdrant:
+    """
+    This class is responsible for accepting upserts without storing anything.
+    """
+
+    def upsert(self, **kwargs):
+        return None
+
+
+def rss_mb(usage: int) -> float:
+    # Bytes on macOS, kilobytes elsewhere
+    return round(usage / (1024 * 1024 if sys.platform == "darwin" else 1024), 1)
+
+
+def synthetic_files(chunks: int, dimension: int, as_lists: bool, chunks_per_file: int = 100) -> list[dict]:
+    """Embedded files as EmbeddingScheduler returns them (or as lists of floats)."""
+    rng = np.random.default_rng(0)
+    files = []
+    for start in range(0, chunks, chunks_per_file):
+        count = min(chunks_per_file, chunks - start)
+        embeddings = rng.random((count, dimension), dtype=np.float32)
+        files.append(
+            {
+                "source_file": f"doc_{start // chunks_per_file:05d}.txt",
+                "chunks": [f"chunk {start + i} " + "lorem ipsum " * 40 for i in range(count)],
+                "embeddings": embeddings.tolist() if as_lists else embeddings,
+            }
+        )
+    return files
+
+
+def measure(path: str, chunks: int, dimension: int) -> dict:
+    """Run one path in this process and report its memory."""
+    from qdrant_client import models
+
+    from services.rag_api.src.storage.qdrant_client import QdrantOrchestrator
+
+    chunk_ids = [str(uuid.UUID(int=i)) for i in range(chunks)]
+    baseline = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+
+    files = synthetic_files(chunks, dimension, as_lists=path == "lists")
+    if path == "lists":
+        points = []
+        for file_entry in files:
+            for i, (chunk, vector) in enumerate(zip(file_entry["chunks"], file_entry["embeddings"])):
+                chunk_id = chunk_ids[len(points)]
+                points.append(
+                    models.PointStruct(
+                        id=chunk_id,
+                        vector=vector,
+                        payload={
+                            "id": chunk_id,
+                            "text": chunk,
+                            "source_file": file_entry["source_file"],
+                            "chunk_index": i,
+                        },
+                    )
+                )
+        NullQdrant().upsert(collection_name="bench", points=points)
+    else:
+        orchestrator = QdrantOrchestrator(
+            qdrant_url="", client=NullQdrant(), upsert_parallel=1, sparse=False
+        )
+        orchestrator.ingest_to_qdrant("bench", files, dict.fromkeys(chunk_ids, {}))
+
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return {
+        "path": path,
+        "chunks": chunks,
+        "dimension": dimension,
+        "baseline_rss_mb": rss_mb(baseline),
+        "peak_rss_mb": rss_mb(peak),
+        "peak_increase_mb": rss_mb(peak - baseline),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[1])
+    parser.add_argument("--chunks", type=int, default=50000, help="Embedded chunks")
+    parser.add_argument("--dimension", type=int, default=768, help="Embedding dimension")
+    parser.add_argument("--path", choices=PATHS, help="Measure one path in this process")
+    parser.add_argument("--output", help="Write the JSON report to this file instead of stdout")
+    args = parser.parse_args()
+
+    if args.path:
+        print(json.dumps(measure(args.path, args.chunks, args.dimension)))
+        return
+
+    rows = []
+    for path in PATHS:
+        completed = subprocess.run(
+            [
+                sys.executable, "-m", "services.rag_api.src.bench.upsert_memory",
+                "--path", path, "--chunks", str(args.chunks), "--dimension", str(args.dimension),
+            ],
+            check=True,
+            capture_output=True,
+            text=True,
+        )
+        # The pipeline's own prints come first; the report is the last line
+        rows.append(json.loads(completed.stdout.strip().splitlines()[-1]))
+
+    output = json.dumps(rows, indent=2)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            f.write(output + "\n")
+    else:
+        print(output)
+
+
+if __name__ == "__main__":
+    main()
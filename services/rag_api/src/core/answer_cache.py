@@ -0,0 +1,173 @@
+"""
+Semantic cache for chat answers.
+Answers are stored with the unit-normalized embedding of the question; a new
+question is answered from the cache when its cosine similarity to a cached
+question reaches the threshold. The embeddings live in one preallocated
+float32 matrix, so a lookup is a single matrix-vector product. Entries are
+bounded by count and TTL, and every entry belongs to a corpus generation:
+ingestion bumps the generation, which drops all cached answers (and any
+answer still being computed against the old corpus).
+"""
+
+import os
+import time
+from collections import OrderedDict
+
+import numpy as np
+from dotenv import load_dotenv
+
+load_dotenv()
+
+
+class AnswerCache:
+    """
+    This class is responsible for reusing chat answers for semantically
+    identical questions.
+    """
+
+    def __init__(
+        self,
+        enabled: bool = True,
+        threshold: float = 0.97,
+        max_entries: int = 512,
+        ttl_seconds: float = 3600,
+    ):
+        """
+        Args:
+            enabled: Look up and store answers at all.
+            threshold: Minimum cosine similarity between two questions for one's
+                       answer to be reused for the other.
+            max_entries: Maximum cached answers (least recently used dropped first).
+            ttl_seconds: Age after which an answer is no longer served (0 = never).
+        """
+        self.enabled = enabled
+        self.threshold = threshold
+        self.max_entries = max(1, max_entries)
+        self.ttl_seconds = ttl_seconds
+        self.generation = 0
+
+        # key -> (row in the matrix, created_at, response)
+        self._entries: OrderedDict[str, tuple[int, float, dict]] = OrderedDict()
+        # Allocated once the first vector reveals the dimension
+        self._matrix: np.ndarray | None = None
+        # Rows of the matrix not holding a live entry score -inf
+        self._valid: np.ndarray = np.zeros(self.max_entries, dtype=bool)
+        self._row_keys: list[str | None] = [None] * self.max_entries
+        self._free_rows = list(range(self.max_entries - 1, -1, -1))
+
+        self.hits = 0
+        self.misses = 0
+
+    @classmethod
+    def from_env(cls) -> "AnswerCache":
+        return cls(
+            enabled=os.getenv("ANSWER_CACHE", "true").lower() == "true",
+            threshold=float(os.getenv("ANSWER_CACHE_THRESHOLD", 0.97)),
+            max_entries=int(os.getenv("ANSWER_CACHE_SIZE", 512)),
+            ttl_seconds=float(os.getenv("ANSWER_CACHE_TTL", 3600)),
+        )
+
+    @staticmethod
+    def make_key(text: str) -> str:
+        return " ".join(text.split()).casefold()
+
+    @staticmethod
+    def _normalize(vector) -> np.ndarray:
+        vector = np.asarray(vector, dtype=np.float32)
+        norm = np.linalg.norm(vector)
+        return vector / norm if norm else vector
+
+    def _expired(self, created_at: float) -> bool:
+        return bool(self.ttl_seconds) and time.time() - created_at > self.ttl_seconds
+
+    def _drop(self, key: str):
+        row, _, _ = self._entries.pop(key)
+        self._valid[row] = False
+        self._row_keys[row] = None
+        self._free_rows.append(row)
+
+    def lookup(self, text: str, vector) -> dict | None:
+        """
+        The cached response for the closest question at or above the threshold.
+
+        Args:
+            text: The question.
+            vector: Its embedding.
+        """
+        if not self.enabled or self._matrix is None or not self._entries:
+            return None
+
+        query = self._normalize(vector)
+        if query.shape[0] != self._matrix.shape[1]:
+            # The embedding model changed under us
+            self.clear()
+            return None
+
+        key = self.make_key(text)
+        if key not in self._entries:
+            scores = self._matrix @ query
+            scores[~self._valid] = -np.inf
+            row = int(np.argmax(scores))
+            if scores[row] < self.threshold:
+                self.misses += 1
+                return None
+            key = self._row_keys[row]
+
+        _, created_at, response = self._entries[key]
+        if self._expired(created_at):
+            self._drop(key)
+            self.misses += 1
+            return None
+        self._entries.move_to_end(key)
+        self.hits += 1
+        return dict(response)
+
+    def store(self, text: str, vector, response: dict, generation: int):
+        """
+        Cache `response` for `text`, unless the corpus changed since `generation`
+        (read before the answer was computed).
+        """
+        if not self.enabled or generation != self.generation:
+            return
+
+        vector = self._normalize(vector)
+        if self._matrix is None or self._matrix.shape[1] != vector.shape[0]:
+            self.clear()
+            self._matrix = np.zeros((self.max_entries, vector.shape[0]), dtype=np.float32)
+
+        key = self.make_key(text)
+        if key in self._entries:
+            self._drop(key)
+        while not self._free_rows:
+            self._drop(next(iter(self._entries)))
+
+        row = self._free_rows.pop()
+        self._matrix[row] = vector
+        self._valid[row] = True
+        self._row_keys[row] = key
+        self._entries[key] = (row, time.time(), dict(response))
+
+    def clear(self):
+        self._entries.clear()
+        self._valid[:] = False
+        self._row_keys = [None] * self.max_entries
+        self._free_rows = list(range(self.max_entries - 1, -1, -1))
+
+    def invalidate(self):
+        """The corpus changed: start a new generation and drop every answer."""
+        self.generation += 1
+        self.clear()
+
+    def stats(self) -> dict:
+        lookups = self.hits + self.misses
+        return {
+            "entries": len(self._entries),
+            "generation": self.generation,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+        }
+
+
+# Process-wide cache, shared by the chat endpoint and ingestion
+answer_cache = AnswerCache.from_env()
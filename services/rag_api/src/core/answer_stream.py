@@ -0,0 +1,100 @@
+"""
+Incremental extraction of the answer text from the agent's streamed output.
+The agent replies with a JSON object (see models.responses.AgentResponse), so
+the raw token stream looks like `{"answer": "The ...`. AnswerStreamer decodes
+the value of the "answer" field as its tokens arrive, escapes included, so
+the UI can show the answer as it is written; output that is not a JSON
+object is passed through as-is.
+"""
+
+import json
+import re
+
+_ANSWER_KEY = re.compile(r'"answer"\s*:\s*"')
+_SIMPLE_ESCAPES = {'"': '"', "\\": "\\", "/": "/", "b": "\b", "f": "\f", "n": "\n", "r": "\r", "t": "\t"}
+
+
+class AnswerStreamer:
+    """
+    This class is responsible for turning streamed output deltas into answer text.
+    """
+
+    def __init__(self):
+        self._buffer = ""
+        # None until the output format is known, then "json" or "text"
+        self._mode: str | None = None
+        # Position of the next undecoded answer character in the buffer
+        self._position: int | None = None
+        self.done = False
+
+    def _detect_mode(self) -> bool:
+        text = self._buffer.lstrip()
+        if "```".startswith(text):
+            return False
+        if text.startswith("```"):
+            # A fenced block: decide on the line after the fence
+            newline = text.find("\n")
+            if newline == -1:
+                return False
+            text = text[newline + 1 :].lstrip()
+        if not text:
+            return False
+        self._mode = "json" if text.startswith("{") else "text"
+        return True
+
+    def feed(self, delta: str) -> str:
+        """
+        Add an output delta.
+
+        Returns:
+            The answer text decoded from it (possibly empty).
+        """
+        if self.done:
+            return ""
+        self._buffer += delta
+        if self._mode is None and not self._detect_mode():
+            return ""
+        if self._mode == "text":
+            text, self._buffer = self._buffer, ""
+            return text
+
+        if self._position is None:
+            match = _ANSWER_KEY.search(self._buffer)
+            if match is None:
+                return ""
+            self._position = match.end()
+        return self._decode()
+
+    def _decode(self) -> str:
+        out = []
+        buffer, position = self._buffer, self._position
+        while position < len(buffer):
+            char = buffer[position]
+            if char == '"':
+                self.done = True
+                position += 1
+                break
+            if char != "\\":
+                out.append(char)
+                position += 1
+                continue
+            # An escape sequence, possibly split across deltas
+            if position + 1 >= len(buffer):
+                break
+            escape = buffer[position + 1]
+            if escape == "u":
+                if position + 6 > len(buffer):
+                    break
+                code = buffer[position : position + 6]
+                # Surrogate pairs arrive as two \u escapes
+                if 0xD800 <= int(code[2:], 16) <= 0xDBFF:
+                    if position + 12 > len(buffer):
+                        break
+                    code = buffer[position : position + 12]
+                out.append(json.loads(f'"{code}"'))
+                position += len(code)
+            else:
+                out.append(_SIMPLE_ESCAPES.get(escape, escape))
+                position += 2
+        self._position = position
+        return "".join(out)
@@ -0,0 +1,230 @@
+"""
+Token-budgeted assembly of the retrieval context.
+Retrieved chunks are grouped per source file and consecutive chunks are
+merged, with the text they share through the chunk overlap written once.
+Near-duplicate chunks (e.g. the same passage in two files) are dropped, the
+rest are ordered by score and packed, together with the graph relationships,
+into a token budget counted with the answering model's tokenizer. Each pack
+reports how many tokens it saved over the unpacked context.
+"""
+
+import os
+import re
+
+from dotenv import load_dotenv
+from litellm import token_counter
+
+from services.rag_api.src.models.schemas import PackedContext, RetrievedChunk
+
+load_dotenv()
+
+_WORD = re.compile(r"\w+")
+
+
+class ContextPacker:
+    """
+    This class is responsible for merging, deduplicating and budgeting the
+    retrieved context.
+    """
+
+    def __init__(
+        self,
+        token_budget: int = 3000,
+        graph_share: float = 0.25,
+        duplicate_threshold: float = 0.9,
+        min_overlap: int = 20,
+        model: str | None = None,
+    ):
+        """
+        Args:
+            token_budget: Maximum tokens of retrieved context (0 = unlimited).
+            graph_share: Share of the budget reserved for graph relationships when
+                         chunks alone would fill it.
+            duplicate_threshold: A chunk whose word trigrams are contained in an
+                                 already selected chunk's at this ratio is dropped.
+            min_overlap: Minimum shared characters for two consecutive chunks to be
+                         joined on their overlap (otherwise they are just appended).
+            model: Model whose tokenizer counts tokens (defaults to LLM_MODEL).
+        """
+        self.token_budget = token_budget
+        self.graph_share = min(max(graph_share, 0.0), 1.0)
+        self.duplicate_threshold = duplicate_threshold
+        self.min_overlap = max(1, min_overlap)
+        self.model = model or os.getenv("LLM_MODEL")
+
+        self.packs = 0
+        self.total_tokens = 0
+        self.total_tokens_saved = 0
+
+    @classmethod
+    def from_env(cls) -> "ContextPacker":
+        return cls(
+            token_budget=int(os.getenv("CONTEXT_TOKEN_BUDGET", 3000)),
+            graph_share=float(os.getenv("CONTEXT_GRAPH_SHARE", 0.25)),
+            duplicate_threshold=float(os.getenv("CONTEXT_DUPLICATE_THRESHOLD", 0.9)),
+        )
+
+    def count_tokens(self, text: str) -> int:
+        if not text:
+            return 0
+        try:
+            return token_counter(model=self.model, text=text)
+        except Exception:
+            # Unknown model: the same rough estimate as the ingestion budgets
+            return len(text) // 4 + 1
+
+    def _join(self, first: str, second: str) -> str:
+        """Concatenate two consecutive chunks, writing their shared overlap once."""
+        probe = second[: self.min_overlap]
+        if len(probe) == self.min_overlap:
+            # Earliest match first, i.e. the longest overlap
+            position = first.find(probe, max(0, len(first) - len(second)))
+            while position != -1:
+                if second.startswith(first[position:]):
+                    return first + second[len(first) - position :]
+                position = first.find(probe, position + 1)
+        return f"{first}\n{second}"
+
+    def merge_adjacent(self, chunks: list[RetrievedChunk]) -> tuple[list[RetrievedChunk], int]:
+        """
+        Merge runs of consecutive chunks (chunk_index i, i+1, ...) of the same file.
+        A merged chunk keeps the best score and an index range like "3-5".
+
+        Returns:
+            (chunks, number of chunks merged away)
+        """
+        by_file: dict[str, list[RetrievedChunk]] = {}
+        others = []
+        for chunk in chunks:
+            if isinstance(chunk.chunk_index, int):
+                by_file.setdefault(chunk.source_file, []).append(chunk)
+            else:
+                others.append(chunk)
+
+        merged = []
+        for file_chunks in by_file.values():
+            # Duplicate hits of the same chunk keep their best score
+            unique: dict[int, RetrievedChunk] = {}
+            for chunk in sorted(file_chunks, key=lambda c: -c.score):
+                unique.setdefault(chunk.chunk_index, chunk)
+            run: list[RetrievedChunk] = []
+            for chunk in sorted(unique.values(), key=lambda c: c.chunk_index):
+                if run and chunk.chunk_index != run[-1].chunk_index + 1:
+                    merged.append(self._merge_run(run))
+                    run = []
+                run.append(chunk)
+            if run:
+                merged.append(self._merge_run(run))
+
+        merged.extend(others)
+        return merged, len(chunks) - len(merged)
+
+    def _merge_run(self, run: list[RetrievedChunk]) -> RetrievedChunk:
+        if len(run) == 1:
+            return run[0]
+        text = run[0].text
+        for chunk in run[1:]:
+            text = self._join(text, chunk.text)
+        best = max(run, key=lambda c: c.score)
+        return best.model_copy(
+            update={
+                "text": text,
+                "chunk_index": f"{run[0].chunk_index}-{run[-1].chunk_index}",
+            }
+        )
+
+    @staticmethod
+    def _shingles(text: str) -> set[tuple[str, ...]]:
+        words = _WORD.findall(text.casefold())
+        if len(words) < 3:
+            return {tuple(words)}
+        return {tuple(words[i : i + 3]) for i in range(len(words) - 2)}
+
+    def drop_duplicates(self, chunks: list[RetrievedChunk]) -> tuple[list[RetrievedChunk], int]:
+        """
+        Drop chunks (highest score first) whose text is mostly contained in an
+        already kept chunk.
+
+        Returns:
+            (kept chunks in score order, number dropped)
+        """
+        kept: list[tuple[RetrievedChunk, set]] = []
+        for chunk in sorted(chunks, key=lambda c: -c.score):
+            shingles = self._shingles(chunk.text)
+            duplicate = any(
+                len(shingles & other) / max(1, min(len(shingles), len(other)))
+                >= self.duplicate_threshold
+                for _, other in kept
+            )
+            if not duplicate:
+                kept.append((chunk, shingles))
+        return [chunk for chunk, _ in kept], len(chunks) - len(kept)
+
+    def pack(
+        self, chunks: list[RetrievedChunk], relationships: list[str], format_context
+    ) -> PackedContext:
+        """
+        Merge, deduplicate and budget the context.
+
+        Args:
+            chunks: Retrieved chunks (any order).
+            relationships: Relationship strings, most relevant first.
+            format_context: Function (chunks, relationships) -> prompt text, used to
+                            measure the context before and after packing.
+        """
+        tokens_before = self.count_tokens(format_context(chunks, relationships))
+
+        merged, merged_count = self.merge_adjacent(chunks)
+        ordered, duplicate_count = self.drop_duplicates(merged)
+
+        selected_chunks = ordered
+        selected_relationships = relationships
+        if self.token_budget:
+            # The budget covers chunk and relationship text; headers and
+            # citations only show up in the reported token counts
+            chunk_costs = [self.count_tokens(chunk.text) for chunk in ordered]
+            relationship_costs = [self.count_tokens(rel) + 1 for rel in relationships]
+
+            graph_reserve = min(
+                sum(relationship_costs), int(self.token_budget * self.graph_share)
+            )
+            chunk_budget = self.token_budget - graph_reserve
+            selected_chunks, used = [], 0
+            for chunk, cost in zip(ordered, chunk_costs):
+                # Skipping a chunk that does not fit lets smaller ones still fit
+                if used + cost <= chunk_budget:
+                    selected_chunks.append(chunk)
+                    used += cost
+
+            selected_relationships = []
+            for relationship, cost in zip(relationships, relationship_costs):
+                if used + cost > self.token_budget:
+                    break
+                selected_relationships.append(relationship)
+                used += cost
+
+        tokens = self.count_tokens(format_context(selected_chunks, selected_relationships))
+        packed = PackedContext(
+            chunks=selected_chunks,
+            relationships=selected_relationships,
+            tokens=tokens,
+            tokens_before=tokens_before,
+            tokens_saved=max(0, tokens_before - tokens),
+            merged_chunks=merged_count,
+            duplicate_chunks=duplicate_count,
+            dropped_chunks=len(ordered) - len(selected_chunks),
+            dropped_relationships=len(relationships) - len(selected_relationships),
+        )
+
+        self.packs += 1
+        self.total_tokens += packed.tokens
+        self.total_tokens_saved += packed.tokens_saved
+        return packed
+
+    def stats(self) -> dict:
+        return {
+            "packs": self.packs,
+            "tokens": self.total_tokens,
+            "tokens_saved": self.total_tokens_saved,
+            "avg_tokens_saved": self.total_tokens_saved / self.packs if self.packs else 0.0,
+        }
@@ -0,0 +1,186 @@
+"""
+In-process LRU cache for query embeddings.
+Bounded by entry count and bytes, with a TTL, whitespace/case-normalized keys
+and an optional shared SQLite store so several API workers can reuse each
+other's embeddings.
+"""
+
+import asyncio
+import os
+import sqlite3
+import threading
+import time
+from array import array
+from collections import OrderedDict
+
+
+class EmbeddingCache:
+    """
+    This class is responsible for caching query embeddings in front of the
+    embedding provider.
+    """
+
+    def __init__(
+        self,
+        max_entries: int = 1024,
+        max_bytes: int = 64 * 1024 * 1024,
+        ttl_seconds: float = 3600,
+        disk_path: str | None = None,
+    ):
+        """
+        Args:
+            max_entries: Maximum number of cached queries held in memory.
+            max_bytes: Maximum size of cached vectors held in memory.
+            ttl_seconds: Age after which an entry is ignored (0 disables expiry).
+            disk_path: Optional SQLite file shared between processes.
+        """
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.ttl_seconds = ttl_seconds
+
+        # key -> (created_at, float32 vector)
+        self._entries: OrderedDict[str, tuple[float, array]] = OrderedDict()
+        self._bytes = 0
+        self._inflight: dict[str, asyncio.Future] = {}
+        self._lock = threading.Lock()
+        # The disk tier is read and written from worker threads, under its own
+        # lock so a slow SQLite call never holds up the in-memory tier
+        self._disk_lock = threading.Lock()
+
+        self.hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+
+        self._conn = None
+        if disk_path:
+            os.makedirs(os.path.dirname(os.path.abspath(disk_path)), exist_ok=True)
+            self._conn = sqlite3.connect(disk_path, check_same_thread=False)
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS query_embeddings ("
+                "key TEXT PRIMARY KEY, vector BLOB NOT NULL, created_at REAL NOT NULL)"
+            )
+            self._conn.commit()
+
+    @staticmethod
+    def make_key(text: str, model: str | None) -> str:
+        """Collapse whitespace and case so trivially different queries share an entry."""
+        return f"{model}\x00{' '.join(text.split()).casefold()}"
+
+    def _expired(self, created_at: float) -> bool:
+        return bool(self.ttl_seconds) and time.time() - created_at > self.ttl_seconds
+
+    def _get_memory(self, key: str) -> array | None:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            created_at, vector = entry
+            if self._expired(created_at):
+                self._drop(key)
+                return None
+            self._entries.move_to_end(key)
+            return vector
+
+    def _get_disk(self, key: str) -> tuple[float, array] | None:
+        if self._conn is None:
+            return None
+        with self._disk_lock:
+            row = self._conn.execute(
+                "SELECT vector, created_at FROM query_embeddings WHERE key = ?", (key,)
+            ).fetchone()
+        if row is None or self._expired(row[1]):
+            return None
+        vector = array("f")
+        vector.frombytes(row[0])
+        return row[1], vector
+
+    def _drop(self, key: str):
+        _, vector = self._entries.pop(key)
+        self._bytes -= len(key) + vector.itemsize * len(vector)
+
+    def _put_memory(self, key: str, vector: array, created_at: float):
+        with self._lock:
+            if key in self._entries:
+                self._drop(key)
+            self._entries[key] = (created_at, vector)
+            self._bytes += len(key) + vector.itemsize * len(vector)
+            while self._entries and (
+                len(self._entries) > self.max_entries or self._bytes > self.max_bytes
+            ):
+                self._drop(next(iter(self._entries)))
+
+    def _put_disk(self, key: str, vector: array, created_at: float):
+        if self._conn is None:
+            return
+        with self._disk_lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO query_embeddings (key, vector, created_at) "
+                "VALUES (?, ?, ?)",
+                (key, vector.tobytes(), created_at),
+            )
+            self._conn.commit()
+
+    async def get_or_compute(self, text: str, model: str | None, compute) -> list[float]:
+        """
+        Return the cached embedding of `text`, or await `compute(text)` and cache it.
+        Concurrent calls for the same key share a single provider request.
+
+        Args:
+            text: Query text.
+            model: Embedding model name (part of the key).
+            compute: Coroutine function returning the embedding as a list of floats.
+        """
+        key = self.make_key(text, model)
+
+        vector = self._get_memory(key)
+        if vector is not None:
+            self.hits += 1
+            return vector.tolist()
+
+        # SQLite calls run off the event loop
+        stored = await asyncio.to_thread(self._get_disk, key) if self._conn is not None else None
+        if stored is not None:
+            self.disk_hits += 1
+            self._put_memory(key, stored[1], stored[0])
+            return stored[1].tolist()
+
+        inflight = self._inflight.get(key)
+        if inflight is not None:
+            self.hits += 1
+            return list(await asyncio.shield(inflight))
+
+        self.misses += 1
+        future = asyncio.get_running_loop().create_future()
+        self._inflight[key] = future
+        try:
+            embedding = await compute(text)
+            future.set_result(embedding)
+        except asyncio.CancelledError:
+            future.cancel()
+            raise
+        except Exception as exc:
+            future.set_exception(exc)
+            # Nobody else may be waiting; mark the exception as retrieved
+            future.exception()
+            raise
+        finally:
+            self._inflight.pop(key, None)
+
+        created_at = time.time()
+        vector = array("f", embedding)
+        self._put_memory(key, vector, created_at)
+        if self._conn is not None:
+            await asyncio.to_thread(self._put_disk, key, vector, created_at)
+        return vector.tolist()
+
+    def stats(self) -> dict:
+        lookups = self.hits + self.disk_hits + self.misses
+        return {
+            "entries": len(self._entries),
+            "bytes": self._bytes,
+            "hits": self.hits,
+            "disk_hits": self.disk_hits,
+            "misses": self.misses,
+            "hit_rate": (self.hits + self.disk_hits) / lookups if lookups else 0.0,
+        }
@@ -0,0 +1,218 @@
+"""
+In-memory index of entity names for graph-first retrieval.
+Every `Entity.name` is normalized to its lowercase word tokens and kept in a
+hash map keyed by the joined tokens. A query is matched by looking up each of
+its token spans up to the longest indexed name (longest match first, spans not
+overlapping), so a lookup costs a few hundred dictionary probes however many
+names are indexed. The index is loaded from Neo4j at API startup (or on first
+use), extended with the entities of each ingested batch, and reloaded in the
+background after retractions or every `refresh_seconds`, so other API workers
+catch up too. A failed background reload is logged and the current index stays
+in use until the next attempt.
+"""
+
+import asyncio
+import contextvars
+import os
+import re
+import time
+
+from dotenv import load_dotenv
+from neo4j import READ_ACCESS
+
+from services.rag_api.src.core.instrumentation import instrumentation
+from services.rag_api.src.storage.sparse_encoder import STOPWORDS
+
+load_dotenv()
+
+_WORD = re.compile(r"\w+")
+# Wait before retrying a failed background reload, so an unreachable Neo4j is
+# not queried again on every request
+RELOAD_RETRY_SECONDS = 30
+
+
+class EntityNameIndex:
+    """
+    This class is responsible for finding the entities named in a query.
+    """
+
+    def __init__(
+        self,
+        enabled: bool = True,
+        max_name_tokens: int = 8,
+        min_name_length: int = 3,
+        max_matches: int = 20,
+        refresh_seconds: float = 300,
+    ):
+        """
+        Args:
+            enabled: Look up query entities at all.
+            max_name_tokens: Names with more words than this are not indexed.
+            min_name_length: Shorter single-word names (e.g. "it", "US") are not
+                             matched, since they mostly collide with ordinary words.
+            max_matches: Maximum entity IDs returned per query.
+            refresh_seconds: Reload the full index from Neo4j this often (0 = never).
+        """
+        self.enabled = enabled
+        self.max_name_tokens = max(1, max_name_tokens)
+        self.min_name_length = min_name_length
+        self.max_matches = max_matches
+        self.refresh_seconds = refresh_seconds
+
+        self._names: dict[str, list[str]] = {}
+        self._longest = 1
+        self._loaded_at: float | None = None
+        self._stale = False
+        self._retry_at = 0.0
+        self._lock = asyncio.Lock()
+        self._refresh_task: asyncio.Task | None = None
+
+    @classmethod
+    def from_env(cls) -> "EntityNameIndex":
+        return cls(
+            enabled=os.getenv("ENTITY_INDEX", "true").lower() == "true",
+            max_name_tokens=int(os.getenv("ENTITY_INDEX_MAX_NAME_TOKENS", 8)),
+            min_name_length=int(os.getenv("ENTITY_INDEX_MIN_NAME_LENGTH", 3)),
+            max_matches=int(os.getenv("ENTITY_INDEX_MAX_MATCHES", 20)),
+            refresh_seconds=float(os.getenv("ENTITY_INDEX_REFRESH", 300)),
+        )
+
+    def __len__(self) -> int:
+        return len(self._names)
+
+    @staticmethod
+    def tokenize(text: str) -> list[str]:
+        return _WORD.findall(text.casefold())
+
+    def _key(self, name: str) -> str | None:
+        tokens = self.tokenize(name)
+        if not tokens or len(tokens) > self.max_name_tokens:
+            return None
+        if len(tokens) == 1 and (
+            len(tokens[0]) < self.min_name_length or tokens[0] in STOPWORDS
+        ):
+            return None
+        return " ".join(tokens)
+
+    def _insert(self, names: dict[str, list[str]], name: str, entity_id: str) -> int:
+        """Add one name to `names`; returns its token count (0 if not indexed)."""
+        key = self._key(name or "")
+        if key is None:
+            return 0
+        entity_ids = names.setdefault(key, [])
+        if entity_id not in entity_ids:
+            entity_ids.append(entity_id)
+        return key.count(" ") + 1
+
+    def add(self, nodes: dict[str, str]):
+        """
+        Index newly written entities.
+
+        Args:
+            nodes: Dict of entity names to IDs, as written by Neo4jOrchestrator.
+        """
+        for name, entity_id in nodes.items():
+            self._longest = max(self._longest, self._insert(self._names, name, entity_id))
+
+    def invalidate(self):
+        """Reload from Neo4j on next use (e.g. after entities were deleted)."""
+        self._stale = True
+
+    def lookup(self, text: str) -> list[str]:
+        """
+        Entity IDs named in `text`, in order of appearance. At each position the
+        longest indexed name wins, and matches do not overlap.
+        """
+        tokens = self.tokenize(text)
+        entity_ids: dict[str, None] = {}
+        position = 0
+        while position < len(tokens) and len(entity_ids) < self.max_matches:
+            for end in range(min(len(tokens), position + self._longest), position, -1):
+                matched = self._names.get(" ".join(tokens[position:end]))
+                if matched:
+                    entity_ids.update(dict.fromkeys(matched))
+                    position = end
+                    break
+            else:
+                position += 1
+        return list(entity_ids)[: self.max_matches]
+
+    async def _load(self, neo4j_driver):
+        names: dict[str, list[str]] = {}
+        longest = 1
+        # Streamed, so a large graph is never held as a list of records
+        async with neo4j_driver.session(default_access_mode=READ_ACCESS) as session:
+            result = await session.run(
+                "MATCH (e:Entity) WHERE e.name IS NOT NULL RETURN e.id AS id, e.name AS name"
+            )
+            async for record in result:
+                longest = max(longest, self._insert(names, record["name"], record["id"]))
+
+        self._names, self._longest = names, longest
+        self._loaded_at = time.monotonic()
+        self._stale = False
+        instrumentation.log("info", "entity_index_loaded", names=len(names))
+
+    async def _reload(self, neo4j_driver):
+        """Background reload; on failure the current index stays in use."""
+        try:
+            async with self._lock:
+                await self._load(neo4j_driver)
+        except Exception as e:
+            self._retry_at = time.monotonic() + RELOAD_RETRY_SECONDS
+            instrumentation.error("entity_index_reload_failed", e, names=len(self._names))
+
+    async def warm(self, neo4j_driver):
+        """
+        Load the index ahead of the first query (at API startup), so no request
+        waits for the full load. A failure is logged, and the first query
+        tries again.
+        """
+        if not self.enabled:
+            return
+        try:
+            await self.ensure_loaded(neo4j_driver)
+        except Exception as e:
+            instrumentation.warning("entity_index_unavailable", error=str(e))
+
+    async def ensure_loaded(self, neo4j_driver):
+        """
+        Load the index on first use. Later reloads (stale or expired) run in the
+        background while lookups keep using the current index.
+        """
+        if self._loaded_at is None:
+            async with self._lock:
+                if self._loaded_at is None:
+                    await self._load(neo4j_driver)
+            return
+
+        expired = self.refresh_seconds and (
+            time.monotonic() - self._loaded_at > self.refresh_seconds
+        )
+        if (
+            (self._stale or expired)
+            and time.monotonic() >= self._retry_at
+            and (self._refresh_task is None or self._refresh_task.done())
+        ):
+            # Own context: the reload is not part of the trace of the request that started it
+            self._refresh_task = asyncio.create_task(
+                self._reload(neo4j_driver), context=contextvars.Context()
+            )
+
+    async def find(self, neo4j_driver, text: str) -> list[str]:
+        """
+        Entity IDs named in `text`; an empty list if the index is disabled or
+        cannot be loaded (retrieval then seeds the graph from chunks only).
+        """
+        if not self.enabled:
+            return []
+        try:
+            await self.ensure_loaded(neo4j_driver)
+        except Exception as e:
+            instrumentation.warning("entity_index_unavailable", error=str(e))
+            return []
+        return self.lookup(text)
+
+
+# Process-wide index, shared by retrieval and ingestion
+entity_index = EntityNameIndex.from_env()
@@ -0,0 +1,168 @@
+"""
+Graph expansion for retrieval.
+Starting from the entities MENTIONed by the retrieved chunks (and the entities
+named in the query itself), walk the entity
+graph in a single parameterized Cypher query with a bounded hop depth, a
+per-entity fan-out cap and degree-aware pruning of hub nodes, and rank the
+resulting relationships by how many retrieved chunks mention their endpoints.
+"""
+
+import os
+
+from dotenv import load_dotenv
+from neo4j import RoutingControl
+
+load_dotenv()
+
+
+class GraphExpander:
+    """
+    This class is responsible for building and running the graph expansion query.
+    """
+
+    def __init__(
+        self,
+        hop_depth: int = 1,
+        fanout: int = 10,
+        max_degree: int = 500,
+        max_seeds: int = 20,
+        limit: int = 50,
+        query_entity_weight: int = 2,
+    ):
+        """
+        Args:
+            hop_depth: Maximum number of entity-to-entity hops from a seed entity.
+            fanout: Maximum paths expanded per seed entity.
+            max_degree: Nodes with a higher degree are hubs: paths never pass through
+                        them, and hub seeds only connect to other seeds, by
+                        shortest paths.
+            max_seeds: Maximum seed entities (most-mentioned first).
+            limit: Maximum relationships returned.
+            query_entity_weight: Seed weight of an entity named in the query, in
+                                 chunk mentions (added to its actual mentions).
+        """
+        # The hop bound cannot be a query parameter, so it is validated and inlined
+        self.hop_depth = max(1, int(hop_depth))
+        self.fanout = fanout
+        self.max_degree = max_degree
+        self.max_seeds = max_seeds
+        self.limit = limit
+        self.query_entity_weight = query_entity_weight
+        self.query = self._build_query()
+
+    @classmethod
+    def from_env(cls) -> "GraphExpander":
+        return cls(
+            hop_depth=int(os.getenv("GRAPH_HOP_DEPTH", 1)),
+            fanout=int(os.getenv("GRAPH_FANOUT", 10)),
+            max_degree=int(os.getenv("GRAPH_MAX_DEGREE", 500)),
+            max_seeds=int(os.getenv("GRAPH_MAX_SEEDS", 20)),
+            limit=int(os.getenv("GRAPH_CONTEXT_LIMIT", 50)),
+            query_entity_weight=int(os.getenv("GRAPH_QUERY_ENTITY_WEIGHT", 2)),
+        )
+
+    def _expansion_pattern(self) -> str:
+        """
+        Path of up to `hop_depth` entity-to-entity hops from `e` to `related`.
+        Every node before the last hop must be a non-hub (a quantified path
+        pattern with the degree predicate inline), so hubs are never expanded.
+        """
+        if self.hop_depth == 1:
+            return "(e)-[:!MENTIONS]-(related:Entity)"
+        return (
+            "(e) ((:Entity)-[:!MENTIONS]-"
+            "(n:Entity WHERE COUNT { (n)--() } <= $max_degree))"
+            f"{{0,{self.hop_depth - 1}}} "
+            "(:Entity)-[:!MENTIONS]-(related:Entity)"
+        )
+
+    def _build_query(self) -> str:
+        return f"""
+        // 1. Seed entities, weighted by how many retrieved chunks mention them,
+        // plus the entities named in the query
+        CALL {{
+            MATCH (c:Chunk)-[:MENTIONS]->(seed:Entity)
+            WHERE c.id IN $chunk_ids
+            RETURN seed, count(DISTINCT c) AS mentions
+            UNION ALL
+            MATCH (seed:Entity)
+            WHERE seed.id IN $entity_ids
+            RETURN seed, $query_entity_weight AS mentions
+        }}
+        WITH seed, sum(mentions) AS mentions
+        ORDER BY mentions DESC
+        LIMIT $max_seeds
+        WITH collect(seed) AS seeds, collect(mentions) AS seed_mentions
+        UNWIND seeds AS e
+
+        // 2. Bounded expansion per seed. Hub seeds only connect to the other
+        // (bound) seeds, by shortest paths; other seeds expand through non-hubs
+        // only, the degree predicate being checked as each hop is taken
+        CALL {{
+            WITH e, seeds
+            WITH e, seeds WHERE COUNT {{ (e)--() }} > $max_degree
+            UNWIND seeds AS s
+            WITH e, s WHERE s <> e
+            MATCH p = allShortestPaths((e)-[:!MENTIONS*1..{self.hop_depth}]-(s))
+            WHERE all(n IN nodes(p) WHERE n = e OR n = s OR COUNT {{ (n)--() }} <= $max_degree)
+            WITH p, length(p) AS hops, COUNT {{ (s)--() }} AS degree
+            ORDER BY hops ASC, degree ASC
+            LIMIT $fanout
+            RETURN p
+            UNION
+            WITH e, seeds
+            WITH e, seeds WHERE COUNT {{ (e)--() }} <= $max_degree
+            MATCH p = {self._expansion_pattern()}
+            WHERE related <> e
+            WITH p, related IN seeds AS links_seeds, length(p) AS hops,
+                 COUNT {{ (related)--() }} AS degree
+            ORDER BY links_seeds DESC, hops ASC, degree ASC
+            LIMIT $fanout
+            RETURN p
+        }}
+
+        // 3. Rank each relationship by the chunk mentions of its endpoints
+        UNWIND relationships(p) AS r
+        WITH DISTINCT r, seeds, seed_mentions
+        WITH r, startNode(r) AS a, endNode(r) AS b, seeds, seed_mentions
+        WITH a, r, b,
+             reduce(score = 0, i IN range(0, size(seeds) - 1) |
+                 score + CASE WHEN seeds[i] = a OR seeds[i] = b
+                              THEN seed_mentions[i] ELSE 0 END) AS score
+        RETURN a.name AS entity, type(r) AS rel, b.name AS related_node, score
+        ORDER BY score DESC
+        LIMIT $limit
+        """
+
+    async def expand(
+        self, neo4j_driver, chunk_ids: list[str], entity_ids: list[str] | None = None
+    ) -> list[str]:
+        """
+        Run the expansion on the async driver.
+
+        Args:
+            neo4j_driver: Async Neo4j driver.
+            chunk_ids: IDs of the retrieved chunks.
+            entity_ids: IDs of the entities named in the query.
+
+        Returns:
+            Relationship strings "(a) -[TYPE]-> (b)", highest ranked first.
+        """
+        if not chunk_ids and not entity_ids:
+            return []
+
+        records, _, _ = await neo4j_driver.execute_query(
+            self.query,
+            chunk_ids=list(chunk_ids),
+            entity_ids=list(entity_ids or []),
+            query_entity_weight=self.query_entity_weight,
+            max_seeds=self.max_seeds,
+            max_degree=self.max_degree,
+            fanout=self.fanout,
+            limit=self.limit,
+            routing_=RoutingControl.READ,
+        )
+        return [
+            f"({record['entity']}) -[{record['rel']}]-> ({record['related_node']})"
+            for record in records
+        ]
@@ -0,0 +1,147 @@
+"""
+Hybrid (dense + sparse) retrieval.
+The dense (embedding) search and the sparse BM25 search over the same Qdrant
+collection run in parallel, and their rankings are merged with weighted
+reciprocal rank fusion (RRF): a chunk scores sum(weight / (k + rank)) over the
+rankings it appears in, so exact identifiers, codes and rare names found by
+BM25 surface alongside semantically similar chunks without having to calibrate
+cosine scores against BM25 scores.
+"""
+
+import asyncio
+import os
+
+from dotenv import load_dotenv
+
+from services.rag_api.src.core.instrumentation import instrumentation
+from services.rag_api.src.storage.sparse_encoder import SPARSE_VECTOR_NAME, BM25Encoder
+
+load_dotenv()
+
+
+class HybridSearcher:
+    """
+    This class is responsible for running dense and sparse searches and fusing them.
+    """
+
+    def __init__(
+        self,
+        enabled: bool = True,
+        dense_weight: float = 1.0,
+        sparse_weight: float = 1.0,
+        rrf_k: int = 60,
+        candidates: int = 4,
+        encoder: BM25Encoder | None = None,
+    ):
+        """
+        Args:
+            enabled: Run the sparse search at all (False = dense only).
+            dense_weight: Weight of the dense ranking in the fusion.
+            sparse_weight: Weight of the sparse ranking in the fusion.
+            rrf_k: RRF rank constant; larger values flatten the rank discount.
+            candidates: Each search fetches top_k * candidates points to fuse.
+            encoder: Query encoder; must match the one used at ingest time.
+        """
+        self.enabled = enabled
+        self.dense_weight = dense_weight
+        self.sparse_weight = sparse_weight
+        self.rrf_k = rrf_k
+        self.candidates = max(1, candidates)
+        self.encoder = encoder or BM25Encoder()
+
+    @classmethod
+    def from_env(cls) -> "HybridSearcher":
+        return cls(
+            enabled=os.getenv("HYBRID_SEARCH", "true").lower() == "true",
+            dense_weight=float(os.getenv("HYBRID_DENSE_WEIGHT", 1.0)),
+            sparse_weight=float(os.getenv("HYBRID_SPARSE_WEIGHT", 1.0)),
+            rrf_k=int(os.getenv("HYBRID_RRF_K", 60)),
+            candidates=int(os.getenv("HYBRID_CANDIDATES", 4)),
+        )
+
+    def fuse(self, rankings: list[tuple[list, float]], top_k: int) -> list:
+        """
+        Weighted reciprocal rank fusion.
+
+        Args:
+            rankings: (points in rank order, weight) per search.
+            top_k: Number of fused points to return.
+
+        Returns:
+            The top points, each carrying its fused score.
+        """
+        scores: dict = {}
+        points: dict = {}
+        for ranking, weight in rankings:
+            for rank, point in enumerate(ranking, start=1):
+                scores[point.id] = scores.get(point.id, 0.0) + weight / (self.rrf_k + rank)
+                points.setdefault(point.id, point)
+
+        best = sorted(scores, key=scores.get, reverse=True)[:top_k]
+        return [points[point_id].model_copy(update={"score": scores[point_id]}) for point_id in best]
+
+    async def search(
+        self,
+        qdrant_client,
+        collection_name: str,
+        query_vector,
+        query_text: str,
+        top_k: int,
+        **query_kwargs,
+    ) -> list:
+        """
+        Search the collection with the dense vector and, if enabled, the BM25 query.
+
+        Args:
+            qdrant_client: Async Qdrant client.
+            collection_name: Collection to search.
+            query_vector: Query embedding.
+            query_text: Raw query, for the sparse search.
+            top_k: Number of points to return.
+            **query_kwargs: Passed to both `query_points` calls (payload selection);
+                            `search_params` only applies to the dense search.
+
+        Returns:
+            Points ordered by fused score (dense scores if the sparse search is
+            disabled, empty, or fails).
+        """
+        search_params = query_kwargs.pop("search_params", None)
+        sparse_query = self.encoder.encode_query(query_text) if self.enabled else None
+        if sparse_query is None or not sparse_query.indices:
+            response = await qdrant_client.query_points(
+                collection_name=collection_name,
+                query=query_vector,
+                limit=top_k,
+                search_params=search_params,
+                **query_kwargs,
+            )
+            return response.points
+
+        limit = top_k * self.candidates
+        dense, sparse = await asyncio.gather(
+            qdrant_client.query_points(
+                collection_name=collection_name,
+                query=query_vector,
+                limit=limit,
+                search_params=search_params,
+                **query_kwargs,
+            ),
+            qdrant_client.query_points(
+                collection_name=collection_name,
+                query=sparse_query,
+                using=SPARSE_VECTOR_NAME,
+                limit=limit,
+                **query_kwargs,
+            ),
+            return_exceptions=True,
+        )
+        if isinstance(dense, BaseException):
+            raise dense
+        if isinstance(sparse, BaseException):
+            # e.g. a collection created before hybrid search: keep the dense results
+            instrumentation.warning("sparse_search_failed", error=str(sparse), fallback="dense")
+            return dense.points[:top_k]
+
+        return self.fuse(
+            [(dense.points, self.dense_weight), (sparse.points, self.sparse_weight)], top_k
+        )
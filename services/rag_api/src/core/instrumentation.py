@@ -0,0 +1,305 @@
+"""
+Structured instrumentation of the retrieval path.
+A trace records timed spans (embed, vector search, entity lookup, rerank,
+parse, graph expand, pack, format) with their counts and sizes. Traces are
+collected for a sampled share of requests (TRACE_SAMPLE_RATE) and for every
+request sent with the debug header. A finished trace is written as one JSON
+log line, and debug-header requests also get it back in the chat response.
+The current trace is held in a context variable, so the agent's tool records
+into the trace of the request that ran the agent. With no trace active, a
+span is a shared no-op object and costs one context variable lookup.
+"""
+
+import contextlib
+import contextvars
+import json
+import logging
+import os
+import random
+import sys
+import time
+import uuid
+from datetime import datetime, timezone
+
+from dotenv import load_dotenv
+
+load_dotenv()
+
+LEVELS = {"off": 0, "error": 1, "warning": 2, "info": 3, "debug": 4}
+_LEVEL_NAMES = {value: name for name, value in LEVELS.items()}
+
+# Trace of the request being handled (None = not traced)
+_current_trace: contextvars.ContextVar["Trace | None"] = contextvars.ContextVar(
+    "current_trace", default=None
+)
+# Marks a request that lost the sampling draw, so the retrievals it runs are
+# not sampled again on their own
+_UNSAMPLED = object()
+
+
+def _json_logger() -> logging.Logger:
+    """Logger writing each record as-is (one JSON object per line) to stdout."""
+    logger = logging.getLogger("rag_api.trace")
+    if not logger.handlers:
+        handler = logging.StreamHandler(sys.stdout)
+        handler.setFormatter(logging.Formatter("%(message)s"))
+        logger.addHandler(handler)
+        logger.propagate = False
+        logger.setLevel(logging.DEBUG)
+    return logger
+
+
+class Span:
+    """
+    This class is responsible for timing one step of a trace and holding its attributes.
+    """
+
+    __slots__ = ("name", "attributes", "verbose", "_origin", "_started", "start_ms", "duration_ms")
+
+    # Whether attributes are kept (False only for the no-op span)
+    recording = True
+
+    def __init__(self, name: str, origin: float, verbose: bool, attributes: dict):
+        self.name = name
+        self.attributes = attributes
+        # Debug-level traces also keep previews of the data
+        self.verbose = verbose
+        self._origin = origin
+        self._started = None
+        self.start_ms = None
+        self.duration_ms = None
+
+    def set(self, **attributes):
+        self.attributes.update(attributes)
+
+    def __enter__(self) -> "Span":
+        self._started = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        finished = time.perf_counter()
+        self.start_ms = round((self._started - self._origin) * 1000, 3)
+        self.duration_ms = round((finished - self._started) * 1000, 3)
+        if exc_type is not None:
+            self.attributes["error"] = f"{exc_type.__name__}: {exc}"
+        return False
+
+    def to_dict(self) -> dict:
+        return {
+            "name": self.name,
+            "start_ms": self.start_ms,
+            "duration_ms": self.duration_ms,
+            **self.attributes,
+        }
+
+
+class _NoopSpan:
+    recording = False
+    verbose = False
+
+    def set(self, **attributes):
+        pass
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        return False
+
+
+_NOOP_SPAN = _NoopSpan()
+
+
+class Trace:
+    """
+    This class is responsible for collecting the spans of one traced request.
+    """
+
+    def __init__(self, name: str, level: int, attributes: dict):
+        self.trace_id = uuid.uuid4().hex[:16]
+        self.name = name
+        self.level = level
+        self.attributes = attributes
+        self.spans: list[Span] = []
+        self.error: str | None = None
+        self.duration_ms: float | None = None
+        self._started = time.perf_counter()
+
+    def span(self, name: str, **attributes) -> Span:
+        span = Span(name, self._started, self.level >= LEVELS["debug"], attributes)
+        self.spans.append(span)
+        return span
+
+    def finish(self):
+        self.duration_ms = round((time.perf_counter() - self._started) * 1000, 3)
+
+    def to_dict(self) -> dict:
+        """The trace as JSON-ready data (so far, if it has not finished)."""
+        duration_ms = self.duration_ms
+        if duration_ms is None:
+            duration_ms = round((time.perf_counter() - self._started) * 1000, 3)
+        return {
+            "trace_id": self.trace_id,
+            "name": self.name,
+            "trace_level": _LEVEL_NAMES[self.level],
+            "duration_ms": duration_ms,
+            "error": self.error,
+            "attributes": self.attributes,
+            # Spans still open (e.g. a cancelled tool call) have no timings
+            "spans": sorted(
+                (span.to_dict() for span in self.spans if span.duration_ms is not None),
+                key=lambda span: span["start_ms"],
+            ),
+        }
+
+
+class Instrumentation:
+    """
+    This class is responsible for sampling traces, handing out spans and
+    writing the structured logs.
+    """
+
+    def __init__(self, level: str = "info", sample_rate: float = 1.0, debug_header: bool = True):
+        """
+        Args:
+            level: off | error | warning | info | debug. "info" traces sampled
+                   requests with timings, counts and sizes; "debug" also keeps
+                   previews of the retrieved items and context; "warning" and
+                   "error" only log those events.
+            sample_rate: Share of requests traced at the configured level (0-1).
+            debug_header: Honor the debug header (X-Debug-Trace), which traces a
+                          request whatever the level and sampling, and returns the
+                          trace with its response.
+        """
+        self.level = LEVELS.get(level.lower(), LEVELS["info"])
+        self.sample_rate = min(max(sample_rate, 0.0), 1.0)
+        self.debug_header = debug_header
+        self.logger = _json_logger()
+
+    @classmethod
+    def from_env(cls) -> "Instrumentation":
+        return cls(
+            level=os.getenv("TRACE_LEVEL", "info"),
+            sample_rate=float(os.getenv("TRACE_SAMPLE_RATE", 1.0)),
+            debug_header=os.getenv("TRACE_DEBUG_HEADER", "true").lower() == "true",
+        )
+
+    def requested_level(self, header_value: str | None) -> str | None:
+        """
+        Level asked for by a debug header value: "debug" for `debug`, "info" for
+        any other true value, None if absent, false or not allowed.
+        """
+        if not self.debug_header or not header_value:
+            return None
+        value = header_value.strip().lower()
+        if value in ("", "0", "false", "no", "off"):
+            return None
+        return "debug" if value == "debug" else "info"
+
+    @contextlib.contextmanager
+    def trace(self, name: str, level: str | None = None, **attributes):
+        """
+        Trace a block. Inside an already traced block, it becomes a span of
+        that trace instead.
+
+        Args:
+            name: Trace (or span) name.
+            level: Level requested for this trace (debug header): always traced,
+                   at this level or the configured one if higher. Otherwise the
+                   trace is sampled at the configured level.
+
+        Yields:
+            The Trace, or None if this block is not traced.
+        """
+        current = _current_trace.get()
+        if current is _UNSAMPLED:
+            yield None
+            return
+        if current is not None:
+            with current.span(name, **attributes):
+                yield current
+            return
+
+        if level is not None:
+            trace_level = max(LEVELS[level], self.level)
+        elif self.level < LEVELS["info"]:
+            yield None
+            return
+        elif self.sample_rate >= 1 or random.random() < self.sample_rate:
+            trace_level = self.level
+        else:
+            token = _current_trace.set(_UNSAMPLED)
+            try:
+                yield None
+            finally:
+                self._reset(token)
+            return
+
+        trace = Trace(name, trace_level, attributes)
+        token = _current_trace.set(trace)
+        try:
+            yield trace
+        except BaseException as e:
+            trace.error = f"{type(e).__name__}: {e}"
+            raise
+        finally:
+            self._reset(token)
+            trace.finish()
+            self._write("info" if trace.error is None else "error", "trace", trace.to_dict())
+
+    @staticmethod
+    def _reset(token):
+        try:
+            _current_trace.reset(token)
+        except ValueError:
+            # Closed from another context (e.g. an abandoned streaming response)
+            pass
+
+    @staticmethod
+    def current() -> Trace | None:
+        """The trace of the request being handled, if it is traced."""
+        trace = _current_trace.get()
+        return None if trace is _UNSAMPLED else trace
+
+    def span(self, name: str, **attributes):
+        """A span of the current trace (a no-op if the request is not traced)."""
+        trace = _current_trace.get()
+        if trace is None or trace is _UNSAMPLED:
+            return _NOOP_SPAN
+        return trace.span(name, **attributes)
+
+    def _write(self, level: str, event: str, fields: dict):
+        record = {
+            "timestamp": datetime.now(timezone.utc).isoformat(timespec="milliseconds"),
+            "level": level,
+            "event": event,
+            **fields,
+        }
+        self.logger.info(json.dumps(record, default=str))
+
+    def log(self, level: str, event: str, **fields):
+        """
+        Write a structured event if `level` is enabled, tagged with the current
+        trace (events of traced requests are kept whatever the level).
+        """
+        trace = self.current()
+        enabled = LEVELS[level] <= self.level
+        if trace is not None:
+            fields = {"trace_id": trace.trace_id, **fields}
+            enabled = enabled or LEVELS[level] <= trace.level
+        if enabled:
+            self._write(level, event, fields)
+
+    def warning(self, event: str, **fields):
+        self.log("warning", event, **fields)
+
+    def error(self, event: str, error: BaseException, **fields):
+        """Log a failure, and mark the current trace as failed."""
+        trace = self.current()
+        if trace is not None:
+            trace.error = f"{type(error).__name__}: {error}"
+        self.log("error", event, error=f"{type(error).__name__}: {error}", **fields)
+
+
+# Process-wide instrumentation, configured from TRACE_* settings
+instrumentation = Instrumentation.from_env()
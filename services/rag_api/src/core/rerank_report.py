@@ -0,0 +1,95 @@
+"""
+Tool calls per answer with and without reranking.
+Each question of a file (one per line) is answered by the agent once per
+variant: search order ("baseline"), MMR only ("mmr") and MMR with the graph
+signal ("mmr_graph"). The report gives the mean retrieval tool calls per
+answer and the answer latency for each variant. It needs the configured LLM,
+Qdrant and Neo4j, with a corpus already ingested:
+
+    python -m services.rag_api.src.core.rerank_report --questions questions.txt
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import time
+
+import numpy as np
+from dotenv import load_dotenv
+
+from agents import Agent, Runner, set_tracing_disabled
+from agents.extensions.models.litellm_model import LitellmModel
+
+from services.rag_api.src.core.config import AGENT_SYSTEM_PROMPT
+from services.rag_api.src.core.retrieval import retrieve_knowledge
+from services.rag_api.src.models.schemas import RetrievalOptions
+from services.rag_api.src.storage.clients import clients
+
+set_tracing_disabled(True)
+os.environ["LITELLM_TELEMETRY"] = "False"
+
+load_dotenv()
+
+VARIANTS = {
+    "baseline": RetrievalOptions(rerank=False),
+    "mmr": RetrievalOptions(rerank=True, graph_weight=0),
+    "mmr_graph": RetrievalOptions(rerank=True),
+}
+
+
+async def variant_report(agent: Agent, name: str, questions: list[str]) -> dict:
+    tool_calls = []
+    latencies = []
+    for question in questions:
+        started = time.perf_counter()
+        result = await Runner.run(agent, question, context=VARIANTS[name])
+        latencies.append(time.perf_counter() - started)
+        tool_calls.append(sum(item.type == "tool_call_item" for item in result.new_items))
+
+    return {
+        "variant": name,
+        "answers": len(questions),
+        "tool_calls/answer": round(float(np.mean(tool_calls)), 2),
+        "multi_call_share": round(float(np.mean([calls > 1 for calls in tool_calls])), 2),
+        "p50_s": round(float(np.percentile(latencies, 50)), 2),
+        "p95_s": round(float(np.percentile(latencies, 95)), 2),
+    }
+
+
+async def run(args) -> list[dict]:
+    with open(args.questions, encoding="utf-8") as f:
+        questions = [line.strip() for line in f if line.strip()]
+
+    agent = Agent(
+        name="Answering_Agent",
+        instructions=AGENT_SYSTEM_PROMPT,
+        model=LitellmModel(model=os.getenv("LLM_MODEL"), api_key=os.getenv("LLM_API_KEY")),
+        tools=[retrieve_knowledge],
+    )
+    try:
+        return [await variant_report(agent, name, questions) for name in args.variants]
+    finally:
+        await clients.aclose()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[1])
+    parser.add_argument("--questions", required=True, help="Text file, one question per line")
+    parser.add_argument("--variants", nargs="*", default=list(VARIANTS), choices=list(VARIANTS))
+    parser.add_argument("--json", action="store_true", help="Print the report as JSON")
+    args = parser.parse_args()
+
+    rows = asyncio.run(run(args))
+
+    if args.json:
+        print(json.dumps(rows, indent=2))
+        return
+    headers = list(rows[0])
+    print(" | ".join(f"{header:>17}" for header in headers))
+    for row in rows:
+        print(" | ".join(f"{row[header]!s:>17}" for header in headers))
+
+
+if __name__ == "__main__":
+    main()
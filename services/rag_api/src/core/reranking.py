@@ -0,0 +1,169 @@
+"""
+Reranking of the retrieved candidates.
+Retrieval over-fetches candidates (with their dense vectors) and this stage
+picks the final chunks with maximal marginal relevance: each pick maximizes
+lambda * relevance - (1 - lambda) * (similarity to the chunks already
+picked), so near-identical chunks from one file give way to complementary
+evidence. A chunk's relevance blends its search score (relative to the best
+candidate) with the share of the query's named entities it MENTIONS in the
+graph.
+"""
+
+import os
+
+import numpy as np
+from dotenv import load_dotenv
+from neo4j import RoutingControl
+
+from services.rag_api.src.core.instrumentation import instrumentation
+from services.rag_api.src.models.schemas import RetrievalOptions
+
+load_dotenv()
+
+
+class Reranker:
+    """
+    This class is responsible for MMR and graph-aware reranking of search results.
+    """
+
+    def __init__(
+        self,
+        enabled: bool = True,
+        top_k: int = 5,
+        candidates: int = 4,
+        mmr_lambda: float = 0.7,
+        graph_weight: float = 0.3,
+    ):
+        """
+        Args:
+            enabled: Rerank at all (False = search order, top_k results).
+            top_k: Chunks returned per retrieval.
+            candidates: Candidates fetched per returned chunk.
+            mmr_lambda: 1 = relevance only, 0 = diversity only.
+            graph_weight: Weight of the query-entity mentions in the relevance.
+        """
+        self.defaults = RetrievalOptions(
+            top_k=top_k,
+            rerank=enabled,
+            candidates=candidates,
+            mmr_lambda=mmr_lambda,
+            graph_weight=graph_weight,
+        )
+
+    @classmethod
+    def from_env(cls) -> "Reranker":
+        return cls(
+            enabled=os.getenv("RERANK", "true").lower() == "true",
+            top_k=int(os.getenv("RETRIEVAL_TOP_K", 5)),
+            candidates=int(os.getenv("RERANK_CANDIDATES", 4)),
+            mmr_lambda=float(os.getenv("RERANK_MMR_LAMBDA", 0.7)),
+            graph_weight=float(os.getenv("RERANK_GRAPH_WEIGHT", 0.3)),
+        )
+
+    def settings(self, options: RetrievalOptions | None = None) -> RetrievalOptions:
+        """The defaults with the request's options applied."""
+        if options is None:
+            return self.defaults
+        return self.defaults.model_copy(update=options.model_dump(exclude_none=True))
+
+    @staticmethod
+    def point_vector(point):
+        """The dense vector of a point (the unnamed vector when it also has sparse ones)."""
+        vector = point.vector
+        if isinstance(vector, dict):
+            vector = vector.get("")
+        return vector
+
+    @staticmethod
+    def mmr(
+        vectors: np.ndarray, relevance: np.ndarray, top_k: int, mmr_lambda: float
+    ) -> list[int]:
+        """
+        Maximal marginal relevance selection.
+
+        Args:
+            vectors: (n, dimension) candidate vectors.
+            relevance: (n,) relevance of each candidate, in [0, 1].
+            top_k: Number of candidates to select.
+            mmr_lambda: 1 = relevance only, 0 = diversity only.
+
+        Returns:
+            Indices of the selected candidates, in selection order.
+        """
+        norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+        unit = vectors / np.where(norms == 0, 1, norms)
+        similarity = unit @ unit.T
+
+        selected: list[int] = []
+        # Highest similarity of each candidate to anything selected so far
+        redundancy = np.zeros(len(vectors), dtype=np.float32)
+        available = np.ones(len(vectors), dtype=bool)
+        for _ in range(min(top_k, len(vectors))):
+            scores = mmr_lambda * relevance - (1 - mmr_lambda) * redundancy
+            scores[~available] = -np.inf
+            best = int(np.argmax(scores))
+            selected.append(best)
+            available[best] = False
+            redundancy = np.maximum(redundancy, similarity[best])
+        return selected
+
+    @staticmethod
+    async def mention_counts(neo4j_driver, chunk_ids: list[str], entity_ids: list[str]) -> dict:
+        """How many of `entity_ids` each chunk MENTIONS."""
+        records, _, _ = await neo4j_driver.execute_query(
+            "MATCH (c:Chunk)-[:MENTIONS]->(e:Entity) "
+            "WHERE c.id IN $chunk_ids AND e.id IN $entity_ids "
+            "RETURN c.id AS chunk_id, count(DISTINCT e) AS mentions",
+            chunk_ids=chunk_ids,
+            entity_ids=entity_ids,
+            routing_=RoutingControl.READ,
+        )
+        return {record["chunk_id"]: record["mentions"] for record in records}
+
+    async def rerank(
+        self,
+        points: list,
+        neo4j_driver,
+        entity_ids: list[str],
+        settings: RetrievalOptions,
+    ) -> list:
+        """
+        Select `settings.top_k` of the candidate points.
+
+        Args:
+            points: Candidates in search order, fetched with their vectors.
+            neo4j_driver: Async Neo4j driver, for the graph signal.
+            entity_ids: Entities named in the query.
+            settings: Resolved retrieval settings (see `settings`).
+
+        Returns:
+            The selected points, each scored with its blended relevance.
+        """
+        vectors = [self.point_vector(point) for point in points]
+        if not points or any(vector is None for vector in vectors):
+            return points[: settings.top_k]
+
+        # Relative to the best candidate, which keeps cosine scores on the same
+        # scale as the redundancy term and puts fused (RRF) scores on it too
+        scores = np.maximum(np.array([point.score for point in points], dtype=np.float32), 0)
+        relevance = scores / scores.max() if scores.max() > 0 else np.ones_like(scores)
+
+        if entity_ids and settings.graph_weight:
+            chunk_ids = [str((point.payload or {}).get("id", point.id)) for point in points]
+            try:
+                counts = await self.mention_counts(neo4j_driver, chunk_ids, entity_ids)
+            except Exception as e:
+                instrumentation.warning("rerank_graph_signal_unavailable", error=str(e))
+                counts = {}
+            mentions = np.array([counts.get(chunk_id, 0) for chunk_id in chunk_ids], dtype=np.float32)
+            relevance = (1 - settings.graph_weight) * relevance + settings.graph_weight * (
+                mentions / len(entity_ids)
+            )
+
+        selected = self.mmr(
+            np.asarray(vectors, dtype=np.float32),
+            relevance,
+            settings.top_k,
+            settings.mmr_lambda,
+        )
+        return [points[i].model_copy(update={"score": float(relevance[i])}) for i in selected]
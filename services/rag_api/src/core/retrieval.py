@@ -1,125 +1,169 @@
-from agents import function_tool
+from agents import RunContextWrapper, function_tool
+import asyncio
 import os
 from dotenv import load_dotenv
-import warnings
-from neo4j import GraphDatabase
-from qdrant_client import QdrantClient
-from neo4j_graphrag.retrievers import QdrantNeo4jRetriever
-from litellm import embedding
-
-# Suppress Qdrant insecure connection warning
-warnings.filterwarnings("ignore", message="Api key is used with an insecure connection")
+from litellm import aembedding
+from services.rag_api.src.core.context_packing import ContextPacker
+from services.rag_api.src.core.embedding_cache import EmbeddingCache
+from services.rag_api.src.core.entity_index import entity_index
+from services.rag_api.src.core.graph_expansion import GraphExpander
+from services.rag_api.src.core.hybrid_search import HybridSearcher
+from services.rag_api.src.core.instrumentation import instrumentation
+from services.rag_api.src.core.reranking import Reranker
+from services.rag_api.src.models.schemas import RetrievalOptions, RetrievedChunk
+from services.rag_api.src.storage.clients import clients
+from services.rag_api.src.storage.qdrant_profiles import load_profile, search_params
 
 load_dotenv()
 
 # --- Configuration ---
-NEO4J_URI = f"{os.getenv('NEO4J_URL')}:{os.getenv('NEO4J_BOLT_PORT')}"
-NEO4J_AUTH = tuple(os.getenv("NEO4J_AUTH").split("/"))
-QDRANT_URL = os.getenv("QDRANT_URL")
-QDRANT_API_KEY = os.getenv("QDRANT_API_KEY")
 COLLECTION_NAME = "QdrantRagCollection"
 EMBEDDING_MODEL = os.getenv("EMBEDDING_MODEL")
 
-# --- Helper Functions (The Pipeline) ---
+# Repeated (or case/whitespace-variant) queries skip the embedding round trip
+query_embedding_cache = EmbeddingCache(
+    max_entries=int(os.getenv("QUERY_EMBEDDING_CACHE_SIZE", 1024)),
+    max_bytes=int(os.getenv("QUERY_EMBEDDING_CACHE_MAX_MB", 64)) * 1024 * 1024,
+    ttl_seconds=float(os.getenv("QUERY_EMBEDDING_CACHE_TTL", 3600)),
+    disk_path=os.getenv("QUERY_EMBEDDING_CACHE_PATH") or None,
+)
 
+# Search-time ef and quantization rescoring matching the collection profile
+SEARCH_PARAMS = search_params(load_profile())
 
-def get_embedding(text: str):
-    """Step 1: Embed the query"""
-    response = embedding(model=EMBEDDING_MODEL, input=[text])
-    return response.data[0]["embedding"]
+# Dense + BM25 search fused with RRF; weights come from HYBRID_* settings
+hybrid_searcher = HybridSearcher.from_env()
 
+# Hop depth, fan-out and hub pruning come from GRAPH_* settings
+graph_expander = GraphExpander.from_env()
 
-def search_qdrant(neo4j_driver, qdrant_client, query_vector, top_k=5):
-    """Step 2: Search Qdrant for relevant chunks"""
-    retriever = QdrantNeo4jRetriever(
-        driver=neo4j_driver,
-        client=qdrant_client,
-        collection_name=COLLECTION_NAME,
-        id_property_external="id",
-        id_property_neo4j="id",
-    )
-    return retriever.search(query_vector=query_vector, top_k=top_k)
+# Over-fetch and MMR/graph reranking; per-request overrides come from the run context
+reranker = Reranker.from_env()
 
+# Merges overlapping chunks and fits the context into CONTEXT_TOKEN_BUDGET
+context_packer = ContextPacker.from_env()
 
-def parse_retriever_results(retriever_result):
-    """Step 3: Extract Text, IDs, and Metadata from Retriever Results"""
-    chunks = []
-    chunk_ids = []
+# --- Helper Functions (The Pipeline) ---
 
-    for item in retriever_result.items:
-        content = item.content
-        try:
-            # Extract text
-            text_start = content.find("'text': '") + len("'text': '")
-            text_end = content.find("'", text_start)
-            chunk_text = content[text_start:text_end]
-
-            # Extract ID
-            id_start = content.find("'id': '") + len("'id': '")
-            id_end = content.find("'", id_start)
-            chunk_id = content[id_start:id_end]
-
-            # Extract source_file
-            source_start = content.find("'source_file': '") + len("'source_file': '")
-            source_end = content.find("'", source_start)
-            source_file = (
-                content[source_start:source_end]
-                if source_start > len("'source_file': '") - 1
-                else "Unknown"
-            )
 
-            # Extract chunk_index
-            index_start = content.find("'chunk_index': ") + len("'chunk_index': ")
-            index_end = content.find(",", index_start)
-            chunk_index = (
-                content[index_start:index_end]
-                if index_start > len("'chunk_index': ") - 1
-                else "?"
-            )
+async def _embed_query(text: str):
+    response = await aembedding(model=EMBEDDING_MODEL, input=[text])
+    return response.data[0]["embedding"]
 
-            chunks.append(
-                {
-                    "text": chunk_text,
-                    "source_file": source_file,
-                    "chunk_index": chunk_index,
-                }
-            )
-            chunk_ids.append(chunk_id)
-        except Exception:
-            continue
 
-    return chunks, chunk_ids
+async def get_embedding(text: str):
+    """Step 1: Embed the query (through the query embedding cache)"""
+    with instrumentation.span("embed", chars=len(text)) as span:
+        vector = await query_embedding_cache.get_or_compute(text, EMBEDDING_MODEL, _embed_query)
+        span.set(dimension=len(vector))
+        return vector
 
 
-def fetch_graph_context(neo4j_driver, chunk_ids):
-    """Step 4: Fetch related graph context using Chunk IDs"""
-    if not chunk_ids:
-        return []
+# Payload fields needed to build a RetrievedChunk; the vector itself is not fetched
+PAYLOAD_FIELDS = ["id", "text", "source_file", "chunk_index"]
 
-    with neo4j_driver.session() as session:
-        query_cypher = """
-        MATCH (c:Chunk)-[:MENTIONS]->(e:Entity)
-        WHERE c.id IN $chunk_ids
-        OPTIONAL MATCH (e)-[r]-(related:Entity)
-        RETURN e.name as entity, type(r) as rel, related.name as related_node
-        LIMIT 50
-        """
-        result = session.run(query_cypher, chunk_ids=chunk_ids)
 
-        relationships = set()
-        for record in result:
-            if record["rel"] and record["related_node"]:
-                rel_str = f"({record['entity']}) -[{record['rel']}]-> ({record['related_node']})"
-                relationships.add(rel_str)
-        return list(relationships)
+async def search_qdrant(qdrant_client, query_vector, query_text="", top_k=5, with_vectors=False):
+    """Step 2: Hybrid (dense + BM25) search of Qdrant, fetching only the payload fields we use"""
+    with instrumentation.span(
+        "vector_search", top_k=top_k, hybrid=hybrid_searcher.enabled, with_vectors=with_vectors
+    ) as span:
+        points = await hybrid_searcher.search(
+            qdrant_client,
+            COLLECTION_NAME,
+            query_vector,
+            query_text,
+            top_k,
+            with_payload=PAYLOAD_FIELDS,
+            with_vectors=with_vectors,
+            search_params=SEARCH_PARAMS,
+        )
+        span.set(points=len(points))
+        return points
+
+
+def parse_retriever_results(points):
+    """Step 3: Turn Qdrant points into typed chunk records (and their IDs)"""
+    chunks = []
+    for point in points:
+        payload = point.payload or {}
+        chunks.append(
+            RetrievedChunk(
+                id=str(payload.get("id", point.id)),
+                text=payload.get("text", ""),
+                source_file=payload.get("source_file") or "Unknown",
+                chunk_index=payload.get("chunk_index", "?"),
+                score=point.score,
+            )
+        )
+    return chunks, [chunk.id for chunk in chunks]
+
+
+async def find_query_entities(neo4j_driver, query):
+    """Step 2b: Look up the entities named in the query (in-memory name index)"""
+    with instrumentation.span("entity_lookup") as span:
+        entity_ids = await entity_index.find(neo4j_driver, query)
+        span.set(entities=len(entity_ids), indexed_names=len(entity_index))
+        return entity_ids
+
+
+async def vector_search(qdrant_client, query, settings: RetrievalOptions):
+    """Steps 1-2: Embed the query and search Qdrant (over-fetching candidates, with vectors, to rerank)"""
+    query_vector = await get_embedding(query)
+    if settings.rerank:
+        return await search_qdrant(
+            qdrant_client,
+            query_vector,
+            query,
+            top_k=settings.top_k * settings.candidates,
+            with_vectors=True,
+        )
+    return await search_qdrant(qdrant_client, query_vector, query, top_k=settings.top_k)
+
+
+async def rerank_results(neo4j_driver, points, entity_ids, settings: RetrievalOptions):
+    """Step 2c: MMR over the candidates, boosted by the query entities they mention"""
+    if not settings.rerank:
+        return points
+    with instrumentation.span("rerank", candidates=len(points)) as span:
+        selected = await reranker.rerank(points, neo4j_driver, entity_ids, settings)
+        span.set(selected=len(selected))
+        return selected
+
+
+async def fetch_graph_context(neo4j_driver, chunk_ids, entity_ids=None):
+    """Step 4: Fetch related graph context from the chunks' and the query's entities (ranked, bounded expansion)"""
+    with instrumentation.span(
+        "graph_expand", chunks=len(chunk_ids), query_entities=len(entity_ids or [])
+    ) as span:
+        relationships = await graph_expander.expand(neo4j_driver, chunk_ids, entity_ids)
+        if span.recording:
+            span.set(
+                relationships=len(relationships),
+                bytes=sum(len(rel.encode("utf-8")) for rel in relationships),
+            )
+        return relationships
+
+
+def pack_context(chunks, relationships):
+    """Step 5: Merge, deduplicate and budget the chunks and relationships"""
+    with instrumentation.span("pack") as span:
+        packed = context_packer.pack(chunks, relationships, format_context)
+        if span.recording:
+            span.set(
+                chunks=len(packed.chunks),
+                relationships=len(packed.relationships),
+                **packed.report(),
+            )
+        return packed
 
 
 def format_context(chunks, relationships):
-    """Step 5: Format everything into a context string with citations"""
+    """Step 6: Format everything into a context string with citations"""
     chunks_str = ""
     for i, chunk in enumerate(chunks):
-        citation = f"[Source: {chunk['source_file']}, Chunk {chunk['chunk_index']}]"
-        chunks_str += f"Chunk {i + 1} {citation}:\n{chunk['text']}\n\n"
+        citation = f"[Source: {chunk.source_file}, Chunk {chunk.chunk_index}]"
+        chunks_str += f"Chunk {i + 1} {citation}:\n{chunk.text}\n\n"
 
     graph_str = "\n".join(relationships)
 
@@ -134,48 +178,89 @@ def format_context(chunks, relationships):
 # --- The Main Tool ---
 
 
+# Start of the tool output when retrieval failed
+RETRIEVAL_ERROR_PREFIX = "Error retrieving knowledge:"
+# Start of the agents SDK's output for a tool that raised or got invalid arguments
+TOOL_FAILURE_PREFIX = "An error occurred while"
+
+
+def is_tool_error(output: str) -> bool:
+    """Whether a tool output reports a failure rather than retrieved context."""
+    return output.startswith((RETRIEVAL_ERROR_PREFIX, TOOL_FAILURE_PREFIX))
+
+
+async def retrieve_context(query: str, options: RetrievalOptions | None = None) -> str:
+    """
+    The retrieval pipeline behind `retrieve_knowledge`: returns the formatted
+    context for `query` (or an error message).
+    """
+    settings = reranker.settings(options)
+
+    # 1. Shared, pooled async clients (created once per process), so concurrent
+    # chats overlap their I/O instead of blocking the event loop
+    neo4j_driver = clients.async_neo4j_driver
+    qdrant_client = clients.async_qdrant_client
+
+    with instrumentation.trace(
+        "retrieve_knowledge",
+        query_chars=len(query),
+        top_k=settings.top_k,
+        rerank=settings.rerank,
+    ):
+        try:
+            # Steps 1-2: Embed and search Qdrant, while looking up the entities
+            # named in the query
+            points, entity_ids = await asyncio.gather(
+                vector_search(qdrant_client, query, settings),
+                find_query_entities(neo4j_driver, query),
+            )
+
+            points = await rerank_results(neo4j_driver, points, entity_ids, settings)
+
+            # Step 3: Parse Results
+            with instrumentation.span("parse", points=len(points)) as span:
+                chunks, chunk_ids = parse_retriever_results(points)
+                span.set(chunks=len(chunks))
+                if span.verbose:
+                    span.set(
+                        items=[
+                            {
+                                "score": round(chunk.score, 3),
+                                "source": f"{chunk.source_file}, Chunk {chunk.chunk_index}",
+                                "preview": chunk.text[:200],
+                            }
+                            for chunk in chunks
+                        ]
+                    )
+
+            # Step 4: Graph Search
+            relationships = await fetch_graph_context(neo4j_driver, chunk_ids, entity_ids)
+
+            # Step 5: Pack into the token budget
+            packed = pack_context(chunks, relationships)
+
+            # Step 6: Format Output
+            with instrumentation.span("format") as span:
+                final_context = format_context(packed.chunks, packed.relationships)
+                if span.recording:
+                    span.set(chars=len(final_context), bytes=len(final_context.encode("utf-8")))
+                if span.verbose:
+                    span.set(preview=final_context[:500])
+
+            return final_context
+
+        except Exception as e:
+            instrumentation.error("retrieve_knowledge_failed", e, query=query[:200])
+            return f"{RETRIEVAL_ERROR_PREFIX} {str(e)}"
+
+
 @function_tool
-def retrieve_knowledge(query: str) -> str:
+async def retrieve_knowledge(
+    ctx: RunContextWrapper[RetrievalOptions | None], query: str
+) -> str:
     """
     Retrieves relevant information from the knowledge base using Hybrid RAG.
     Uses vector search to find text chunks and graph traversal to find related entities.
     """
-    # 1. Init Clients
-    neo4j_driver = GraphDatabase.driver(NEO4J_URI, auth=NEO4J_AUTH)
-    qdrant_client = QdrantClient(url=QDRANT_URL, api_key=QDRANT_API_KEY)
-
-    try:
-        # Step 1: Embed
-        print(f"DEBUG: Embedding query: {query}")
-        query_vector = get_embedding(query)
-
-        # Step 2: Vector Search
-        print(f"DEBUG: Searching Qdrant...")
-        retriever_result = search_qdrant(neo4j_driver, qdrant_client, query_vector)
-        print(f"DEBUG: Qdrant returned {len(retriever_result.items)} items")
-        
-        # Debug: Print raw retriever results
-        for i, item in enumerate(retriever_result.items):
-            print(f"DEBUG: Item {i}: {item.content[:200]}...")
-
-        # Step 3: Parse Results
-        chunks, chunk_ids = parse_retriever_results(retriever_result)
-        print(f"DEBUG: Parsed {len(chunks)} chunks, {len(chunk_ids)} IDs")
-
-        # Step 4: Graph Search
-        relationships = fetch_graph_context(neo4j_driver, chunk_ids)
-        print(f"DEBUG: Found {len(relationships)} relationships")
-
-        # Step 5: Format Output
-        final_context = format_context(chunks, relationships)
-        print(f"DEBUG: Final context length: {len(final_context)} chars")
-        print(f"DEBUG: Context preview:\n{final_context[:500]}")
-
-        return final_context
-
-    except Exception as e:
-        print(f"DEBUG: Error in retrieve_knowledge: {str(e)}")
-        return f"Error retrieving knowledge: {str(e)}"
-
-    finally:
-        neo4j_driver.close()
+    # Per-request retrieval options are passed as the run context (None = defaults)
+    return await retrieve_context(query, ctx.context)
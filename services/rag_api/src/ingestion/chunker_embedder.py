@@ -3,38 +3,104 @@ This module is responsible for chunking and embedding the text data.
 """
 
 from typing import Dict, List
+import asyncio
+import multiprocessing
 import os
+import signal
+import time
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from concurrent.futures.process import BrokenProcessPool
 from dotenv import load_dotenv
 from docling.document_converter import DocumentConverter
 from docling_core.transforms.chunker import HybridChunker
 from langchain_text_splitters import RecursiveCharacterTextSplitter
 from litellm import embedding
 
+from services.rag_api.src.ingestion.embedding_scheduler import EmbeddingScheduler
 
 load_dotenv()
 
 
+def _build_hybrid_chunker(chunk_size: int, chunk_overlap: int) -> HybridChunker:
+    return HybridChunker(
+        chunk_size=chunk_size,
+        overlap=chunk_overlap,
+        respect_sentence_boundary=True,
+        respect_word_boundary=True,
+    )
+
+
+# Per-process state of the conversion pool workers, built once by the initializer
+_worker_converter = None
+_worker_chunker = None
+
+
+def _init_conversion_worker(pid_queue, chunk_size: int, chunk_overlap: int):
+    global _worker_converter, _worker_chunker
+    # Reported first, so a worker can be killed even while it loads its models
+    pid_queue.put(os.getpid())
+    _worker_converter = DocumentConverter()
+    _worker_chunker = _build_hybrid_chunker(chunk_size, chunk_overlap)
+
+
+def _convert_in_worker(file_path: str) -> List[str]:
+    # Only the chunk texts cross the process boundary, not the docling document
+    doc = _worker_converter.convert(source=file_path).document
+    return [chunk.text for chunk in _worker_chunker.chunk(dl_doc=doc)]
+
+
 class ChunkerEmbedder:
     """
     This class is responsible for chunking and embedding the text data.
     """
 
     def __init__(
-        self, all_files: Dict[str, List[str]], chunk_size: int, chunk_overlap: int
+        self,
+        all_files: Dict[str, List[str]],
+        chunk_size: int,
+        chunk_overlap: int,
+        conversion_workers: int = int(os.getenv("CONVERSION_WORKERS", 1)),
+        conversion_timeout: float = float(os.getenv("CONVERSION_TIMEOUT", 600)),
+        embedder: EmbeddingScheduler | None = None,
+        source_root: str | None = os.getenv("RAW_DATA_FOLDER"),
     ):
+        """
+        Args:
+            all_files: Files by type, as returned by FileReader.read_files.
+            chunk_size: Chunk size (tokens for docling files, characters for text files).
+            chunk_overlap: Overlap between consecutive chunks.
+            conversion_workers: Processes converting PDF/markdown files with docling.
+                                1 converts in-process, one file at a time.
+            conversion_timeout: Seconds a single file may take to convert in the
+                                process pool before it is abandoned (0 disables).
+            embedder: Embedding scheduler (defaults to one configured from EMBEDDING_*).
+            source_root: Folder the files are named relative to in "file" (the
+                         source_file of chunks and relationships), so files with
+                         the same name in different folders stay distinct.
+                         None names them by base name.
+        """
         self.pdf_files = all_files["pdf"]
         self.text_files = all_files["text"]
         self.markdown_files = all_files["markdown"]
         self.image_files = all_files["image"]
 
-        self.converter = DocumentConverter()
+        self.chunk_size = chunk_size
+        self.chunk_overlap = chunk_overlap
+        self.conversion_workers = max(1, conversion_workers)
+        self.conversion_timeout = conversion_timeout
+        self.source_root = source_root
 
-        self.chunker = HybridChunker(
-            chunk_size=chunk_size,
-            overlap=chunk_overlap,
-            respect_sentence_boundary=True,
-            respect_word_boundary=True,
-        )
+        # Built on first in-process conversion; pool workers build their own
+        self._converter = None
+        self._pool = None
+        # Workers report their PID here from the initializer. One queue serves
+        # every pool and is never closed, since a worker still starting up when
+        # its pool is closed reads it later (and is killed on the next close)
+        self._pid_queue = None
+
+        self.chunker = _build_hybrid_chunker(chunk_size, chunk_overlap)
+        self.embedder = embedder or EmbeddingScheduler.from_env()
 
         self.text_chunker = RecursiveCharacterTextSplitter(
             chunk_size=int(chunk_size),
@@ -43,61 +109,215 @@ class ChunkerEmbedder:
             is_separator_regex=False,
         )
 
+    @property
+    def converter(self) -> DocumentConverter:
+        if self._converter is None:
+            self._converter = DocumentConverter()
+        return self._converter
+
+    def _convert(self, file_path: str) -> List[str]:
+        doc = self.converter.convert(source=file_path).document
+        return [chunk.text for chunk in self.chunker.chunk(dl_doc=doc)]
+
+    def _get_pool(self) -> ProcessPoolExecutor:
+        if self._pool is None:
+            # spawn: the API process runs threads, which fork does not copy safely
+            context = multiprocessing.get_context("spawn")
+            if self._pid_queue is None:
+                self._pid_queue = context.SimpleQueue()
+            self._pool = ProcessPoolExecutor(
+                max_workers=self.conversion_workers,
+                mp_context=context,
+                initializer=_init_conversion_worker,
+                initargs=(self._pid_queue, self.chunk_size, self.chunk_overlap),
+            )
+        return self._pool
+
+    def close(self):
+        """
+        Stop the conversion pool. Workers are killed rather than drained, since a
+        conversion cannot be interrupted any other way.
+        """
+        pool, self._pool = self._pool, None
+        if pool is None:
+            return
+        while not self._pid_queue.empty():
+            try:
+                os.kill(self._pid_queue.get(), getattr(signal, "SIGKILL", signal.SIGTERM))
+            except OSError:
+                # Already exited
+                pass
+        # Workers still starting up exit once started, as the pool is shut down
+        pool.shutdown(wait=False, cancel_futures=True)
+
+    def _iter_converted(self, file_paths: List[str]):
+        """
+        Convert and chunk docling files, in-process or fanned out to the process pool.
+        A file that fails (or times out) is reported with an error instead of
+        stopping the others.
+
+        Yields:
+            (file_path, chunks, error) in completion order; error is None on success.
+        """
+        # A single file still goes to the pool, for its timeout and crash isolation
+        if self.conversion_workers == 1 or not file_paths:
+            for file_path in file_paths:
+                try:
+                    yield file_path, self._convert(file_path), None
+                except Exception as e:
+                    yield file_path, [], str(e)
+            return
+
+        timeout = self.conversion_timeout
+        pending = deque(file_paths)
+        # Files that were in flight when a worker died; each is retried alone so
+        # the file that crashes the worker does not take the others down with it
+        suspects = deque()
+        # At most one file per worker is in flight, so a submitted file starts at
+        # once and its deadline can be counted from submission
+        inflight = {}  # future -> (file_path, deadline, isolated, pool)
+
+        def submit(file_path: str, isolated: bool):
+            pool = self._get_pool()
+            future = pool.submit(_convert_in_worker, file_path)
+            deadline = time.monotonic() + timeout if timeout else None
+            inflight[future] = (file_path, deadline, isolated, pool)
+
+        while pending or suspects or inflight:
+            if suspects:
+                if not inflight:
+                    submit(suspects.popleft(), isolated=True)
+            else:
+                while pending and len(inflight) < self.conversion_workers:
+                    submit(pending.popleft(), isolated=False)
+
+            deadlines = [entry[1] for entry in inflight.values() if entry[1] is not None]
+            wait_for = max(0.0, min(deadlines) - time.monotonic()) if deadlines else None
+            done, _ = wait(inflight, timeout=wait_for, return_when=FIRST_COMPLETED)
+
+            for future in done:
+                file_path, _, isolated, pool = inflight.pop(future)
+                try:
+                    yield file_path, future.result(), None
+                except BrokenProcessPool as e:
+                    # A worker died (e.g. crashed in a native library); the next
+                    # submission starts a new pool. Other futures of the same
+                    # broken pool must not close a pool started since.
+                    if pool is self._pool:
+                        self.close()
+                    if isolated:
+                        yield file_path, [], f"conversion worker died: {e}"
+                    else:
+                        suspects.append(file_path)
+                except Exception as e:
+                    yield file_path, [], str(e)
+
+            now = time.monotonic()
+            expired = [
+                future
+                for future, (_, deadline, _, _) in inflight.items()
+                if deadline is not None and deadline <= now and not future.done()
+            ]
+            if expired:
+                # A running conversion cannot be cancelled: kill the pool and
+                # resubmit the other in-flight files to a fresh one
+                for future in expired:
+                    file_path, _, _, _ = inflight.pop(future)
+                    yield file_path, [], f"conversion timed out after {timeout:g}s"
+                for file_path, _, isolated, _ in inflight.values():
+                    (suspects if isolated else pending).appendleft(file_path)
+                inflight.clear()
+                self.close()
+
+        self.close()
+
+    def source_name(self, file_path: str) -> str:
+        """Name recorded as the source_file of the file's chunks and relationships."""
+        if self.source_root is None:
+            return os.path.basename(file_path)
+        return os.path.relpath(file_path, self.source_root)
+
+    def _file_result(self, file_path: str, chunks: List[str], error: str | None) -> Dict:
+        result = {"file": self.source_name(file_path), "chunks": chunks}
+        if error is not None:
+            print(f"Warning: could not chunk {file_path}: {error}")
+            result["error"] = error
+        return result
+
+    def chunk_file(self, file_path: str, file_type: str) -> Dict[str, List[str]]:
+        """
+        Chunk a single file.
+
+        Args:
+            file_path: Absolute path of the file.
+            file_type: One of the FileReader categories ("pdf", "text", "markdown", "image").
+
+        Returns:
+            Dict with format {"file": "...", "chunks": [...]}; images produce no chunks.
+        """
+        file_name = self.source_name(file_path)
+
+        if file_type == "text":
+            with open(file_path, "r", encoding="utf-8") as file:
+                chunks = self.text_chunker.split_text(file.read())
+        elif file_type in ("pdf", "markdown"):
+            chunks = self._convert(file_path)
+        else:
+            chunks = []
+
+        return {"file": file_name, "chunks": chunks}
+
+    def iter_chunks(self):
+        """
+        Lazily chunk every file, one file at a time: text files in-process, then
+        PDF and markdown files through docling (in parallel when
+        `conversion_workers` > 1), then images, which yield no chunks but are
+        still reported so they can be recorded.
+
+        Yields:
+            (file_path, {"file": "...", "chunks": [...]}); a file that could not be
+            read or converted carries an "error" key and no chunks.
+        """
+        for file_path in self.text_files:
+            try:
+                chunks, error = self.chunk_file(file_path, "text")["chunks"], None
+            except (OSError, UnicodeDecodeError) as e:
+                # Reported like a failed conversion, so one unreadable file does
+                # not stop the run
+                chunks, error = [], str(e)
+            yield file_path, self._file_result(file_path, chunks, error)
+
+        for file_path, chunks, error in self._iter_converted(
+            self.pdf_files + self.markdown_files
+        ):
+            yield file_path, self._file_result(file_path, chunks, error)
+
+        for file_path in self.image_files:
+            yield file_path, self.chunk_file(file_path, "image")
+
     def chunk_text(self) -> List[Dict[str, List[str]]]:
         """
         This function chunks the text data into smaller chunks.
         """
-        text_chunks = []
-        for text_file in self.text_files:
-            with open(text_file, "r", encoding="utf-8") as file:
-                text = file.read()
-                chunks = self.text_chunker.split_text(text)
-                file_name = text_file.split("/")[-1]
-                text_chunks.append(
-                    {
-                        "file": file_name,
-                        "chunks": chunks,
-                    }
-                )
-        return text_chunks
+        return [self.chunk_file(text_file, "text") for text_file in self.text_files]
 
     def chunk_markdown(self) -> List[Dict[str, List[str]]]:
         """
-        This function chunks the text data into smaller chunks.
+        This function chunks the markdown data into smaller chunks.
         """
-        markdown_chunks = []
-        for markdown_file in self.markdown_files:
-            doc = self.converter.convert(source=markdown_file).document
-            chunks = self.chunker.chunk(dl_doc=doc)
-            file_name = markdown_file.split("/")[-1]
-            markdown_chunks.append(
-                {
-                    "file": file_name,
-                    "chunks": [chunk.text for chunk in chunks],
-                }
-            )
-        return markdown_chunks
+        return [
+            self._file_result(*converted)
+            for converted in self._iter_converted(self.markdown_files)
+        ]
 
     def chunk_pdf(self) -> List[Dict[str, List[str]]]:
         """
         This function chunks the pdf data into smaller chunks.
         """
-        pdf_chunks = []
-        # Initialize the document converter
-
-        # Convert PDF to document format
-        for pdf_file in self.pdf_files:
-            result = self.converter.convert(pdf_file)
-            docling_document = result.document
-            chunks = self.chunker.chunk(docling_document)
-            file_name = pdf_file.split("/")[-1]
-            pdf_chunks.append(
-                {
-                    "file": file_name,
-                    "chunks": [chunk.text for chunk in chunks],
-                }
-            )
-        return pdf_chunks
+        return [
+            self._file_result(*converted)
+            for converted in self._iter_converted(self.pdf_files)
+        ]
 
     def embedding_text(self, text: str) -> List[float]:
         """
@@ -116,49 +336,30 @@ class ChunkerEmbedder:
             return item["embedding"]
         return item.embedding
 
-    def embed_chunks(
+    async def aembed_chunks(
         self, chunked_data: List[Dict[str, List[str]]]
     ) -> List[Dict[str, any]]:
         """
         Embed all chunks from chunked data structure, preserving file associations.
+        Chunks are packed across files into batches bounded by count and tokens,
+        and the batches are embedded concurrently (see EmbeddingScheduler).
 
         Args:
             chunked_data: List of dicts with format [{"file": "...", "chunks": [...]}, ...]
 
         Returns:
-            List of dicts with format [{"file": "...", "chunks": [...], "embeddings": [...]}, ...]
+            List of dicts with format [{"source_file": "...", "chunks": [...], "embeddings": [...]}, ...]
             where embeddings[i] corresponds to chunks[i]
         """
-        embedding_model = os.getenv("EMBEDDING_MODEL")
-        result = []
-
-        # Embed chunks per file to preserve file association
-        for file_data in chunked_data:
-            chunks = file_data["chunks"]
-            if not chunks:  # Skip if no chunks
-                continue
-
-            # Embed all chunks for this file at once
-            response = embedding(model=embedding_model, input=chunks)
-            # Extract embeddings - handle both dict and object responses
-            embeddings = []
-            for item in response.data:
-                if isinstance(item, dict):
-                    embeddings.append(item.get("embedding", item))
-                else:
-                    embeddings.append(
-                        item.embedding if hasattr(item, "embedding") else item
-                    )
-
-            result.append(
-                {
-                    "source_file": file_data["file"],
-                    "chunks": chunks,
-                    "embeddings": embeddings,
-                }
-            )
+        return await self.embedder.aembed_chunks(chunked_data)
 
-        return result
+    def embed_chunks(
+        self, chunked_data: List[Dict[str, List[str]]]
+    ) -> List[Dict[str, any]]:
+        """
+        Blocking version of `aembed_chunks`, for callers without an event loop.
+        """
+        return asyncio.run(self.aembed_chunks(chunked_data))
 
 
 if __name__ == "__main__":
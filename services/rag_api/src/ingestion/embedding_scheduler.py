@@ -0,0 +1,196 @@
+"""
+This module schedules the embedding requests of the ingestion pipeline.
+Chunks from any number of files are packed into batches bounded by chunk count
+and estimated tokens, the batches are sent concurrently (within the rate
+limits, retrying transient errors), and the vectors are written back at their
+file/chunk positions in one contiguous float32 matrix.
+"""
+
+import asyncio
+import os
+
+import numpy as np
+from dotenv import load_dotenv
+from litellm import aembedding
+
+from services.rag_api.src.ingestion.rate_limiter import RateLimiter, retry_async
+
+load_dotenv()
+
+
+class EmbeddingScheduler:
+    """
+    This class is responsible for batching and dispatching embedding requests.
+    """
+
+    def __init__(
+        self,
+        model: str | None = None,
+        max_batch_size: int = 128,
+        max_batch_tokens: int = 8000,
+        concurrency: int = 4,
+        requests_per_minute: int | None = None,
+        tokens_per_minute: int | None = None,
+        max_retries: int = 3,
+    ):
+        """
+        Args:
+            model: Embedding model (defaults to EMBEDDING_MODEL).
+            max_batch_size: Maximum chunks per request.
+            max_batch_tokens: Maximum estimated tokens per request; a chunk larger
+                              than this is sent on its own.
+            concurrency: Requests in flight at once.
+            requests_per_minute: Provider request budget (0 or None = unlimited).
+            tokens_per_minute: Provider token budget (0 or None = unlimited).
+            max_retries: Retries per request on transient provider errors.
+        """
+        self.model = model or os.getenv("EMBEDDING_MODEL")
+        self.max_batch_size = max(1, max_batch_size)
+        self.max_batch_tokens = max(1, max_batch_tokens)
+        self.concurrency = max(1, concurrency)
+        self.max_retries = max_retries
+        self.rate_limiter = RateLimiter(
+            requests_per_minute=requests_per_minute,
+            tokens_per_minute=tokens_per_minute,
+        )
+
+    @classmethod
+    def from_env(cls) -> "EmbeddingScheduler":
+        return cls(
+            max_batch_size=int(os.getenv("EMBEDDING_BATCH_SIZE", 128)),
+            max_batch_tokens=int(os.getenv("EMBEDDING_BATCH_TOKENS", 8000)),
+            concurrency=int(os.getenv("EMBEDDING_CONCURRENCY", 4)),
+            requests_per_minute=int(os.getenv("EMBEDDING_RPM", 0)),
+            tokens_per_minute=int(os.getenv("EMBEDDING_TPM", 0)),
+            max_retries=int(os.getenv("EMBEDDING_MAX_RETRIES", 3)),
+        )
+
+    @staticmethod
+    def estimate_tokens(text: str) -> int:
+        # Rough token estimate (~4 chars per token), as for the extraction TPM budget
+        return len(text) // 4 + 1
+
+    def pack(self, texts: list[str]) -> list[tuple[list[int], int]]:
+        """
+        Greedily pack texts, in order, into batches.
+
+        Returns:
+            List of (positions of the texts in the batch, estimated tokens).
+        """
+        batches = []
+        positions: list[int] = []
+        tokens = 0
+        for position, text in enumerate(texts):
+            text_tokens = self.estimate_tokens(text)
+            if positions and (
+                len(positions) >= self.max_batch_size
+                or tokens + text_tokens > self.max_batch_tokens
+            ):
+                batches.append((positions, tokens))
+                positions, tokens = [], 0
+            positions.append(position)
+            tokens += text_tokens
+        if positions:
+            batches.append((positions, tokens))
+        return batches
+
+    @staticmethod
+    def _vectors(response) -> list:
+        """Extract vectors from an embedding response, in input order."""
+        items = []
+        for position, item in enumerate(response.data):
+            if isinstance(item, dict):
+                items.append((item.get("index", position), item["embedding"]))
+            else:
+                items.append((getattr(item, "index", position), item.embedding))
+        items.sort(key=lambda entry: entry[0])
+        return [vector for _, vector in items]
+
+    async def _embed_batch(self, texts: list[str], tokens: int) -> list:
+        async def _call():
+            await self.rate_limiter.acquire(tokens)
+            return await aembedding(model=self.model, input=texts)
+
+        response = await retry_async(_call, max_retries=self.max_retries)
+        vectors = self._vectors(response)
+        if len(vectors) != len(texts):
+            raise ValueError(
+                f"Embedding provider returned {len(vectors)} vectors for {len(texts)} inputs"
+            )
+        return vectors
+
+    async def aembed_texts(self, texts: list[str]) -> np.ndarray:
+        """
+        Embed `texts` with `concurrency` workers pulling batches from a queue.
+
+        Returns:
+            float32 matrix of shape (len(texts), dimension), rows in input order.
+        """
+        # Allocated once the first batch reveals the dimension; each batch's
+        # Python floats are dropped as soon as they are copied in
+        matrix: np.ndarray | None = None
+        queue: asyncio.Queue = asyncio.Queue()
+        for batch in self.pack(texts):
+            queue.put_nowait(batch)
+
+        async def worker():
+            nonlocal matrix
+            while True:
+                try:
+                    positions, tokens = queue.get_nowait()
+                except asyncio.QueueEmpty:
+                    return
+                batch_vectors = await self._embed_batch(
+                    [texts[position] for position in positions], tokens
+                )
+                batch_matrix = np.asarray(batch_vectors, dtype=np.float32)
+                if matrix is None:
+                    matrix = np.empty((len(texts), batch_matrix.shape[1]), dtype=np.float32)
+                matrix[positions] = batch_matrix
+
+        workers = [
+            asyncio.create_task(worker())
+            for _ in range(min(self.concurrency, queue.qsize()))
+        ]
+        try:
+            await asyncio.gather(*workers)
+        except BaseException:
+            # One batch failed for good (or we were cancelled): stop the others
+            for task in workers:
+                task.cancel()
+            await asyncio.gather(*workers, return_exceptions=True)
+            raise
+
+        if matrix is None:
+            return np.empty((0, 0), dtype=np.float32)
+        return matrix
+
+    async def aembed_chunks(self, chunked_data: list[dict]) -> list[dict]:
+        """
+        Embed every chunk of `chunked_data`, packing chunks across files.
+
+        Args:
+            chunked_data: List of dicts with format [{"file": "...", "chunks": [...]}, ...]
+
+        Returns:
+            List of dicts with format [{"source_file": "...", "chunks": [...], "embeddings": [...]}, ...]
+            where embeddings[i] corresponds to chunks[i]; files without chunks are skipped.
+            Each file's embeddings are a float32 row view into one matrix for the batch.
+        """
+        files = [file_data for file_data in chunked_data if file_data["chunks"]]
+        texts = [chunk for file_data in files for chunk in file_data["chunks"]]
+        matrix = await self.aembed_texts(texts)
+
+        result = []
+        offset = 0
+        for file_data in files:
+            count = len(file_data["chunks"])
+            result.append(
+                {
+                    "source_file": file_data["file"],
+                    "chunks": file_data["chunks"],
+                    "embeddings": matrix[offset : offset + count],
+                }
+            )
+            offset += count
+        return result
@@ -0,0 +1,319 @@
+"""
+This module resolves the entity names produced by graph extraction into
+canonical entities with stable IDs.
+Names are normalized (unicode, case, whitespace, punctuation, legal suffixes),
+mapped through an optional alias table and, optionally, clustered by embedding
+similarity. The entity ID is a UUIDv5 of the canonical key, so the same entity
+gets the same ID across ingestion runs.
+With clustering, a name is compared against every cluster representative seen
+so far, not only the names of the current batch. Each name's cluster is decided
+once and persisted in a ClusterStore, so later batches and runs reuse it. Which
+name represents a new cluster still depends on the order names first arrive in.
+"""
+
+import json
+import os
+import re
+import sqlite3
+import threading
+import unicodedata
+import uuid
+from collections import Counter
+
+import numpy as np
+from litellm import embedding
+
+# Namespace for entity UUIDv5s; changing it re-keys every entity in the graph
+ENTITY_NAMESPACE = uuid.UUID("5b0c6a3e-8f4c-4d2a-9d6e-2f1b7c3a9e10")
+
+LEGAL_SUFFIXES = {
+    "inc",
+    "incorporated",
+    "corp",
+    "corporation",
+    "co",
+    "ltd",
+    "limited",
+    "llc",
+    "plc",
+    "gmbh",
+    "ag",
+    "sa",
+}
+
+_PUNCTUATION = re.compile(r"[^\w\s&'-]+")
+_WHITESPACE = re.compile(r"\s+")
+
+
+class ClusterStore:
+    """
+    This class is responsible for persisting entity clusters in a local SQLite
+    file: the representative assigned to every clustered name key, and each
+    representative's display name and name embedding.
+    """
+
+    def __init__(self, path: str):
+        """
+        Open (or create) the cluster database.
+
+        Args:
+            path: Path of the SQLite file.
+        """
+        self.path = path
+        directory = os.path.dirname(os.path.abspath(path))
+        os.makedirs(directory, exist_ok=True)
+
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS representatives ("
+            "key TEXT PRIMARY KEY, display TEXT NOT NULL, "
+            "model TEXT NOT NULL, vector BLOB NOT NULL)"
+        )
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS assignments ("
+            "key TEXT PRIMARY KEY, representative TEXT NOT NULL)"
+        )
+        self._conn.commit()
+
+    def load(self) -> tuple[dict[str, str], list[tuple[str, str, str, np.ndarray]]]:
+        """
+        Returns:
+            (assignments, representatives): name key -> representative key, and
+            [(key, display, model, vector)] in creation order.
+        """
+        with self._lock:
+            assignments = dict(
+                self._conn.execute("SELECT key, representative FROM assignments").fetchall()
+            )
+            rows = self._conn.execute(
+                "SELECT key, display, model, vector FROM representatives ORDER BY rowid"
+            ).fetchall()
+        representatives = [
+            (key, display, model, np.frombuffer(vector, dtype=np.float32))
+            for key, display, model, vector in rows
+        ]
+        return assignments, representatives
+
+    def save(
+        self,
+        assignments: dict[str, str],
+        representatives: list[tuple[str, str, str, np.ndarray]],
+    ):
+        """Record new assignments and new (or re-embedded) representatives."""
+        with self._lock:
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO representatives (key, display, model, vector) "
+                "VALUES (?, ?, ?, ?)",
+                [
+                    (key, display, model, np.asarray(vector, dtype=np.float32).tobytes())
+                    for key, display, model, vector in representatives
+                ],
+            )
+            self._conn.executemany(
+                "INSERT OR IGNORE INTO assignments (key, representative) VALUES (?, ?)",
+                list(assignments.items()),
+            )
+            self._conn.commit()
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+
+class EntityResolver:
+    """
+    This class is responsible for mapping surface entity names to canonical entities.
+    """
+
+    def __init__(
+        self,
+        aliases: dict[str, str] | None = None,
+        similarity_threshold: float = 0.0,
+        embedding_model: str | None = None,
+        cluster_store: ClusterStore | None = None,
+        embedding_batch_size: int = int(os.getenv("EMBEDDING_BATCH_SIZE", 128)),
+    ):
+        """
+        Args:
+            aliases: Mapping of alias -> canonical name (both are normalized).
+            similarity_threshold: Cosine similarity above which two names are merged
+                                  by embedding clustering. 0 disables clustering.
+            embedding_model: Embedding model used for clustering.
+            cluster_store: Where clusters are persisted across runs. Without one,
+                           clusters are only kept for the resolver's lifetime.
+            embedding_batch_size: Names per embedding request when clustering.
+        """
+        self.aliases = {
+            self.normalize(alias): self.normalize(canonical)
+            for alias, canonical in (aliases or {}).items()
+        }
+        # Aliased entities are displayed under their canonical spelling
+        self.alias_display = {
+            self.normalize(canonical): canonical for canonical in (aliases or {}).values()
+        }
+        self.similarity_threshold = similarity_threshold
+        self.embedding_model = embedding_model
+        self.cluster_store = cluster_store
+        self.embedding_batch_size = max(1, embedding_batch_size)
+
+        # Clusters decided so far (loaded from the store on first use)
+        self._lock = threading.Lock()
+        self._loaded = False
+        self._assignments: dict[str, str] = {}  # name key -> representative key
+        self._representative_display: dict[str, str] = {}
+        self._representative_keys: list[str] = []
+        self._representative_vectors = np.empty((0, 0), dtype=np.float32)
+
+    @classmethod
+    def from_alias_file(cls, path: str | None, **kwargs) -> "EntityResolver":
+        """Build a resolver from a JSON alias table ({"alias": "canonical", ...})."""
+        aliases = {}
+        if path:
+            with open(path, "r", encoding="utf-8") as file:
+                aliases = json.load(file)
+        return cls(aliases=aliases, **kwargs)
+
+    @staticmethod
+    def normalize(name: str) -> str:
+        """
+        Fold a surface name into its comparison key.
+        e.g. "  Amazon,  Inc. " -> "amazon", "The New York Times" -> "new york times"
+        """
+        key = unicodedata.normalize("NFKC", name).casefold()
+        key = _PUNCTUATION.sub(" ", key)
+        tokens = _WHITESPACE.sub(" ", key).strip().split(" ")
+        if len(tokens) > 1 and tokens[0] == "the":
+            tokens = tokens[1:]
+        while len(tokens) > 1 and tokens[-1].strip("'-") in LEGAL_SUFFIXES:
+            tokens = tokens[:-1]
+        return " ".join(tokens)
+
+    @staticmethod
+    def entity_id(key: str) -> str:
+        return str(uuid.uuid5(ENTITY_NAMESPACE, key))
+
+    def _embed(self, texts: list[str]) -> np.ndarray:
+        """Unit-normalized name embeddings, requested in batches of `embedding_batch_size`."""
+        vectors = []
+        for start in range(0, len(texts), self.embedding_batch_size):
+            response = embedding(
+                model=self.embedding_model,
+                input=texts[start : start + self.embedding_batch_size],
+            )
+            vectors.extend(
+                item["embedding"] if isinstance(item, dict) else item.embedding
+                for item in response.data
+            )
+        matrix = np.array(vectors, dtype=np.float32)
+        matrix /= np.linalg.norm(matrix, axis=1, keepdims=True) + 1e-12
+        return matrix
+
+    def _load_clusters(self):
+        """Load the persisted clusters, re-embedding representatives of another model."""
+        self._loaded = True
+        if self.cluster_store is None:
+            return
+        self._assignments, representatives = self.cluster_store.load()
+        if not representatives:
+            return
+
+        stale = [i for i, entry in enumerate(representatives) if entry[2] != self.embedding_model]
+        if stale:
+            fresh = self._embed([representatives[i][1] for i in stale])
+            for i, vector in zip(stale, fresh):
+                key, display, _, _ = representatives[i]
+                representatives[i] = (key, display, self.embedding_model, vector)
+            self.cluster_store.save({}, [representatives[i] for i in stale])
+
+        self._representative_keys = [key for key, _, _, _ in representatives]
+        self._representative_display = {key: display for key, display, _, _ in representatives}
+        self._representative_vectors = np.stack([vector for _, _, _, vector in representatives])
+
+    def _cluster(self, keys: list[str], display: dict[str, str]) -> dict[str, str]:
+        """
+        Greedy single-pass clustering against every representative so far: each
+        new key joins the most similar representative if the cosine similarity
+        clears the threshold, otherwise it becomes a representative itself. Keys
+        clustered before keep their cluster. `keys` must be ordered by priority
+        (most frequent first), so frequent names become the representatives.
+        """
+        with self._lock:
+            if not self._loaded:
+                self._load_clusters()
+
+            new_keys = [key for key in keys if key not in self._assignments]
+            if new_keys:
+                vectors = self._embed([display[key] for key in new_keys])
+                # Room for every new key to become a representative
+                existing = len(self._representative_keys)
+                representatives = np.empty(
+                    (existing + len(new_keys), vectors.shape[1]), dtype=np.float32
+                )
+                if existing:
+                    representatives[:existing] = self._representative_vectors
+                count = existing
+
+                added_assignments = {}
+                added_representatives = []
+                for key, vector in zip(new_keys, vectors):
+                    if count:
+                        scores = representatives[:count] @ vector
+                        best = int(np.argmax(scores))
+                        if scores[best] >= self.similarity_threshold:
+                            added_assignments[key] = self._representative_keys[best]
+                            continue
+                    representatives[count] = vector
+                    count += 1
+                    self._representative_keys.append(key)
+                    self._representative_display[key] = display[key]
+                    added_assignments[key] = key
+                    added_representatives.append((key, display[key], self.embedding_model, vector))
+
+                self._representative_vectors = representatives[:count]
+                self._assignments.update(added_assignments)
+                if self.cluster_store is not None:
+                    self.cluster_store.save(added_assignments, added_representatives)
+
+            return {key: self._assignments[key] for key in keys}
+
+    def resolve(self, names: list[str]) -> dict[str, tuple[str, str]]:
+        """
+        Resolve surface names to canonical entities.
+
+        Args:
+            names: Every entity mention, in order (repeats count as extra mentions).
+
+        Returns:
+            Dict of surface name -> (entity_id, canonical display name).
+        """
+        key_counts: Counter = Counter()
+        display: dict[str, str] = {}  # canonical key -> first surface form seen
+        surface_keys = {}
+
+        for name in names:
+            key = self.normalize(name)
+            if not key:
+                continue
+            key = self.aliases.get(key, key)
+            surface_keys[name] = key
+            key_counts[key] += 1
+            display.setdefault(key, self.alias_display.get(key, name.strip()))
+
+        # Most mentioned first; ties broken by first appearance (Counter keeps insertion order)
+        ordered_keys = [key for key, _ in key_counts.most_common()]
+        if self.similarity_threshold > 0 and ordered_keys:
+            key_mapping = self._cluster(ordered_keys, display)
+            # Clustered entities are displayed under their representative's name
+            display = {
+                representative: self._representative_display[representative]
+                for representative in set(key_mapping.values())
+            }
+        else:
+            key_mapping = {key: key for key in ordered_keys}
+
+        return {
+            name: (self.entity_id(key_mapping[key]), display[key_mapping[key]])
+            for name, key in surface_keys.items()
+        }
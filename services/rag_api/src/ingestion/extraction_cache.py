@@ -0,0 +1,122 @@
+"""
+This module contains a persistent, content-addressed cache for the
+chunk-to-graph LLM extraction step.
+Entries are keyed by a hash of (chunk text, extraction prompt, model name) and
+stored in a local SQLite file with size-based LRU eviction.
+"""
+
+import hashlib
+import os
+import sqlite3
+import threading
+import time
+
+from services.rag_api.src.models.schemas import GraphComponents
+
+
+class ExtractionCache:
+    """
+    This class is responsible for caching parsed GraphComponents on local disk,
+    so re-ingests and overlapping documents skip the LLM entirely.
+    """
+
+    def __init__(self, path: str, max_bytes: int = 512 * 1024 * 1024):
+        """
+        Open (or create) the cache database.
+
+        Args:
+            path: Path of the SQLite file.
+            max_bytes: Total payload size above which least-recently-used entries are evicted.
+        """
+        self.path = path
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+
+        directory = os.path.dirname(os.path.abspath(path))
+        os.makedirs(directory, exist_ok=True)
+
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS extractions ("
+            "key TEXT PRIMARY KEY, value TEXT NOT NULL, "
+            "size INTEGER NOT NULL, last_access REAL NOT NULL)"
+        )
+        self._conn.execute(
+            "CREATE INDEX IF NOT EXISTS idx_extractions_last_access "
+            "ON extractions(last_access)"
+        )
+        self._conn.commit()
+        self._total_bytes = self._conn.execute(
+            "SELECT COALESCE(SUM(size), 0) FROM extractions"
+        ).fetchone()[0]
+
+    @staticmethod
+    def make_key(text: str, prompt: str, model: str) -> str:
+        """Hash of everything that determines the LLM's extraction output."""
+        digest = hashlib.sha256()
+        for part in (model, prompt, text):
+            encoded = (part or "").encode("utf-8")
+            # Length-prefix each part so ("ab", "c") and ("a", "bc") differ
+            digest.update(len(encoded).to_bytes(8, "big"))
+            digest.update(encoded)
+        return digest.hexdigest()
+
+    def get(self, key: str) -> GraphComponents | None:
+        """Return the cached GraphComponents for `key`, or None on a miss."""
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT value FROM extractions WHERE key = ?", (key,)
+            ).fetchone()
+            if row is None:
+                self.misses += 1
+                return None
+            self.hits += 1
+            self._conn.execute(
+                "UPDATE extractions SET last_access = ? WHERE key = ?",
+                (time.time(), key),
+            )
+            self._conn.commit()
+        return GraphComponents.model_validate_json(row[0])
+
+    def put(self, key: str, value: GraphComponents):
+        """Store `value` under `key`, evicting old entries if over the size limit."""
+        payload = value.model_dump_json()
+        size = len(payload.encode("utf-8"))
+        with self._lock:
+            previous = self._conn.execute(
+                "SELECT size FROM extractions WHERE key = ?", (key,)
+            ).fetchone()
+            self._conn.execute(
+                "INSERT OR REPLACE INTO extractions (key, value, size, last_access) "
+                "VALUES (?, ?, ?, ?)",
+                (key, payload, size, time.time()),
+            )
+            self._total_bytes += size - (previous[0] if previous else 0)
+            self._evict()
+            self._conn.commit()
+
+    def _evict(self):
+        """Drop least-recently-used entries until the cache fits in max_bytes."""
+        while self._total_bytes > self.max_bytes:
+            rows = self._conn.execute(
+                "SELECT key, size FROM extractions ORDER BY last_access LIMIT 100"
+            ).fetchall()
+            if not rows:
+                self._total_bytes = 0
+                return
+            for key, size in rows:
+                if self._total_bytes <= self.max_bytes:
+                    break
+                self._conn.execute("DELETE FROM extractions WHERE key = ?", (key,))
+                self._total_bytes -= size
+
+    def stats(self) -> dict:
+        return {"hits": self.hits, "misses": self.misses, "bytes": self._total_bytes}
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
@@ -0,0 +1,163 @@
+"""
+Background ingestion jobs.
+An ingestion run is submitted as a job, executed as an asyncio task on the
+API's event loop (its blocking stages already run in threads), and tracked
+under a job ID with its current stage and live progress counters, so the HTTP
+request returns immediately and clients poll for status or cancel the job.
+Only one job runs at a time, since every run reads and writes the same
+manifest and stores.
+"""
+
+import asyncio
+import os
+import time
+import traceback
+import uuid
+from collections import OrderedDict
+
+from dotenv import load_dotenv
+
+load_dotenv()
+
+# Job statuses
+QUEUED = "queued"
+RUNNING = "running"
+SUCCEEDED = "succeeded"
+FAILED = "failed"
+CANCELLED = "cancelled"
+FINISHED_STATUSES = {SUCCEEDED, FAILED, CANCELLED}
+
+
+class IngestionJob:
+    """
+    This class is responsible for holding the state of one ingestion run.
+    """
+
+    def __init__(self, params: dict):
+        self.id = str(uuid.uuid4())
+        self.params = params
+        self.status = QUEUED
+        self.stage = QUEUED
+        # Replaced by the pipeline's live counters once streaming starts
+        self.progress: dict[str, int] = {}
+        self.result: dict | None = None
+        self.error: str | None = None
+        self.created_at = time.time()
+        self.started_at: float | None = None
+        self.finished_at: float | None = None
+        self.task: asyncio.Task | None = None
+
+    @property
+    def finished(self) -> bool:
+        return self.status in FINISHED_STATUSES
+
+    def snapshot(self) -> dict:
+        return {
+            "job_id": self.id,
+            "status": self.status,
+            "stage": self.stage,
+            "progress": dict(self.progress),
+            "result": self.result,
+            "error": self.error,
+            "created_at": self.created_at,
+            "started_at": self.started_at,
+            "finished_at": self.finished_at,
+        }
+
+
+class IngestionJobManager:
+    """
+    This class is responsible for running ingestion jobs in the background and
+    keeping a bounded history of them.
+    """
+
+    def __init__(self, max_history: int = int(os.getenv("INGEST_JOB_HISTORY", 20))):
+        """
+        Args:
+            max_history: Finished jobs kept for status queries (oldest dropped first).
+        """
+        self.max_history = max(1, max_history)
+        self._jobs: OrderedDict[str, IngestionJob] = OrderedDict()
+
+    def active(self) -> IngestionJob | None:
+        """The job currently queued or running, if any."""
+        for job in reversed(self._jobs.values()):
+            if not job.finished:
+                return job
+        return None
+
+    def get(self, job_id: str) -> IngestionJob | None:
+        return self._jobs.get(job_id)
+
+    def submit(self, run, **params) -> tuple[IngestionJob, bool]:
+        """
+        Start `run(job, **params)` as a background task, unless a job is already
+        in progress, in which case that job is returned instead.
+
+        Args:
+            run: Coroutine function doing the ingestion; its return value becomes
+                 the job result. It may update `job.stage` and `job.progress`.
+
+        Returns:
+            (job, created) where `created` is False if an active job was returned.
+        """
+        active = self.active()
+        if active is not None:
+            return active, False
+
+        job = IngestionJob(params)
+        self._jobs[job.id] = job
+        self._prune()
+        job.task = asyncio.get_running_loop().create_task(self._run(job, run))
+        job.task.add_done_callback(lambda _: self._on_done(job))
+        return job, True
+
+    @staticmethod
+    def _on_done(job: IngestionJob):
+        # A job cancelled before its task started never reaches `_run`'s handlers
+        if not job.finished:
+            job.status = CANCELLED
+            job.finished_at = time.time()
+
+    async def _run(self, job: IngestionJob, run):
+        job.status = RUNNING
+        job.started_at = time.time()
+        try:
+            job.result = await run(job, **job.params)
+            job.status = SUCCEEDED
+            job.stage = "done"
+        except asyncio.CancelledError:
+            job.status = CANCELLED
+            # The task ends here; nothing awaits it that needs the cancellation
+        except Exception as e:
+            job.status = FAILED
+            job.error = str(e) or type(e).__name__
+            traceback.print_exc()
+        finally:
+            job.finished_at = time.time()
+
+    def cancel(self, job_id: str) -> IngestionJob | None:
+        """
+        Request cancellation of a job. Batches already written stay ingested and
+        recorded in the manifest; the rest is picked up by the next run.
+        """
+        job = self._jobs.get(job_id)
+        if job is not None and not job.finished and job.task is not None:
+            job.task.cancel()
+        return job
+
+    def _prune(self):
+        finished = [job_id for job_id, job in self._jobs.items() if job.finished]
+        while len(self._jobs) > self.max_history and finished:
+            self._jobs.pop(finished.pop(0))
+
+    async def shutdown(self):
+        """Cancel any running job and wait for it to stop."""
+        job = self.active()
+        if job is not None and job.task is not None:
+            job.task.cancel()
+            await asyncio.gather(job.task, return_exceptions=True)
+
+
+# Process-wide job manager
+ingestion_jobs = IngestionJobManager()
@@ -0,0 +1,120 @@
+"""
+This module keeps track of what has already been ingested.
+The manifest records, per file, its size, mtime, content hash and the chunk
+IDs it produced, so an ingest run only processes new or modified files and
+can retract the chunks of changed or deleted ones.
+"""
+
+import hashlib
+import json
+import os
+import tempfile
+
+
+class IngestionManifest:
+    """
+    This class is responsible for reading, diffing and writing the ingestion manifest.
+    The manifest is a JSON file: {"files": {"/abs/path": {"size", "mtime", "content_hash", "chunk_ids"}}}
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self.files: dict[str, dict] = {}
+        if os.path.exists(path):
+            with open(path, "r", encoding="utf-8") as file:
+                self.files = json.load(file).get("files", {})
+
+    @staticmethod
+    def content_hash(file_path: str) -> str:
+        """Stream the file through sha256."""
+        digest = hashlib.sha256()
+        with open(file_path, "rb") as file:
+            for block in iter(lambda: file.read(1024 * 1024), b""):
+                digest.update(block)
+        return digest.hexdigest()
+
+    def diff(self, all_files: dict[str, list[str]], force: bool = False) -> dict:
+        """
+        Compare the files currently on disk against the manifest.
+
+        Size and mtime are checked first; the content hash is only computed when
+        they differ, so an unchanged corpus costs one stat() per file.
+
+        Args:
+            all_files: Output of FileReader.read_files().
+            force: Treat every file as modified (full re-ingest).
+
+        Returns:
+            {"changed": {type: [paths]}, "unchanged": [paths], "deleted": [paths],
+             "stats": {path: {"size", "mtime", "content_hash"}}}
+            where "changed" covers both new and modified files and "stats" holds
+            the fresh metadata to record once those files are ingested.
+        """
+        changed = {file_type: [] for file_type in all_files}
+        unchanged = []
+        stats = {}
+        seen = set()
+
+        for file_type, paths in all_files.items():
+            for path in paths:
+                seen.add(path)
+                stat = os.stat(path)
+                entry = self.files.get(path)
+
+                if (
+                    not force
+                    and entry
+                    and entry["size"] == stat.st_size
+                    and entry["mtime"] == stat.st_mtime
+                ):
+                    unchanged.append(path)
+                    continue
+
+                content_hash = self.content_hash(path)
+                if not force and entry and entry["content_hash"] == content_hash:
+                    # Touched but not modified: just refresh the mtime
+                    entry["mtime"] = stat.st_mtime
+                    unchanged.append(path)
+                    continue
+
+                changed[file_type].append(path)
+                stats[path] = {
+                    "size": stat.st_size,
+                    "mtime": stat.st_mtime,
+                    "content_hash": content_hash,
+                }
+
+        deleted = [path for path in self.files if path not in seen]
+
+        return {
+            "changed": changed,
+            "unchanged": unchanged,
+            "deleted": deleted,
+            "stats": stats,
+        }
+
+    def stale_chunk_ids(self, paths: list[str]) -> list[str]:
+        """Chunk IDs previously produced by `paths` (modified or deleted files)."""
+        chunk_ids = []
+        for path in paths:
+            chunk_ids.extend(self.files.get(path, {}).get("chunk_ids", []))
+        return chunk_ids
+
+    def record(self, path: str, stat: dict, chunk_ids: list[str]):
+        self.files[path] = {**stat, "chunk_ids": list(chunk_ids)}
+
+    def remove(self, path: str):
+        self.files.pop(path, None)
+
+    def save(self):
+        """Atomically write the manifest next to its final location."""
+        directory = os.path.dirname(os.path.abspath(self.path))
+        os.makedirs(directory, exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=directory, prefix=".manifest-", suffix=".tmp")
+        try:
+            with os.fdopen(fd, "w", encoding="utf-8") as file:
+                json.dump({"files": self.files}, file)
+            os.replace(tmp_path, self.path)
+        except BaseException:
+            os.unlink(tmp_path)
+            raise
@@ -3,11 +3,19 @@ Also, this module contains embedding functions, chunking functions and any other
 
 """
 
+import asyncio
+import hashlib
 import uuid
-from litellm import completion
+from litellm import acompletion, completion
 from services.rag_api.src.core.config import GRAPH_EXTRACTION_PROMPT
+from services.rag_api.src.ingestion.entity_resolution import EntityResolver
+from services.rag_api.src.ingestion.extraction_cache import ExtractionCache
+from services.rag_api.src.ingestion.rate_limiter import RateLimiter, retry_async
 from services.rag_api.src.models.schemas import GraphComponents
 
+# Namespace for chunk UUIDv5s; changing it re-keys every chunk on the next ingest
+CHUNK_NAMESPACE = uuid.UUID("a3d9e2c4-6f1b-4b8e-8c2d-7e5f0a1b9c36")
+
 
 class Orchestrator:
     """
@@ -20,9 +28,27 @@ class Orchestrator:
     - Returning the graph data
     """
 
-    def __init__(self, llm_model: str, llm_api_key: str):
+    def __init__(
+        self,
+        llm_model: str,
+        llm_api_key: str,
+        concurrency: int = 4,
+        requests_per_minute: int | None = None,
+        tokens_per_minute: int | None = None,
+        max_retries: int = 3,
+        cache: ExtractionCache | None = None,
+        resolver: EntityResolver | None = None,
+    ):
         self.llm_model = llm_model
         self.llm_api_key = llm_api_key
+        self.concurrency = max(1, concurrency)
+        self.max_retries = max_retries
+        self.rate_limiter = RateLimiter(
+            requests_per_minute=requests_per_minute,
+            tokens_per_minute=tokens_per_minute,
+        )
+        self.cache = cache
+        self.resolver = resolver or EntityResolver()
 
     def _test_response(self, prompt: str) -> str:  # for testing purposes ONLY
         response_test = completion(
@@ -54,89 +80,182 @@ class Orchestrator:
             api_key=self.llm_api_key,
             response_format=GraphComponents,  # notice that this is a json_object, not a json_schema
             # some models require "response_format" to be a json_schema, not a json_schema - check LITELLM docs for more details
-            messages=[
-                {"role": "system", "content": GRAPH_EXTRACTION_PROMPT},
-                {"role": "user", "content": prompt},
-            ],
+            messages=self._build_messages(prompt),
         )
 
         return GraphComponents.model_validate_json(response.choices[0].message.content)
 
-    def extract_graph_components(self, raw_text) -> tuple[dict, list, dict]:
+    async def allm_parser(self, prompt) -> GraphComponents:
         """
-        This function extracts the graph components from the raw text.
+        Async version of `llm_parser`, throttled by the rate limiter and retried
+        with backoff on transient provider errors.
 
         Args:
-            raw_text: The raw text to extract the graph components from.
+            prompt: The prompt to send to the LLM.
 
         Returns:
-            nodes: A dictionary of nodes.
-            relationships: A list of relationships.
-            chunk_node_mapping: A dictionary mapping chunk UUIDs to chunk data and entity IDs.
+            GraphComponents: The parsed graph components.
         """
-        nodes = {}
-        relationships = []
-        chunk_node_mapping = {}  # Track which entities appear in which chunks
+        messages = self._build_messages(prompt)
+        # Rough token estimate (~4 chars per token) for the TPM budget
+        estimated_tokens = sum(len(m["content"]) for m in messages) // 4
+
+        async def _call():
+            await self.rate_limiter.acquire(estimated_tokens)
+            return await acompletion(
+                model=self.llm_model,
+                api_key=self.llm_api_key,
+                response_format=GraphComponents,
+                messages=messages,
+            )
+
+        response = await retry_async(_call, max_retries=self.max_retries)
+        return GraphComponents.model_validate_json(response.choices[0].message.content)
+
+    @staticmethod
+    def _build_messages(prompt: str) -> list[dict]:
+        return [
+            {"role": "system", "content": GRAPH_EXTRACTION_PROMPT},
+            {"role": "user", "content": prompt},
+        ]
+
+    @staticmethod
+    def _chunk_prompt(text: str) -> str:
+        return f"Extract nodes and relationships from the following text:\n{text}"
+
+    def _cache_key(self, text: str) -> str:
+        return ExtractionCache.make_key(text, GRAPH_EXTRACTION_PROMPT, self.llm_model)
+
+    def parse_chunk(self, text: str) -> GraphComponents:
+        """
+        Extract graph components for one chunk, consulting the extraction cache first.
 
-        # Normalize input into iterable chunks
+        Args:
+            text: The chunk text.
+
+        Returns:
+            GraphComponents: The parsed graph components.
+        """
+        if self.cache is None:
+            return self.llm_parser(self._chunk_prompt(text))
+
+        key = self._cache_key(text)
+        cached = self.cache.get(key)
+        if cached is not None:
+            return cached
+        parsed = self.llm_parser(self._chunk_prompt(text))
+        self.cache.put(key, parsed)
+        return parsed
+
+    async def aparse_chunk(self, text: str) -> GraphComponents:
+        """Async version of `parse_chunk`."""
+        if self.cache is None:
+            return await self.allm_parser(self._chunk_prompt(text))
+
+        # The SQLite cache (lock, commit, eviction) runs off the event loop, so a
+        # lookup does not stall the other chunks' extractions
+        key = self._cache_key(text)
+        cached = await asyncio.to_thread(self.cache.get, key)
+        if cached is not None:
+            return cached
+        parsed = await self.allm_parser(self._chunk_prompt(text))
+        await asyncio.to_thread(self.cache.put, key, parsed)
+        return parsed
+
+    @staticmethod
+    def chunk_id(source: str | None, content_hash: str | None, text: str, chunk_index: int) -> str:
+        """
+        Deterministic chunk ID, a UUIDv5 of the source file, its content hash (or
+        the chunk text's hash when unknown) and the chunk's position. Writing the
+        same file content again (e.g. retrying a batch whose write failed or was
+        cancelled) overwrites its Qdrant points and Chunk nodes instead of
+        duplicating them.
+        """
+        version = content_hash or hashlib.sha256(text.encode("utf-8")).hexdigest()
+        return str(uuid.uuid5(CHUNK_NAMESPACE, f"{source}\x00{version}\x00{chunk_index}"))
+
+    @staticmethod
+    def _normalize_chunks(raw_text) -> list[dict]:
+        """
+        Normalize a string or chunked-data list into
+        [{"text": ..., "source": ..., "content_hash": ...}].
+        """
         chunks_to_process = []
 
         if isinstance(raw_text, str):
-            chunks_to_process.append({"text": raw_text, "source": None})
+            chunks_to_process.append({"text": raw_text, "source": None, "content_hash": None})
         elif isinstance(raw_text, list):
             for entry in raw_text:
                 if isinstance(entry, dict) and "chunks" in entry:
                     for chunk in entry["chunks"]:
                         chunks_to_process.append(
-                            {"text": chunk, "source": entry.get("file")}
+                            {
+                                "text": chunk,
+                                "source": entry.get("file"),
+                                "content_hash": entry.get("content_hash"),
+                            }
                         )
                 else:
-                    chunks_to_process.append({"text": entry, "source": None})
+                    chunks_to_process.append({"text": entry, "source": None, "content_hash": None})
         else:
             raise ValueError("raw_text must be a string or list of chunks.")
 
-        for idx, chunk in enumerate(chunks_to_process):
-            chunk_id = str(uuid.uuid4())  # Generate UUID for this chunk
+        return chunks_to_process
+
+    def _merge_graph_components(
+        self, chunks_to_process: list[dict], parsed_responses: list[GraphComponents]
+    ) -> tuple[dict, list, dict]:
+        """
+        Merge per-chunk LLM results into nodes, relationships and chunk mapping.
+        Results are merged in chunk order, so the output does not depend on the
+        order in which the LLM calls completed. Entity names are resolved to
+        canonical entities with stable IDs, so `nodes` maps each canonical name
+        to an ID that is the same across ingestion runs.
+        """
+        mentions = [
+            name
+            for parsed in parsed_responses
+            for entry in parsed.graph
+            for name in (entry.node, entry.target_node)
+            if name
+        ]
+        resolved = self.resolver.resolve(mentions)
+
+        nodes = {}
+        relationships = []
+        chunk_node_mapping = {}  # Track which entities appear in which chunks
+        chunk_counts: dict = {}  # Per-file chunk position, matching the Qdrant payload
+
+        for chunk, parsed in zip(chunks_to_process, parsed_responses):
+            chunk_index = chunk_counts.get(chunk["source"], 0)
+            chunk_counts[chunk["source"]] = chunk_index + 1
+            chunk_id = self.chunk_id(
+                chunk["source"], chunk["content_hash"], chunk["text"], chunk_index
+            )
             chunk_node_mapping[chunk_id] = {
                 "text": chunk["text"],
                 "source_file": chunk["source"],
-                "chunk_index": idx,
+                "chunk_index": chunk_index,
                 "entity_ids": [],  # Track entities mentioned in this chunk
             }
 
-            system_prompt = (
-                "Extract nodes and relationships from the following text:\n"
-                f"{chunk['text']}"
-            )
-
-            parsed_response = self.llm_parser(system_prompt).graph
-
-            for entry in parsed_response:
-                node = entry.node
-                target_node = entry.target_node
+            for entry in parsed.graph:
+                source = resolved.get(entry.node)
+                target = resolved.get(entry.target_node)
                 relationship = entry.relationship
 
-                if node and node not in nodes:
-                    nodes[node] = str(uuid.uuid4())
+                # Add entities to the node table and to this chunk's entity list
+                for entity in (source, target):
+                    if entity:
+                        entity_id, canonical_name = entity
+                        nodes.setdefault(canonical_name, entity_id)
+                        chunk_node_mapping[chunk_id]["entity_ids"].append(entity_id)
 
-                # Add entity to this chunk's entity list
-                if node:
-                    chunk_node_mapping[chunk_id]["entity_ids"].append(nodes[node])
-
-                if target_node and target_node not in nodes:
-                    nodes[target_node] = str(uuid.uuid4())
-
-                # Add target entity to this chunk's entity list
-                if target_node:
-                    chunk_node_mapping[chunk_id]["entity_ids"].append(
-                        nodes[target_node]
-                    )
-
-                if target_node and relationship:
+                if source and target and relationship:
                     relationships.append(
                         {
-                            "source": nodes[node],
-                            "target": nodes[target_node],
+                            "source": source[0],
+                            "target": target[0],
                             "type": relationship,
                             "source_file": chunk.get("source"),
                         }
@@ -144,6 +263,75 @@ class Orchestrator:
 
         return nodes, relationships, chunk_node_mapping
 
+    def extract_graph_components(self, raw_text) -> tuple[dict, list, dict]:
+        """
+        This function extracts the graph components from the raw text.
+
+        Args:
+            raw_text: The raw text to extract the graph components from.
+
+        Returns:
+            nodes: A dictionary of nodes.
+            relationships: A list of relationships.
+            chunk_node_mapping: A dictionary mapping chunk UUIDs to chunk data and entity IDs.
+        """
+        chunks_to_process = self._normalize_chunks(raw_text)
+
+        parsed_responses = [
+            self.parse_chunk(chunk["text"]) for chunk in chunks_to_process
+        ]
+
+        return self._merge_graph_components(chunks_to_process, parsed_responses)
+
+    async def aextract_graph_components(self, raw_text) -> tuple[dict, list, dict]:
+        """
+        Concurrent version of `extract_graph_components`.
+
+        A pool of `concurrency` workers pulls chunks from a queue and calls
+        `allm_parser`; results are stored by chunk position and merged once all
+        workers finish, so the output is identical to the serial path.
+
+        Args:
+            raw_text: The raw text to extract the graph components from.
+
+        Returns:
+            nodes: A dictionary of nodes.
+            relationships: A list of relationships.
+            chunk_node_mapping: A dictionary mapping chunk UUIDs to chunk data and entity IDs.
+        """
+        chunks_to_process = self._normalize_chunks(raw_text)
+        parsed_responses: list[GraphComponents | None] = [None] * len(chunks_to_process)
+
+        queue: asyncio.Queue = asyncio.Queue()
+        for idx, chunk in enumerate(chunks_to_process):
+            queue.put_nowait((idx, chunk))
+
+        async def worker():
+            while True:
+                try:
+                    idx, chunk = queue.get_nowait()
+                except asyncio.QueueEmpty:
+                    return
+                parsed_responses[idx] = await self.aparse_chunk(chunk["text"])
+
+        workers = [
+            asyncio.create_task(worker())
+            for _ in range(min(self.concurrency, len(chunks_to_process)))
+        ]
+        try:
+            await asyncio.gather(*workers)
+        except BaseException:
+            # One chunk failed for good (or we were cancelled): stop the others
+            for task in workers:
+                task.cancel()
+            await asyncio.gather(*workers, return_exceptions=True)
+            raise
+
+        # Entity resolution may call the embedding provider; keep it off the event loop
+        return await asyncio.to_thread(
+            self._merge_graph_components, chunks_to_process, parsed_responses
+        )
+
 
 if __name__ == "__main__":
     import os
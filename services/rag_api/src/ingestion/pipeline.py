@@ -0,0 +1,197 @@
+"""
+Streaming ingestion pipeline.
+Files flow through three concurrent stages connected by bounded queues:
+chunk (one file at a time) -> embed + extract (per batch) -> write to Qdrant
+and Neo4j (per batch). A stage blocks when the queue in front of it is full,
+so at most `queue_size` batches per stage are held in memory no matter how
+large the corpus is, and the manifest records each file as soon as its batch
+is written. Chunk IDs are derived from each file's path, content hash and
+chunk position, so a batch written to only one store (a failed or cancelled
+write) is overwritten, not duplicated, when the next run ingests it again.
+"""
+
+import asyncio
+import os
+
+from dotenv import load_dotenv
+
+load_dotenv()
+
+# Marks the end of the stream on a stage queue
+_DONE = object()
+
+
+class IngestionPipeline:
+    """
+    This class is responsible for streaming changed files through chunking,
+    embedding, graph extraction and storage in bounded batches.
+    """
+
+    def __init__(
+        self,
+        chunker,
+        orchestrator,
+        qdrant_client,
+        neo4j_client,
+        collection_name: str = "QdrantRagCollection",
+        manifest=None,
+        file_stats: dict | None = None,
+        batch_chunks: int = int(os.getenv("INGEST_BATCH_CHUNKS", 256)),
+        queue_size: int = int(os.getenv("INGEST_QUEUE_SIZE", 2)),
+        entity_index=None,
+    ):
+        """
+        Args:
+            chunker: ChunkerEmbedder built with the files to ingest.
+            orchestrator: Orchestrator used for graph extraction.
+            qdrant_client: QdrantOrchestrator (collection already created).
+            neo4j_client: Neo4jOrchestrator.
+            collection_name: Qdrant collection to write to.
+            manifest: Optional IngestionManifest; each file is recorded (and the
+                      manifest saved) once its batch is in both stores.
+            file_stats: Manifest stats per path, from `IngestionManifest.diff`.
+            batch_chunks: A batch is closed once it holds at least this many chunks
+                          (whole files are never split across batches).
+            queue_size: Batches buffered between two stages.
+            entity_index: Optional EntityNameIndex, extended with each batch's
+                          entities once they are in Neo4j.
+        """
+        self.chunker = chunker
+        self.orchestrator = orchestrator
+        self.qdrant_client = qdrant_client
+        self.neo4j_client = neo4j_client
+        self.collection_name = collection_name
+        self.manifest = manifest
+        self.file_stats = file_stats or {}
+        self.batch_chunks = max(1, batch_chunks)
+        self.queue_size = max(1, queue_size)
+        self.entity_index = entity_index
+
+        self._entity_ids: set[str] = set()
+        self.progress = {
+            "files_read": 0,
+            "files_written": 0,
+            "files_failed": 0,
+            "chunks_read": 0,
+            "chunks_embedded": 0,
+            "chunks_extracted": 0,
+            "points_upserted": 0,
+            "batches_written": 0,
+            "nodes_created": 0,
+            "relationships_created": 0,
+        }
+
+    async def run(self) -> dict:
+        """
+        Run every stage until the chunker is exhausted.
+        If a stage fails, the other stages are cancelled and the error is raised;
+        files of batches already written stay recorded in the manifest.
+
+        Returns:
+            The final progress counters.
+        """
+        chunk_queue: asyncio.Queue = asyncio.Queue(maxsize=self.queue_size)
+        write_queue: asyncio.Queue = asyncio.Queue(maxsize=self.queue_size)
+
+        try:
+            async with asyncio.TaskGroup() as group:
+                group.create_task(self._chunk_stage(chunk_queue))
+                group.create_task(self._process_stage(chunk_queue, write_queue))
+                group.create_task(self._write_stage(write_queue))
+        except ExceptionGroup as group_error:
+            # Surface the first real failure rather than the group wrapper
+            raise group_error.exceptions[0]
+
+        return dict(self.progress)
+
+    async def _chunk_stage(self, out_queue: asyncio.Queue):
+        """Chunk files one at a time (off the event loop) and emit batches."""
+        files = self.chunker.iter_chunks()
+        batch: list[dict] = []
+        batch_size = 0
+
+        try:
+            while True:
+                item = await asyncio.to_thread(next, files, None)
+                if item is None:
+                    break
+                path, file_data = item
+                self.progress["files_read"] += 1
+                if "error" in file_data:
+                    # Left out of the manifest, so the next run retries it
+                    self.progress["files_failed"] += 1
+                    continue
+                # The content hash keys the file's chunk IDs
+                stat = self.file_stats.get(path) or {}
+                batch.append({**file_data, "path": path, "content_hash": stat.get("content_hash")})
+                batch_size += len(file_data["chunks"])
+                self.progress["chunks_read"] += len(file_data["chunks"])
+
+                if batch_size >= self.batch_chunks:
+                    await out_queue.put(batch)
+                    batch, batch_size = [], 0
+        finally:
+            # Stop conversion workers if the run ends early (failure or cancellation)
+            close = getattr(self.chunker, "close", None)
+            if close is not None:
+                close()
+
+        if batch:
+            await out_queue.put(batch)
+        await out_queue.put(_DONE)
+
+    async def _process_stage(self, in_queue: asyncio.Queue, out_queue: asyncio.Queue):
+        """Embed a batch and extract its graph components concurrently."""
+        while (batch := await in_queue.get()) is not _DONE:
+            embedded_data, (nodes, relationships, chunk_node_mapping) = (
+                await asyncio.gather(
+                    self.chunker.aembed_chunks(batch),
+                    self.orchestrator.aextract_graph_components(batch),
+                )
+            )
+            self.progress["chunks_embedded"] += sum(
+                len(entry["chunks"]) for entry in embedded_data
+            )
+            self.progress["chunks_extracted"] += len(chunk_node_mapping)
+            await out_queue.put(
+                (batch, embedded_data, nodes, relationships, chunk_node_mapping)
+            )
+        await out_queue.put(_DONE)
+
+    async def _write_stage(self, in_queue: asyncio.Queue):
+        """Write a batch to both stores, then record its files in the manifest."""
+        while (item := await in_queue.get()) is not _DONE:
+            batch, embedded_data, nodes, relationships, chunk_node_mapping = item
+
+            await asyncio.to_thread(
+                self.qdrant_client.ingest_to_qdrant,
+                self.collection_name,
+                embedded_data,
+                chunk_node_mapping,
+            )
+            await asyncio.to_thread(
+                self.neo4j_client.ingest_to_neo4j, nodes, relationships, chunk_node_mapping
+            )
+
+            if self.entity_index is not None:
+                self.entity_index.add(nodes)
+
+            self._entity_ids.update(nodes.values())
+            self.progress["nodes_created"] = len(self._entity_ids)
+            self.progress["relationships_created"] += len(relationships)
+            self.progress["points_upserted"] += len(chunk_node_mapping)
+            self.progress["files_written"] += len(batch)
+            self.progress["batches_written"] += 1
+
+            if self.manifest is not None:
+                # chunk_node_mapping follows batch order, file by file
+                chunk_ids = list(chunk_node_mapping)
+                offset = 0
+                for file_data in batch:
+                    count = len(file_data["chunks"])
+                    path = file_data["path"]
+                    stat = self.file_stats.get(path)
+                    if stat is not None:
+                        self.manifest.record(path, stat, chunk_ids[offset : offset + count])
+                    offset += count
+                await asyncio.to_thread(self.manifest.save)
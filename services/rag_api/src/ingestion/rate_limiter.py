@@ -0,0 +1,147 @@
+"""
+This module contains the async rate limiter and retry helper shared by the
+concurrent ingestion stages (graph extraction, embedding).
+"""
+
+import asyncio
+import random
+import time
+
+from litellm import (
+    APIConnectionError,
+    BadGatewayError,
+    InternalServerError,
+    RateLimitError,
+    ServiceUnavailableError,
+    Timeout,
+)
+
+# Provider errors that are worth retrying with backoff
+TRANSIENT_LLM_ERRORS = (
+    APIConnectionError,
+    BadGatewayError,
+    InternalServerError,
+    RateLimitError,
+    ServiceUnavailableError,
+    Timeout,
+)
+
+
+class RateLimiter:
+    """
+    Token-bucket limiter for requests-per-minute and tokens-per-minute budgets.
+    A limit of 0 (or None) disables that budget.
+    """
+
+    def __init__(
+        self,
+        requests_per_minute: int | None = None,
+        tokens_per_minute: int | None = None,
+    ):
+        self.requests_per_minute = requests_per_minute or 0
+        self.tokens_per_minute = tokens_per_minute or 0
+
+        self._request_allowance = float(self.requests_per_minute)
+        self._token_allowance = float(self.tokens_per_minute)
+        self._last_refill = time.monotonic()
+        self._lock = asyncio.Lock()
+
+    @property
+    def enabled(self) -> bool:
+        return bool(self.requests_per_minute or self.tokens_per_minute)
+
+    def _refill(self):
+        now = time.monotonic()
+        elapsed = now - self._last_refill
+        self._last_refill = now
+
+        if self.requests_per_minute:
+            self._request_allowance = min(
+                float(self.requests_per_minute),
+                self._request_allowance + elapsed * self.requests_per_minute / 60,
+            )
+        if self.tokens_per_minute:
+            self._token_allowance = min(
+                float(self.tokens_per_minute),
+                self._token_allowance + elapsed * self.tokens_per_minute / 60,
+            )
+
+    async def acquire(self, tokens: int = 0):
+        """
+        Wait until one request of `tokens` estimated tokens fits in the budget.
+
+        Args:
+            tokens: Estimated tokens consumed by the request.
+        """
+        if not self.enabled:
+            return
+
+        # A single request larger than the whole bucket would otherwise wait forever
+        if self.tokens_per_minute:
+            tokens = min(tokens, self.tokens_per_minute)
+
+        # Holding the lock while sleeping hands out capacity in FIFO order
+        async with self._lock:
+            while True:
+                self._refill()
+
+                wait = 0.0
+                if self.requests_per_minute and self._request_allowance < 1:
+                    wait = max(
+                        wait,
+                        (1 - self._request_allowance) * 60 / self.requests_per_minute,
+                    )
+                if self.tokens_per_minute and self._token_allowance < tokens:
+                    wait = max(
+                        wait,
+                        (tokens - self._token_allowance) * 60 / self.tokens_per_minute,
+                    )
+
+                if wait <= 0:
+                    if self.requests_per_minute:
+                        self._request_allowance -= 1
+                    if self.tokens_per_minute:
+                        self._token_allowance -= tokens
+                    return
+
+                await asyncio.sleep(wait)
+
+
+async def retry_async(
+    func,
+    *args,
+    max_retries: int = 3,
+    base_delay: float = 1.0,
+    max_delay: float = 30.0,
+    retry_on: tuple = TRANSIENT_LLM_ERRORS,
+    **kwargs,
+):
+    """
+    Await `func(*args, **kwargs)`, retrying transient failures with jittered
+    exponential backoff.
+
+    Args:
+        func: Coroutine function to call.
+        max_retries: Number of retries after the first attempt.
+        base_delay: Delay in seconds before the first retry.
+        max_delay: Upper bound for a single backoff delay.
+        retry_on: Exception types that trigger a retry.
+
+    Returns:
+        Whatever `func` returns.
+    """
+    attempt = 0
+    while True:
+        try:
+            return await func(*args, **kwargs)
+        except retry_on as exc:
+            if attempt >= max_retries:
+                raise
+            delay = min(max_delay, base_delay * 2**attempt)
+            delay *= 0.5 + random.random() / 2
+            attempt += 1
+            print(
+                f"Transient error ({type(exc).__name__}), "
+                f"retry {attempt}/{max_retries} in {delay:.1f}s"
+            )
+            await asyncio.sleep(delay)
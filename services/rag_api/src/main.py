@@ -3,12 +3,15 @@ FastAPI backend for the Graph RAG system.
 """
 
 import asyncio
+import json
 import os
+import re
 import sys
 from pathlib import Path
 from contextlib import asynccontextmanager
 
-from fastapi import FastAPI, HTTPException
+from fastapi import FastAPI, Header, HTTPException
+from fastapi.responses import StreamingResponse
 from fastapi.middleware.cors import CORSMiddleware
 from pydantic import BaseModel
 from dotenv import load_dotenv
@@ -19,8 +22,21 @@ sys.path.insert(0, str(project_root))
 
 from services.rag_api.src.core.config import AGENT_SYSTEM_PROMPT
 from services.rag_api.src.models.responses import AgentResponse
-from services.rag_api.src.core.retrieval import retrieve_knowledge
+from services.rag_api.src.models.schemas import RetrievalOptions
+from services.rag_api.src.core.retrieval import (
+    context_packer,
+    get_embedding,
+    is_tool_error,
+    query_embedding_cache,
+    retrieve_knowledge,
+)
+from services.rag_api.src.core.answer_cache import answer_cache
+from services.rag_api.src.core.answer_stream import AnswerStreamer
+from services.rag_api.src.core.entity_index import entity_index
+from services.rag_api.src.core.instrumentation import instrumentation
 from services.rag_api.src.api.v1.ingest import router as ingest_router
+from services.rag_api.src.ingestion.jobs import ingestion_jobs
+from services.rag_api.src.storage.clients import clients
 
 from agents import Agent, Runner, set_tracing_disabled
 from agents.extensions.models.litellm_model import LitellmModel
@@ -37,7 +53,7 @@ agent = None
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
-    """Initialize resources on startup."""
+    """Initialize resources on startup and release them on shutdown."""
     global agent
     
     model = os.getenv("LLM_MODEL")
@@ -50,9 +66,17 @@ async def lifespan(app: FastAPI):
         tools=[retrieve_knowledge],
     )
     
+    # Warm the shared Neo4j/Qdrant connection pools
+    await asyncio.to_thread(clients.start)
+    await clients.astart()
+    # Load the entity name index now rather than inside the first chat request
+    await entity_index.warm(clients.async_neo4j_driver)
+    
     print(f"RAG API initialized with model: {model}")
     yield
     print("RAG API shutting down")
+    await ingestion_jobs.shutdown()
+    await clients.aclose()
 
 
 app = FastAPI(
@@ -78,6 +102,8 @@ app.include_router(ingest_router, prefix="/api/v1", tags=["ingestion"])
 # Request/Response models
 class ChatRequest(BaseModel):
     message: str
+    # Overrides of the retrieval defaults for this request only
+    retrieval: RetrievalOptions | None = None
 
 
 class ChatResponse(BaseModel):
@@ -86,16 +112,27 @@ class ChatResponse(BaseModel):
     sources: list[str]
     chunks_retrieved: int
     relationships_found: int
+    cached: bool = False
+    # Retrieval tool calls the agent made for this answer
+    tool_calls: int = 0
+    # Timed spans of this request, returned when the X-Debug-Trace header is set
+    trace: dict | None = None
 
 
 class HealthResponse(BaseModel):
     status: str
     service: str
     model: str
+    dependencies: dict[str, str] | None = None
+    caches: dict[str, dict] | None = None
 
 
 def parse_agent_response(output_str: str) -> dict:
-    """Parse the agent's JSON response into structured data."""
+    """
+    Parse the agent's JSON response into structured data. "parsed" is False
+    when the output was not valid AgentResponse JSON and the raw output is
+    returned as the answer instead.
+    """
     import json
     
     try:
@@ -111,7 +148,8 @@ def parse_agent_response(output_str: str) -> dict:
                 "answer": response.answer,
                 "sources": response.sources,
                 "chunks_retrieved": response.chunks_retrieved,
-                "relationships_found": response.relationships_found
+                "relationships_found": response.relationships_found,
+                "parsed": True,
             }
     except (json.JSONDecodeError, KeyError, TypeError, Exception):
         pass
@@ -121,23 +159,93 @@ def parse_agent_response(output_str: str) -> dict:
         "answer": output_str,
         "sources": [],
         "chunks_retrieved": 0,
-        "relationships_found": 0
+        "relationships_found": 0,
+        "parsed": False,
     }
 
 
+def store_answer(
+    message: str,
+    query_vector: list | None,
+    answer: dict,
+    generation: int,
+    tool_outputs: list[str],
+):
+    """
+    Cache an answer, unless it is the unparsed fallback or a retrieval it used
+    failed (e.g. Qdrant or Neo4j down), so a short outage is not served from
+    the cache for the whole TTL. `answer` is the output of `parse_agent_response`.
+    """
+    if query_vector is None:
+        return
+    if not answer["parsed"]:
+        instrumentation.log("info", "answer_not_cached", reason="unparsed_output")
+        return
+    if any(is_tool_error(output) for output in tool_outputs):
+        instrumentation.log("info", "answer_not_cached", reason="retrieval_failed")
+        return
+    cached = {key: value for key, value in answer.items() if key != "parsed"}
+    answer_cache.store(message, query_vector, cached, generation)
+
+
 @app.get("/api/v1/health", response_model=HealthResponse)
-async def health_check():
-    """Health check endpoint."""
+async def health_check(deep: bool = False):
+    """
+    Health check endpoint. With `deep=true`, also pings Neo4j and Qdrant and
+    reports cache statistics.
+    """
     return HealthResponse(
         status="healthy",
         service="rag-api",
-        model=os.getenv("LLM_MODEL", "unknown")
+        model=os.getenv("LLM_MODEL", "unknown"),
+        dependencies=await clients.ahealth() if deep else None,
+        caches=(
+            {
+                "query_embeddings": query_embedding_cache.stats(),
+                "answers": answer_cache.stats(),
+                "context_packing": context_packer.stats(),
+            }
+            if deep
+            else None
+        ),
     )
 
 
+async def lookup_cached_answer(request: ChatRequest) -> tuple[dict | None, list | None, int]:
+    """
+    Answer semantically identical questions from the answer cache. Requests
+    with their own retrieval options bypass it.
+
+    Returns:
+        (cached response or None, query embedding for storing the answer later
+        (None if the cache is off or failed), corpus generation before answering)
+    """
+    generation = answer_cache.generation
+    if not answer_cache.enabled or request.retrieval is not None:
+        return None, None, generation
+    try:
+        query_vector = await get_embedding(request.message)
+        return answer_cache.lookup(request.message, query_vector), query_vector, generation
+    except Exception as e:
+        instrumentation.warning("answer_cache_lookup_failed", error=str(e))
+        return None, None, generation
+
+
+async def traced_cache_lookup(request: ChatRequest) -> tuple[dict | None, list | None, int]:
+    """`lookup_cached_answer`, recorded as a span of the request's trace."""
+    with instrumentation.span("answer_cache_lookup") as span:
+        cached, query_vector, generation = await lookup_cached_answer(request)
+        span.set(hit=cached is not None)
+        return cached, query_vector, generation
+
+
 @app.post("/api/v1/chat", response_model=ChatResponse)
-async def chat(request: ChatRequest):
-    """Chat endpoint - send a message and get a response."""
+async def chat(request: ChatRequest, x_debug_trace: str | None = Header(default=None)):
+    """
+    Chat endpoint - send a message and get a response.
+    With `X-Debug-Trace: 1` (or `debug`, which adds previews of the retrieved
+    data) the response carries the request's timed spans.
+    """
     global agent
     
     if not request.message.strip():
@@ -146,13 +254,132 @@ async def chat(request: ChatRequest):
     if agent is None:
         raise HTTPException(status_code=503, detail="Agent not initialized")
     
-    try:
-        result = await Runner.run(agent, request.message)
-        response = parse_agent_response(str(result.final_output))
-        return ChatResponse(**response)
-        
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=str(e))
+    trace_level = instrumentation.requested_level(x_debug_trace)
+    with instrumentation.trace("chat", level=trace_level, message_chars=len(request.message)) as trace:
+        cached, query_vector, generation = await traced_cache_lookup(request)
+        if cached is not None:
+            response = ChatResponse(**cached, cached=True)
+        else:
+            try:
+                with instrumentation.span("agent_run"):
+                    result = await Runner.run(agent, request.message, context=request.retrieval)
+                answer = parse_agent_response(str(result.final_output))
+                tool_outputs = [
+                    str(item.output)
+                    for item in result.new_items
+                    if item.type == "tool_call_output_item"
+                ]
+                store_answer(request.message, query_vector, answer, generation, tool_outputs)
+                tool_calls = sum(item.type == "tool_call_item" for item in result.new_items)
+                response = ChatResponse(**answer, tool_calls=tool_calls)
+
+            except Exception as e:
+                raise HTTPException(status_code=500, detail=str(e))
+
+    if trace_level is not None and trace is not None:
+        response.trace = trace.to_dict()
+    return response
+
+
+# Citations in the retrieval tool's context, e.g. "[Source: a.pdf, Chunk 3]"
+_CITATION = re.compile(r"\[Source: (.+?), Chunk (.+?)\]")
+
+
+def sse_event(event: str, data: dict) -> str:
+    """Format one server-sent event."""
+    return f"event: {event}\ndata: {json.dumps(data)}\n\n"
+
+
+async def stream_chat_events(request: ChatRequest, trace_level: str | None = None):
+    """
+    Run the agent with streaming and yield server-sent events:
+    `retrieval` (a tool call started, with its query), `tool_result` (the
+    sources and size of the retrieved context), `token` (answer text as it is
+    generated), then `done` (the structured ChatResponse) or `error`.
+    With a `trace_level` (debug header), `done` also carries the trace so far.
+    """
+    with instrumentation.trace(
+        "chat_stream", level=trace_level, message_chars=len(request.message)
+    ) as trace:
+        message = request.message
+        cached, query_vector, generation = await traced_cache_lookup(request)
+        if cached is not None:
+            response = ChatResponse(**cached, cached=True)
+            if trace_level is not None and trace is not None:
+                response.trace = trace.to_dict()
+            yield sse_event("token", {"text": cached["answer"]})
+            yield sse_event("done", response.model_dump())
+            return
+
+        result = Runner.run_streamed(agent, message, context=request.retrieval)
+        streamer = AnswerStreamer()
+        tool_calls = 0
+        tool_outputs = []
+        try:
+            async for event in result.stream_events():
+                if event.type == "raw_response_event":
+                    if getattr(event.data, "type", None) == "response.output_text.delta":
+                        text = streamer.feed(event.data.delta)
+                        if text:
+                            yield sse_event("token", {"text": text})
+                elif event.type == "run_item_stream_event":
+                    if event.name == "tool_called":
+                        tool_calls += 1
+                        raw_item = event.item.raw_item
+                        try:
+                            arguments = json.loads(getattr(raw_item, "arguments", "") or "{}")
+                        except json.JSONDecodeError:
+                            arguments = {}
+                        yield sse_event(
+                            "retrieval",
+                            {"tool": getattr(raw_item, "name", None), "query": arguments.get("query")},
+                        )
+                    elif event.name == "tool_output":
+                        output = str(event.item.output)
+                        tool_outputs.append(output)
+                        yield sse_event(
+                            "tool_result",
+                            {
+                                "sources": [
+                                    f"{source}, Chunk {chunk}"
+                                    for source, chunk in dict.fromkeys(_CITATION.findall(output))
+                                ],
+                                "context_chars": len(output),
+                            },
+                        )
+                    elif event.name == "message_output_created":
+                        # Each agent turn writes a new message; decode the next one from its start
+                        streamer = AnswerStreamer()
+
+            answer = parse_agent_response(str(result.final_output))
+            store_answer(message, query_vector, answer, generation, tool_outputs)
+            response = ChatResponse(**answer, tool_calls=tool_calls)
+            if trace_level is not None and trace is not None:
+                response.trace = trace.to_dict()
+            yield sse_event("done", response.model_dump())
+        except Exception as e:
+            yield sse_event("error", {"detail": str(e)})
+        finally:
+            # Stop the agent run if the client went away mid-stream
+            result.cancel()
+
+
+
+@app.post("/api/v1/chat/stream")
+async def chat_stream(request: ChatRequest, x_debug_trace: str | None = Header(default=None)):
+    """Chat endpoint streaming the answer as server-sent events (see stream_chat_events)."""
+    if not request.message.strip():
+        raise HTTPException(status_code=400, detail="Message cannot be empty")
+
+    if agent is None:
+        raise HTTPException(status_code=503, detail="Agent not initialized")
+
+    return StreamingResponse(
+        stream_chat_events(request, instrumentation.requested_level(x_debug_trace)),
+        media_type="text/event-stream",
+        # Ask proxies (nginx ingress) not to buffer the stream
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
 
 
 @app.get("/")
@@ -13,5 +13,39 @@ class GraphComponents(BaseModel):
     graph: list[Single]
 
 
+class RetrievedChunk(BaseModel):
+    """A chunk returned by vector search, read straight from the Qdrant payload."""
+    id: str = Field(description="The chunk UUID (shared by the Qdrant point and the Neo4j Chunk node).")
+    text: str = Field(description="The full chunk text.")
+    source_file: str = Field(default="Unknown", description="The file the chunk was taken from.")
+    chunk_index: int | str = Field(default="?", description="Position of the chunk within its file.")
+    score: float = Field(default=0.0, description="Similarity score from the vector search.")
+
+
+class RetrievalOptions(BaseModel):
+    """Per-request retrieval settings; unset fields use the server defaults (RERANK_* settings)."""
+    top_k: int | None = Field(default=None, ge=1, le=50, description="Chunks returned per tool call.")
+    rerank: bool | None = Field(default=None, description="Rerank over-fetched candidates with MMR and the graph signal.")
+    candidates: int | None = Field(default=None, ge=1, le=20, description="Candidates fetched per returned chunk when reranking.")
+    mmr_lambda: float | None = Field(default=None, ge=0, le=1, description="MMR trade-off: 1 = relevance only, 0 = diversity only.")
+    graph_weight: float | None = Field(default=None, ge=0, le=1, description="Weight of the query-entity mentions in a chunk's relevance.")
+
+
+class PackedContext(BaseModel):
+    """The retrieved context selected for the prompt, with its token accounting."""
+    chunks: list[RetrievedChunk] = Field(description="Merged, deduplicated chunks that fit the budget, best first.")
+    relationships: list[str] = Field(description="Graph relationships that fit the budget.")
+    tokens: int = Field(default=0, description="Tokens of the packed context.")
+    tokens_before: int = Field(default=0, description="Tokens the unpacked context would have used.")
+    tokens_saved: int = Field(default=0, description="tokens_before - tokens.")
+    merged_chunks: int = Field(default=0, description="Chunks merged into a consecutive neighbour.")
+    duplicate_chunks: int = Field(default=0, description="Near-duplicate chunks dropped.")
+    dropped_chunks: int = Field(default=0, description="Chunks left out by the budget.")
+    dropped_relationships: int = Field(default=0, description="Relationships left out by the budget.")
+
+    def report(self) -> dict:
+        return self.model_dump(exclude={"chunks", "relationships"})
+
+
 if __name__ == "__main__":
     print(GraphComponents.model_json_schema())
\ No newline at end of file
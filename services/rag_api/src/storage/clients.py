@@ -0,0 +1,190 @@
+"""
+This module holds the process-wide Neo4j drivers and Qdrant clients.
+They are created once (in the FastAPI lifespan, or lazily on first use) and
+shared by retrieval, ingestion and the admin stats, so connection pools,
+bolt handshakes and routing tables are reused across requests.
+The sync clients serve ingestion and the admin stats; the async ones serve the
+retrieval pipeline, which runs on the API's event loop.
+"""
+
+import os
+import threading
+import warnings
+
+from dotenv import load_dotenv
+from neo4j import AsyncGraphDatabase, GraphDatabase
+from qdrant_client import AsyncQdrantClient, QdrantClient
+
+# Suppress Qdrant insecure connection warning
+warnings.filterwarnings("ignore", message="Api key is used with an insecure connection")
+
+load_dotenv()
+
+
+class ClientRegistry:
+    """
+    This class is responsible for creating, health-checking and closing the
+    shared database clients.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._neo4j_driver = None
+        self._qdrant_client = None
+        self._async_neo4j_driver = None
+        self._async_qdrant_client = None
+
+    @staticmethod
+    def neo4j_settings() -> dict:
+        return {
+            "uri": f"{os.getenv('NEO4J_URL')}:{os.getenv('NEO4J_BOLT_PORT')}",
+            "auth": tuple(os.getenv("NEO4J_AUTH", "neo4j/password").split("/")),
+            "max_connection_pool_size": int(os.getenv("NEO4J_POOL_SIZE", 50)),
+            "connection_acquisition_timeout": float(
+                os.getenv("NEO4J_ACQUISITION_TIMEOUT", 60)
+            ),
+            "max_connection_lifetime": float(
+                os.getenv("NEO4J_MAX_CONNECTION_LIFETIME", 3600)
+            ),
+        }
+
+    @staticmethod
+    def qdrant_settings() -> dict:
+        return {
+            "url": f"{os.getenv('QDRANT_URL')}:{os.getenv('QDRANT_HTTP_PORT', '6333')}",
+            "api_key": os.getenv("QDRANT_API_KEY"),
+            "pool_size": int(os.getenv("QDRANT_POOL_SIZE", 16)),
+            "timeout": int(os.getenv("QDRANT_TIMEOUT", 30)),
+            # gRPC is markedly faster for bulk upserts of large vectors
+            "prefer_grpc": os.getenv("QDRANT_PREFER_GRPC", "false").lower() == "true",
+            "grpc_port": int(os.getenv("QDRANT_GRPC_PORT", 6334)),
+        }
+
+    @property
+    def neo4j_driver(self):
+        """The shared Neo4j driver (created on first use)."""
+        if self._neo4j_driver is None:
+            with self._lock:
+                if self._neo4j_driver is None:
+                    settings = self.neo4j_settings()
+                    uri = settings.pop("uri")
+                    self._neo4j_driver = GraphDatabase.driver(uri, **settings)
+        return self._neo4j_driver
+
+    @property
+    def qdrant_client(self) -> QdrantClient:
+        """The shared Qdrant client (created on first use)."""
+        if self._qdrant_client is None:
+            with self._lock:
+                if self._qdrant_client is None:
+                    self._qdrant_client = QdrantClient(**self.qdrant_settings())
+        return self._qdrant_client
+
+    @property
+    def async_neo4j_driver(self):
+        """The shared async Neo4j driver (created on first use)."""
+        if self._async_neo4j_driver is None:
+            with self._lock:
+                if self._async_neo4j_driver is None:
+                    settings = self.neo4j_settings()
+                    uri = settings.pop("uri")
+                    self._async_neo4j_driver = AsyncGraphDatabase.driver(uri, **settings)
+        return self._async_neo4j_driver
+
+    @property
+    def async_qdrant_client(self) -> AsyncQdrantClient:
+        """The shared async Qdrant client (created on first use)."""
+        if self._async_qdrant_client is None:
+            with self._lock:
+                if self._async_qdrant_client is None:
+                    self._async_qdrant_client = AsyncQdrantClient(**self.qdrant_settings())
+        return self._async_qdrant_client
+
+    def use(
+        self,
+        neo4j_driver=None,
+        qdrant_client=None,
+        async_neo4j_driver=None,
+        async_qdrant_client=None,
+    ):
+        """
+        Install already built clients (e.g. local stand-ins for benchmarks) in
+        place of the ones created from the environment.
+        """
+        with self._lock:
+            self._neo4j_driver = neo4j_driver or self._neo4j_driver
+            self._qdrant_client = qdrant_client or self._qdrant_client
+            self._async_neo4j_driver = async_neo4j_driver or self._async_neo4j_driver
+            self._async_qdrant_client = async_qdrant_client or self._async_qdrant_client
+
+    def start(self):
+        """
+        Create the clients and warm their connection pools.
+        Connectivity problems are reported, not raised, so the API can start
+        before the databases are ready.
+        """
+        health = self.health()
+        for name, status in health.items():
+            print(f"{name} client: {status}")
+        return health
+
+    async def astart(self):
+        """Async counterpart of `start` for the async clients."""
+        health = await self.ahealth()
+        for name, status in health.items():
+            print(f"{name} async client: {status}")
+        return health
+
+    async def ahealth(self) -> dict:
+        """Check each backend through the async clients."""
+        status = {}
+        try:
+            await self.async_neo4j_driver.verify_connectivity()
+            status["neo4j"] = "connected"
+        except Exception as e:
+            status["neo4j"] = f"unavailable: {e}"
+        try:
+            await self.async_qdrant_client.get_collections()
+            status["qdrant"] = "connected"
+        except Exception as e:
+            status["qdrant"] = f"unavailable: {e}"
+        return status
+
+    def health(self) -> dict:
+        """Check each backend with a cheap round trip."""
+        status = {}
+        try:
+            self.neo4j_driver.verify_connectivity()
+            status["neo4j"] = "connected"
+        except Exception as e:
+            status["neo4j"] = f"unavailable: {e}"
+        try:
+            self.qdrant_client.get_collections()
+            status["qdrant"] = "connected"
+        except Exception as e:
+            status["qdrant"] = f"unavailable: {e}"
+        return status
+
+    async def aclose(self):
+        """Close the async clients, then the sync ones."""
+        async_neo4j_driver, self._async_neo4j_driver = self._async_neo4j_driver, None
+        async_qdrant_client, self._async_qdrant_client = self._async_qdrant_client, None
+        if async_neo4j_driver is not None:
+            await async_neo4j_driver.close()
+        if async_qdrant_client is not None:
+            await async_qdrant_client.close()
+        self.close()
+
+    def close(self):
+        """Close the sync clients; the registry can be started again afterwards."""
+        with self._lock:
+            if self._neo4j_driver is not None:
+                self._neo4j_driver.close()
+                self._neo4j_driver = None
+            if self._qdrant_client is not None:
+                self._qdrant_client.close()
+                self._qdrant_client = None
+
+
+# Process-wide registry
+clients = ClientRegistry()
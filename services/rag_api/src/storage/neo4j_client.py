@@ -8,83 +8,208 @@ load_dotenv()
 
 class Neo4jOrchestrator:
     def __init__(
-        self, neo4j_url: str, auth: Tuple[str, str], neo4j_key: str | None = None
+        self,
+        neo4j_url: str,
+        auth: Tuple[str, str],
+        neo4j_key: str | None = None,
+        batch_size: int = int(os.getenv("NEO4J_BATCH_SIZE", 1000)),
+        driver=None,
     ):
-        self.neo4j_client = GraphDatabase.driver(neo4j_url, auth=auth)
+        # Reuse a shared driver (see storage.clients) when one is given
+        self.neo4j_client = driver or GraphDatabase.driver(neo4j_url, auth=auth)
+        self.batch_size = batch_size
+        self._schema_ready = False
+
+    def ensure_schema(self):
+        """
+        Create the uniqueness constraints and indexes the ingestion and retrieval
+        queries rely on. Every statement is idempotent, and it runs once per
+        instance, so batched ingestion does not repeat it for every batch.
+        """
+        if self._schema_ready:
+            return
+        statements = [
+            "CREATE CONSTRAINT entity_id IF NOT EXISTS FOR (e:Entity) REQUIRE e.id IS UNIQUE",
+            "CREATE CONSTRAINT chunk_id IF NOT EXISTS FOR (c:Chunk) REQUIRE c.id IS UNIQUE",
+            "CREATE INDEX entity_name IF NOT EXISTS FOR (e:Entity) ON (e.name)",
+        ]
+        with self.neo4j_client.session() as session:
+            for statement in statements:
+                session.run(statement)
+        self._schema_ready = True
+
+    @staticmethod
+    def sanitize_relationship_type(rel_type: str) -> str:
+        """
+        Neo4j relationship types must be valid identifiers (alphanumeric + underscore).
+        Keep it readable but valid as a Neo4j relationship type.
+        """
+        sanitized_type = rel_type.replace(" ", "_").replace("-", "_").replace(".", "_")
+        sanitized_type = "".join(c for c in sanitized_type if c.isalnum() or c == "_")
+        if not sanitized_type:
+            sanitized_type = "RELATES_TO"  # Fallback if sanitization results in empty string
+        return sanitized_type
+
+    def _write_batches(self, session, query: str, rows: list[dict]):
+        """Send `rows` to an UNWIND query in batches, one explicit transaction per batch."""
+
+        def _write(tx, batch):
+            tx.run(query, rows=batch).consume()
+
+        for start in range(0, len(rows), self.batch_size):
+            session.execute_write(_write, rows[start : start + self.batch_size])
 
     def ingest_to_neo4j(self, nodes, relationships, chunk_node_mapping=None):
         """
         Ingest nodes, relationships, and chunks into Neo4j.
 
+        Rows are sent as parameter lists to UNWIND queries in batches of
+        `batch_size`, each batch in its own transaction. Relationships are
+        grouped by sanitized type, since a Cypher relationship type cannot be
+        parameterized. Every node and edge is written with MERGE, so re-ingesting
+        the same entities and chunks (which keep stable IDs) does not duplicate them.
+
         Args:
             nodes: Dict of entity names to UUIDs
             relationships: List of relationships between entities
             chunk_node_mapping: Dict mapping chunk UUIDs to their content and entities
         """
+        self.ensure_schema()
 
         with self.neo4j_client.session() as session:
-            # 1. Create Entity nodes (EXISTING)
-            for name, node_id in nodes.items():
-                session.run(
-                    "CREATE (n:Entity {id: $id, name: $name})", id=node_id, name=name
-                )
+            # 1. Merge Entity nodes
+            self._write_batches(
+                session,
+                "UNWIND $rows AS row "
+                "MERGE (n:Entity {id: row.id}) ON CREATE SET n.name = row.name",
+                [{"id": node_id, "name": name} for name, node_id in nodes.items()],
+            )
 
-            # 2. Create Chunk nodes (NEW)
+            # 2. Merge Chunk nodes and 3. MENTIONS relationships from Chunk to Entity
             if chunk_node_mapping:
-                for chunk_id, chunk_data in chunk_node_mapping.items():
-                    session.run(
-                        "CREATE (c:Chunk {id: $id, text: $text, source_file: $source_file, chunk_index: $chunk_index})",
-                        id=chunk_id,
-                        text=chunk_data["text"],
-                        source_file=chunk_data["source_file"],
-                        chunk_index=chunk_data["chunk_index"],
-                    )
-
-                    # 3. Create MENTIONS relationships from Chunk to Entity (NEW)
-                    for entity_id in set(
-                        chunk_data["entity_ids"]
-                    ):  # Use set to avoid duplicates
-                        session.run(
-                            "MATCH (c:Chunk {id: $chunk_id}), (e:Entity {id: $entity_id}) "
-                            "CREATE (c)-[:MENTIONS]->(e)",
-                            chunk_id=chunk_id,
-                            entity_id=entity_id,
-                        )
-
-            # 4. Create Entity relationships (EXISTING)
-            # Note: Neo4j relationship types must be valid identifiers (alphanumeric + underscore)
-            # We'll sanitize the relationship type and use it as the actual relationship type
-            for relationship in relationships:
-                rel_type = relationship["type"]
-                # Sanitize relationship type for Neo4j (remove spaces, special chars, make uppercase)
-                # Keep it readable but valid as a Neo4j relationship type
-                sanitized_type = (
-                    rel_type.replace(" ", "_").replace("-", "_").replace(".", "_")
+                self._write_batches(
+                    session,
+                    "UNWIND $rows AS row "
+                    "MERGE (c:Chunk {id: row.id}) "
+                    "SET c.text = row.text, c.source_file = row.source_file, "
+                    "c.chunk_index = row.chunk_index",
+                    [
+                        {
+                            "id": chunk_id,
+                            "text": chunk_data["text"],
+                            "source_file": chunk_data["source_file"],
+                            "chunk_index": chunk_data["chunk_index"],
+                        }
+                        for chunk_id, chunk_data in chunk_node_mapping.items()
+                    ],
                 )
-                sanitized_type = "".join(
-                    c for c in sanitized_type if c.isalnum() or c == "_"
+                self._write_batches(
+                    session,
+                    "UNWIND $rows AS row "
+                    "MATCH (c:Chunk {id: row.chunk_id}) "
+                    "MATCH (e:Entity {id: row.entity_id}) "
+                    "MERGE (c)-[:MENTIONS]->(e)",
+                    [
+                        {"chunk_id": chunk_id, "entity_id": entity_id}
+                        for chunk_id, chunk_data in chunk_node_mapping.items()
+                        # Use a dict to avoid duplicates while keeping order
+                        for entity_id in dict.fromkeys(chunk_data["entity_ids"])
+                    ],
                 )
-                if not sanitized_type:
-                    sanitized_type = (
-                        "RELATES_TO"  # Fallback if sanitization results in empty string
-                    )
-
-                # Use dynamic relationship type with additional metadata
-                query = (
-                    f"MATCH (a:Entity {{id: $source_id}}), (b:Entity {{id: $target_id}}) "
-                    f"CREATE (a)-[:{sanitized_type} {{original_type: $type, source_file: $source_file}}]->(b)"
+
+            # 4. Merge Entity relationships, one UNWIND query per relationship type.
+            # A relationship extracted from several files keeps all of them in
+            # source_files, so retracting one file does not drop it for the others.
+            rows_by_type: dict[str, list[dict]] = {}
+            for relationship in relationships:
+                sanitized_type = self.sanitize_relationship_type(relationship["type"])
+                rows_by_type.setdefault(sanitized_type, []).append(
+                    {
+                        "source_id": relationship["source"],
+                        "target_id": relationship["target"],
+                        "type": relationship["type"],
+                        "source_file": relationship.get("source_file", None),
+                        # Neo4j list properties cannot hold nulls
+                        "source_files": [
+                            f for f in [relationship.get("source_file")] if f is not None
+                        ],
+                    }
                 )
 
-                session.run(
-                    query,
-                    source_id=relationship["source"],
-                    target_id=relationship["target"],
-                    type=rel_type,
-                    source_file=relationship.get("source_file", None),
+            for sanitized_type, rows in rows_by_type.items():
+                self._write_batches(
+                    session,
+                    "UNWIND $rows AS row "
+                    "MATCH (a:Entity {id: row.source_id}) "
+                    "MATCH (b:Entity {id: row.target_id}) "
+                    f"MERGE (a)-[r:`{sanitized_type}` {{original_type: row.type}}]->(b) "
+                    "ON CREATE SET r.source_file = row.source_file, "
+                    "r.source_files = row.source_files "
+                    "ON MATCH SET r.source_files = coalesce(r.source_files, []) + "
+                    "[f IN row.source_files WHERE NOT f IN coalesce(r.source_files, [])]",
+                    rows,
                 )
 
         return nodes
 
+    def delete_chunks(self, chunk_ids, source_files=None):
+        """
+        Retract previously ingested chunks (and their MENTIONS edges).
+
+        The entities the deleted chunks mentioned are looked up first (through the
+        chunk ID constraint), and everything else is scoped to them: a file's
+        relationships only join entities its chunks mentioned, so only their
+        relationships are checked, and only those entities are deleted if nothing
+        else is connected to them. A retraction never scans the whole graph.
+
+        Args:
+            chunk_ids: Chunk UUIDs to delete.
+            source_files: Source files (relative to the raw data folder, as recorded
+                          in source_files) whose entity relationships should be
+                          retracted too. A relationship is deleted once no remaining
+                          file backs it. They are found through the chunks' mentions,
+                          so they are only retracted along with their chunks.
+        """
+        if not chunk_ids:
+            return
+
+        def _delete(tx):
+            record = tx.run(
+                "MATCH (c:Chunk) WHERE c.id IN $chunk_ids "
+                "MATCH (c)-[:MENTIONS]->(e:Entity) "
+                "RETURN collect(DISTINCT e.id) AS entity_ids",
+                chunk_ids=list(chunk_ids),
+            ).single()
+            entity_ids = record["entity_ids"] if record else []
+
+            if source_files and entity_ids:
+                # Both ends of a file's relationships are mentioned by its chunks,
+                # so following outgoing edges of the mentioned entities finds each once
+                tx.run(
+                    "UNWIND $entity_ids AS id "
+                    "MATCH (a:Entity {id: id})-[r]->(:Entity) "
+                    "WHERE any(f IN coalesce(r.source_files, [r.source_file]) WHERE f IN $source_files) "
+                    "SET r.source_files = [f IN coalesce(r.source_files, [r.source_file]) "
+                    "WHERE NOT f IN $source_files] "
+                    "WITH r WHERE size(r.source_files) = 0 "
+                    "DELETE r",
+                    entity_ids=entity_ids,
+                    source_files=list(source_files),
+                ).consume()
+
+            tx.run(
+                "MATCH (c:Chunk) WHERE c.id IN $chunk_ids DETACH DELETE c",
+                chunk_ids=list(chunk_ids),
+            ).consume()
+            tx.run(
+                "UNWIND $entity_ids AS id "
+                "MATCH (e:Entity {id: id}) WHERE NOT (e)--() "
+                "DELETE e",
+                entity_ids=entity_ids,
+            ).consume()
+
+        with self.neo4j_client.session() as session:
+            session.execute_write(_delete)
 
 if __name__ == "__main__":
     NEO4J_URI = f"{os.getenv('NEO4J_URL')}:{os.getenv('NEO4J_BOLT_PORT')}"
@@ -3,12 +3,43 @@ This module handles everything related to Qdrant.
 """
 
 import os
+import random
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+import grpc
+import numpy as np
 from qdrant_client import QdrantClient, models
 from qdrant_client.http.exceptions import UnexpectedResponse
 from dotenv import load_dotenv
 
+from services.rag_api.src.storage.qdrant_profiles import load_profile, quantization_config
+from services.rag_api.src.storage.sparse_encoder import SPARSE_VECTOR_NAME, BM25Encoder
+
 load_dotenv()
 
+# gRPC statuses worth retrying (the equivalents of HTTP 429 and 5xx). The others,
+# e.g. INVALID_ARGUMENT for a wrong vector size or NOT_FOUND, will not heal.
+RETRYABLE_GRPC_CODES = {
+    grpc.StatusCode.UNAVAILABLE,
+    grpc.StatusCode.DEADLINE_EXCEEDED,
+    grpc.StatusCode.RESOURCE_EXHAUSTED,
+    grpc.StatusCode.ABORTED,
+    grpc.StatusCode.INTERNAL,
+    grpc.StatusCode.UNKNOWN,
+}
+
+
+def is_retryable(error: Exception) -> bool:
+    """Whether a failed Qdrant request (REST or gRPC) may succeed if sent again."""
+    if isinstance(error, UnexpectedResponse):
+        # Client errors (bad vector size, missing collection) will not heal
+        return error.status_code is None or error.status_code == 429 or error.status_code >= 500
+    if isinstance(error, grpc.RpcError):
+        code = error.code() if callable(getattr(error, "code", None)) else None
+        return code is None or code in RETRYABLE_GRPC_CODES
+    # Connection errors, timeouts
+    return True
+
 
 class QdrantOrchestrator:
     """
@@ -26,6 +57,12 @@ class QdrantOrchestrator:
         qdrant_url: str,
         collection_name: str = "QdrantRagCollection",
         qdrant_key: str | None = None,
+        client: QdrantClient | None = None,
+        upsert_parallel: int = int(os.getenv("QDRANT_UPSERT_PARALLEL", 4)),
+        upsert_wait: bool = os.getenv("QDRANT_UPSERT_WAIT", "false").lower() == "true",
+        upsert_retries: int = int(os.getenv("QDRANT_UPSERT_RETRIES", 3)),
+        profile: str | dict | None = None,
+        sparse: bool = os.getenv("HYBRID_SEARCH", "true").lower() == "true",
     ):
         """
         Initialize Qdrant client.
@@ -33,87 +70,292 @@ class QdrantOrchestrator:
         Args:
             qdrant_url: Qdrant server URL (e.g., http://localhost:6333)
             qdrant_key: API key (optional, None if no authentication)
+            client: Existing client to reuse (see storage.clients) instead of creating one
+            upsert_parallel: Upsert batches in flight at once during ingestion.
+            upsert_wait: Wait for every batch to be applied; otherwise batches are
+                         only acknowledged and a single barrier waits at the end.
+            upsert_retries: Retries per failed batch (safe, since point IDs are fixed).
+            profile: Collection profile name or resolved settings (see
+                     storage.qdrant_profiles; defaults to QDRANT_PROFILE).
+            sparse: Also store a BM25 sparse vector per chunk, for hybrid retrieval.
         """
-        self.qdrant_client = QdrantClient(url=qdrant_url, api_key=qdrant_key)
+        self.qdrant_client = client or QdrantClient(url=qdrant_url, api_key=qdrant_key)
         self.collection_name = collection_name
+        self.upsert_parallel = max(1, upsert_parallel)
+        self.upsert_wait = upsert_wait
+        self.upsert_retries = upsert_retries
+        self.profile = profile if isinstance(profile, dict) else load_profile(profile)
+        self.sparse_encoder = BM25Encoder() if sparse else None
+        # Whether the collection has the sparse vector (checked on first use)
+        self._collection_has_sparse: bool | None = None
 
     def create_collection(self):
         """
-        This function creates a collection in Qdrant if it does not exist.
+        This function creates a collection in Qdrant if it does not exist, with
+        the HNSW, on-disk and quantization settings of the collection profile.
+        The payload indexes of the profile are ensured either way; the other
+        settings only apply when the collection is created.
         """
-        # Try to fetch the collection status
+        profile = self.profile
+        # Not get_collection's 404: over gRPC (QDRANT_PREFER_GRPC) a missing
+        # collection raises an RpcError instead, and in local mode a ValueError
         try:
-            self.qdrant_client.get_collection(self.collection_name)
+            exists = self.qdrant_client.collection_exists(self.collection_name)
+        except UnexpectedResponse as exc:
+            print(f"Error while checking collection: {exc}")
+            return
+
+        if exists:
             print(
                 f"Skipping creating collection; '{self.collection_name}' already exists."
             )
-        except UnexpectedResponse as exc:
-            # If collection does not exist, an error will be thrown, so we create the collection
-            if exc.status_code == 404:
+        else:
+            print(
+                f"Collection '{self.collection_name}' not found. "
+                f"Creating it now with the '{profile['name']}' profile..."
+            )
+
+            self.qdrant_client.create_collection(
+                collection_name=self.collection_name,
+                vectors_config=models.VectorParams(
+                    size=int(os.getenv("EMBEDDING_DIMENSION")),
+                    distance=models.Distance.COSINE,
+                    on_disk=profile["on_disk"],
+                ),
+                hnsw_config=models.HnswConfigDiff(
+                    m=profile["hnsw_m"],
+                    ef_construct=profile["hnsw_ef_construct"],
+                    on_disk=profile["on_disk"],
+                ),
+                optimizers_config=models.OptimizersConfigDiff(
+                    indexing_threshold=profile["indexing_threshold"],
+                ),
+                quantization_config=quantization_config(profile["quantization"]),
+                sparse_vectors_config=(
+                    {
+                        SPARSE_VECTOR_NAME: models.SparseVectorParams(
+                            modifier=models.Modifier.IDF
+                        )
+                    }
+                    if self.sparse_encoder
+                    else None
+                ),
+            )
+
+            print(f"Collection '{self.collection_name}' created successfully.")
+
+        self.ensure_payload_indexes()
+
+    def uses_sparse(self) -> bool:
+        """Whether chunks get a sparse vector (enabled, and the collection has one)."""
+        if self.sparse_encoder is None:
+            return False
+        if self._collection_has_sparse is None:
+            params = self.qdrant_client.get_collection(self.collection_name).config.params
+            self._collection_has_sparse = SPARSE_VECTOR_NAME in (params.sparse_vectors or {})
+            if not self._collection_has_sparse:
                 print(
-                    f"Collection '{self.collection_name}' not found. Creating it now..."
+                    f"Collection '{self.collection_name}' has no '{SPARSE_VECTOR_NAME}' sparse "
+                    "vector; ingesting dense vectors only. Recreate the collection "
+                    "(clear data) to enable hybrid search."
                 )
+        return self._collection_has_sparse
 
-                self.qdrant_client.create_collection(
-                    collection_name=self.collection_name,
-                    vectors_config=models.VectorParams(
-                        size=os.getenv("EMBEDDING_DIMENSION"),
-                        distance=models.Distance.COSINE,
-                    ),
-                )
+    def ensure_payload_indexes(self):
+        """Create the profile's payload indexes (a no-op for existing ones)."""
+        for field_name, field_schema in self.profile["payload_indexes"].items():
+            self.qdrant_client.create_payload_index(
+                collection_name=self.collection_name,
+                field_name=field_name,
+                field_schema=field_schema,
+            )
+
+    def begin_bulk_load(self):
+        """
+        Pause HNSW indexing for a bulk load (if the profile defers indexing), so
+        segments are indexed once at the end instead of rebuilt while growing.
+        Searches still work meanwhile, on unindexed segments by full scan.
+        """
+        if self.profile["defer_indexing"]:
+            self.qdrant_client.update_collection(
+                collection_name=self.collection_name,
+                optimizers_config=models.OptimizersConfigDiff(indexing_threshold=0),
+            )
+
+    def end_bulk_load(self):
+        """Resume HNSW indexing after `begin_bulk_load`."""
+        if self.profile["defer_indexing"]:
+            self.qdrant_client.update_collection(
+                collection_name=self.collection_name,
+                optimizers_config=models.OptimizersConfigDiff(
+                    indexing_threshold=self.profile["indexing_threshold"]
+                ),
+            )
 
-                print(f"Collection '{self.collection_name}' created successfully.")
-            else:
-                print(f"Error while checking collection: {exc}")
+    @staticmethod
+    def _vector_batches(embedded_data, batch_size: int):
+        """
+        Yield float32 matrices of up to `batch_size` rows, in chunk order across
+        files, copying only one batch at a time.
+        """
+        pending = []
+        pending_rows = 0
+        for file_entry in embedded_data:
+            embeddings = np.asarray(file_entry["embeddings"], dtype=np.float32)
+            while len(embeddings):
+                take = min(batch_size - pending_rows, len(embeddings))
+                pending.append(embeddings[:take])
+                pending_rows += take
+                embeddings = embeddings[take:]
+                if pending_rows == batch_size:
+                    yield np.concatenate(pending)
+                    pending, pending_rows = [], 0
+        if pending:
+            yield np.concatenate(pending)
 
-    def ingest_to_qdrant(self, collection_name, embedded_data, chunk_node_mapping):
+    def ingest_to_qdrant(
+        self,
+        collection_name,
+        embedded_data,
+        chunk_node_mapping,
+        batch_size: int = int(os.getenv("QDRANT_UPSERT_BATCH_SIZE", 256)),
+    ):
         """
         Ingest embeddings to Qdrant with chunk IDs that match Neo4j.
 
+        Vectors stay float32 matrices and are sent in column-oriented batches by
+        `upsert_parallel` worker threads, each batch converted to Python floats
+        only when it is sent, so a large ingest holds at most a few batches as
+        Python lists. Unless `upsert_wait` is set, batches are sent with
+        wait=False and one final waited upsert acts as a consistency barrier.
+        Failed batches are retried; re-sending a batch is idempotent because
+        point IDs are the chunk IDs.
+
         Args:
             collection_name: Name of the collection to ingest to.
             embedded_data: List of dictionaries containing file info, chunks, and embeddings.
                            Format: [{"source_file": "name", "chunks": [...], "embeddings": [...]}, ...]
+                           where embeddings is a float32 matrix (or a list of vectors)
             chunk_node_mapping: Dict mapping chunk UUIDs to chunk metadata (from orchestration)
+            batch_size: Points per upsert request.
         """
         # Convert chunk_node_mapping to a list in the same order as chunks
         chunk_ids = list(chunk_node_mapping.keys())
 
-        points = []
-        chunk_idx = 0  # Global counter across all files
-
+        payloads = []
         for file_entry in embedded_data:
             file_name = file_entry["source_file"]
-            chunks = file_entry["chunks"]
-            embeddings = file_entry["embeddings"]
-
-            for i, (chunk, vector) in enumerate(zip(chunks, embeddings)):
-                chunk_id = chunk_ids[chunk_idx]  # Use the same UUID from Neo4j
-
-                points.append(
-                    models.PointStruct(
-                        id=chunk_id,  # CHANGED: Use chunk UUID instead of random UUID
-                        vector=vector,
-                        payload={
-                            "id": chunk_id,  # NEW: Add id to payload for retriever
-                            "text": chunk,
-                            "source_file": file_name,
-                            "chunk_index": i,
-                        },
-                    )
+            for i, chunk in enumerate(file_entry["chunks"]):
+                chunk_id = chunk_ids[len(payloads)]  # Use the same UUID from Neo4j
+                payloads.append(
+                    {
+                        "id": chunk_id,  # Add id to payload for retriever
+                        "text": chunk,
+                        "source_file": file_name,
+                        "chunk_index": i,
+                    }
                 )
-                chunk_idx += 1
 
-        if not points:
+        if not payloads:
             print("No points to ingest into Qdrant.")
             return
 
-        print(f"DEBUG: Ingesting {len(points)} points to Qdrant")
-        try:
-            self.qdrant_client.upsert(collection_name=collection_name, points=points)
-        except UnexpectedResponse as e:
-            print(f"DEBUG: Qdrant Upsert Failed. Response: {e.content}")
-            raise
+        ids = [payload["id"] for payload in payloads]
+
+        # Resolved once here rather than racing in the upload threads
+        self.uses_sparse()
+        batches = (
+            (ids[start : start + len(vectors)], vectors, payloads[start : start + len(vectors)])
+            for start, vectors in self._offsets(self._vector_batches(embedded_data, batch_size))
+        )
+
+        # At most two batches per worker are queued, so the converted vectors
+        # held in memory stay bounded however many points are ingested
+        with ThreadPoolExecutor(max_workers=self.upsert_parallel) as executor:
+            inflight = set()
+            last_batch = None
+            try:
+                for last_batch in batches:
+                    if len(inflight) >= 2 * self.upsert_parallel:
+                        done, inflight = wait(inflight, return_when=FIRST_COMPLETED)
+                        for future in done:
+                            future.result()
+                    inflight.add(
+                        executor.submit(
+                            self._upsert_batch,
+                            collection_name,
+                            *last_batch,
+                            self.upsert_wait,
+                        )
+                    )
+                for future in inflight:
+                    future.result()
+            except BaseException:
+                for future in inflight:
+                    future.cancel()
+                raise
+
+        if not self.upsert_wait:
+            # Consistency barrier: updates are applied in order, so once a
+            # (idempotent) re-upsert of the last point is applied, every batch is
+            batch_ids, vectors, batch_payloads = last_batch
+            self._upsert_batch(
+                collection_name, batch_ids[-1:], vectors[-1:], batch_payloads[-1:], True
+            )
+
+    @staticmethod
+    def _offsets(vector_batches):
+        start = 0
+        for vectors in vector_batches:
+            yield start, vectors
+            start += len(vectors)
+
+    def _upsert_batch(self, collection_name, ids, vectors, payloads, wait_for_result: bool):
+        """Upsert one batch, retrying failures with jittered exponential backoff."""
+        attempt = 0
+        while True:
+            try:
+                batch_vectors = vectors.tolist()
+                if self.uses_sparse():
+                    batch_vectors = {
+                        "": batch_vectors,
+                        SPARSE_VECTOR_NAME: [
+                            self.sparse_encoder.encode_document(payload["text"])
+                            for payload in payloads
+                        ],
+                    }
+                self.qdrant_client.upsert(
+                    collection_name=collection_name,
+                    points=models.Batch(ids=ids, vectors=batch_vectors, payloads=payloads),
+                    wait=wait_for_result,
+                )
+                return
+            except Exception as e:
+                if not is_retryable(e) or attempt >= self.upsert_retries:
+                    # The error (with Qdrant's response) reaches the ingestion job
+                    raise
+            delay = min(30.0, 2**attempt) * (0.5 + random.random() / 2)
+            attempt += 1
+            print(f"Qdrant upsert failed, retry {attempt}/{self.upsert_retries} in {delay:.1f}s")
+            time.sleep(delay)
+
+    def delete_points(self, collection_name, point_ids, batch_size: int = 1000):
+        """
+        Delete points by ID (used to retract chunks of modified or deleted files).
+
+        Args:
+            collection_name: Name of the collection to delete from.
+            point_ids: Chunk UUIDs to delete.
+            batch_size: Number of IDs sent per delete request.
+        """
+        point_ids = list(point_ids)
+        for start in range(0, len(point_ids), batch_size):
+            self.qdrant_client.delete(
+                collection_name=collection_name,
+                points_selector=models.PointIdsList(
+                    points=point_ids[start : start + batch_size]
+                ),
+            )
 
 
 if __name__ == "__main__":
@@ -0,0 +1,134 @@
+"""
+Recall/latency report for the Qdrant collection profiles.
+For each profile, a scratch collection is built from the same synthetic
+vectors (clustered, like real embeddings) and queried; recall@k is measured
+against exact (brute-force) search on the same collection, and latency is the
+wall time of each query. Run it against a real Qdrant server, since the
+in-process client ignores HNSW settings:
+
+    python -m services.rag_api.src.storage.qdrant_profile_report --points 50000
+"""
+
+import argparse
+import json
+import os
+import time
+import uuid
+
+import numpy as np
+from dotenv import load_dotenv
+from qdrant_client import QdrantClient, models
+
+from services.rag_api.src.storage.qdrant_profiles import PROFILES, load_profile, search_params
+from services.rag_api.src.storage.qdrant_client import QdrantOrchestrator
+
+load_dotenv()
+
+
+def synthetic_vectors(count: int, dimension: int, clusters: int, seed: int) -> np.ndarray:
+    """Unit vectors scattered around `clusters` random centroids (the same for every seed)."""
+    centroids = np.random.default_rng(0).standard_normal((clusters, dimension), dtype=np.float32)
+    rng = np.random.default_rng(seed)
+    vectors = centroids[rng.integers(0, clusters, count)]
+    vectors += 0.5 * rng.standard_normal((count, dimension), dtype=np.float32)
+    vectors /= np.linalg.norm(vectors, axis=1, keepdims=True)
+    return vectors
+
+
+def wait_until_indexed(client: QdrantClient, collection_name: str, timeout: float = 600):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        info = client.get_collection(collection_name)
+        if info.status == models.CollectionStatus.GREEN:
+            return
+        time.sleep(0.5)
+
+
+def profile_report(
+    client: QdrantClient,
+    profile_name: str,
+    vectors: np.ndarray,
+    queries: np.ndarray,
+    top_k: int,
+) -> dict:
+    collection_name = f"profile_report_{profile_name}_{uuid.uuid4().hex[:8]}"
+    profile = load_profile(profile_name)
+    orchestrator = QdrantOrchestrator(
+        qdrant_url="", collection_name=collection_name, client=client, profile=profile
+    )
+    os.environ["EMBEDDING_DIMENSION"] = str(vectors.shape[1])
+
+    try:
+        started = time.perf_counter()
+        orchestrator.create_collection()
+        orchestrator.begin_bulk_load()
+        chunk_ids = [str(uuid.uuid4()) for _ in range(len(vectors))]
+        orchestrator.ingest_to_qdrant(
+            collection_name,
+            [{"source_file": "synthetic", "chunks": [""] * len(vectors), "embeddings": vectors}],
+            dict.fromkeys(chunk_ids, {}),
+        )
+        orchestrator.end_bulk_load()
+        wait_until_indexed(client, collection_name)
+        build_seconds = time.perf_counter() - started
+
+        params = search_params(profile)
+        exact = models.SearchParams(exact=True)
+        latencies = []
+        recalls = []
+        for query in queries.tolist():
+            truth = client.query_points(
+                collection_name, query=query, limit=top_k, search_params=exact
+            ).points
+            started = time.perf_counter()
+            found = client.query_points(
+                collection_name, query=query, limit=top_k, search_params=params
+            ).points
+            latencies.append((time.perf_counter() - started) * 1000)
+            truth_ids = {point.id for point in truth}
+            recalls.append(len(truth_ids & {point.id for point in found}) / max(1, len(truth_ids)))
+    finally:
+        client.delete_collection(collection_name)
+
+    return {
+        "profile": profile_name,
+        f"recall@{top_k}": round(float(np.mean(recalls)), 4),
+        "p50_ms": round(float(np.percentile(latencies, 50)), 2),
+        "p95_ms": round(float(np.percentile(latencies, 95)), 2),
+        "build_s": round(build_seconds, 1),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[1])
+    parser.add_argument("--points", type=int, default=20000)
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--dimension", type=int, default=int(os.getenv("EMBEDDING_DIMENSION", 768)))
+    parser.add_argument("--top-k", type=int, default=5)
+    parser.add_argument("--profiles", nargs="*", default=list(PROFILES))
+    parser.add_argument("--json", action="store_true", help="Print the report as JSON")
+    args = parser.parse_args()
+
+    client = QdrantClient(
+        url=f"{os.getenv('QDRANT_URL', 'http://localhost')}:{os.getenv('QDRANT_HTTP_PORT', '6333')}",
+        api_key=os.getenv("QDRANT_API_KEY"),
+        timeout=int(os.getenv("QDRANT_TIMEOUT", 30)),
+    )
+    vectors = synthetic_vectors(args.points, args.dimension, clusters=64, seed=42)
+    queries = synthetic_vectors(args.queries, args.dimension, clusters=64, seed=1)
+
+    rows = [
+        profile_report(client, name, vectors, queries, args.top_k) for name in args.profiles
+    ]
+
+    if args.json:
+        print(json.dumps(rows, indent=2))
+        return
+    headers = list(rows[0])
+    print(" | ".join(f"{header:>12}" for header in headers))
+    for row in rows:
+        print(" | ".join(f"{row[header]!s:>12}" for header in headers))
+
+
+if __name__ == "__main__":
+    main()
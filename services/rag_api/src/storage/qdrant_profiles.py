@@ -0,0 +1,131 @@
+"""
+Qdrant collection profiles.
+A profile bundles the index-time settings of the collection (HNSW graph, on-disk
+storage, quantization, payload indexes, indexing deferral during bulk loads)
+with the matching search-time settings, so a deployment trades recall for
+latency and memory by picking one name (QDRANT_PROFILE). Individual settings
+can still be overridden with QDRANT_* variables.
+"""
+
+import os
+
+from dotenv import load_dotenv
+from qdrant_client import models
+
+load_dotenv()
+
+# Fields the retrieval and retraction paths filter on
+DEFAULT_PAYLOAD_INDEXES = {
+    "id": "keyword",
+    "source_file": "keyword",
+}
+
+PROFILES = {
+    # Qdrant defaults for the graph, a little extra search-time ef
+    "balanced": {
+        "hnsw_m": 16,
+        "hnsw_ef_construct": 100,
+        "search_ef": 128,
+        "on_disk": False,
+        "quantization": None,
+    },
+    # Denser graph and wider search: best recall, slower build and queries
+    "high_recall": {
+        "hnsw_m": 32,
+        "hnsw_ef_construct": 256,
+        "search_ef": 256,
+        "on_disk": False,
+        "quantization": None,
+    },
+    # int8 vectors in RAM with rescoring and a narrow search
+    "low_latency": {
+        "hnsw_m": 16,
+        "hnsw_ef_construct": 128,
+        "search_ef": 64,
+        "on_disk": False,
+        "quantization": "scalar",
+    },
+    # Original vectors and graph on disk, only int8 vectors in RAM
+    "low_memory": {
+        "hnsw_m": 16,
+        "hnsw_ef_construct": 100,
+        "search_ef": 128,
+        "on_disk": True,
+        "quantization": "scalar",
+    },
+}
+
+# Shared by every profile unless overridden
+PROFILE_DEFAULTS = {
+    "payload_indexes": DEFAULT_PAYLOAD_INDEXES,
+    # Build the HNSW index once after a bulk load instead of during it
+    "defer_indexing": True,
+    # Qdrant's default: segments above this size (KB) get an HNSW index
+    "indexing_threshold": 10000,
+    # Candidates fetched from the quantized index per result before rescoring
+    "oversampling": 2.0,
+}
+
+_ENV_OVERRIDES = {
+    "hnsw_m": ("QDRANT_HNSW_M", int),
+    "hnsw_ef_construct": ("QDRANT_HNSW_EF_CONSTRUCT", int),
+    "search_ef": ("QDRANT_SEARCH_EF", int),
+    "on_disk": ("QDRANT_ON_DISK", lambda value: value.lower() == "true"),
+    "quantization": ("QDRANT_QUANTIZATION", lambda value: value or None),
+    "defer_indexing": ("QDRANT_DEFER_INDEXING", lambda value: value.lower() == "true"),
+    "indexing_threshold": ("QDRANT_INDEXING_THRESHOLD", int),
+}
+
+
+def load_profile(name: str | None = None) -> dict:
+    """
+    Resolve a collection profile with the QDRANT_* overrides applied.
+
+    Args:
+        name: Profile name (defaults to QDRANT_PROFILE, then "balanced").
+
+    Returns:
+        The profile settings, including its "name".
+    """
+    name = name or os.getenv("QDRANT_PROFILE") or "balanced"
+    if name not in PROFILES:
+        raise ValueError(
+            f"Unknown Qdrant profile '{name}'. Available: {', '.join(PROFILES)}"
+        )
+
+    profile = {"name": name, **PROFILE_DEFAULTS, **PROFILES[name]}
+    for key, (variable, parse) in _ENV_OVERRIDES.items():
+        value = os.getenv(variable)
+        if value is not None:
+            profile[key] = parse(value)
+    return profile
+
+
+def quantization_config(quantization: str | None):
+    """
+    Map a quantization setting to a Qdrant quantization config.
+    "scalar" / "int8" store an int8 copy of every vector in RAM (4x smaller
+    than float32) and rescore the top candidates with the original vectors;
+    None, "" or "none" disables quantization.
+    """
+    if not quantization or quantization.lower() == "none":
+        return None
+    if quantization.lower() in ("scalar", "int8"):
+        return models.ScalarQuantization(
+            scalar=models.ScalarQuantizationConfig(
+                type=models.ScalarType.INT8,
+                quantile=0.99,
+                always_ram=True,
+            )
+        )
+    raise ValueError(f"Unsupported Qdrant quantization: {quantization}")
+
+
+def search_params(profile: dict) -> models.SearchParams:
+    """Search-time settings matching the profile's index."""
+    quantization = None
+    if quantization_config(profile["quantization"]) is not None:
+        quantization = models.QuantizationSearchParams(
+            rescore=True, oversampling=profile["oversampling"]
+        )
+    return models.SearchParams(hnsw_ef=profile["search_ef"], quantization=quantization)
@@ -0,0 +1,87 @@
+"""
+BM25 sparse vectors for lexical retrieval in Qdrant.
+Chunks are stored with a sparse vector of BM25 term-frequency weights and the
+collection applies the IDF modifier, so Qdrant scores sparse queries as BM25
+over the whole collection without us keeping global term statistics.
+Tokens are not stemmed, so identifiers, product codes and rare names match
+exactly; hyphenated/dotted terms are indexed both whole and split.
+"""
+
+import re
+import zlib
+from collections import Counter
+
+from qdrant_client import models
+
+# Name of the sparse vector in the Qdrant collection
+SPARSE_VECTOR_NAME = "bm25"
+
+_TERM = re.compile(r"\w+(?:[-./:]\w+)*")
+_PART = re.compile(r"\w+")
+
+STOPWORDS = frozenset(
+    """
+    a an and are as at be but by for from has have how i if in into is it its
+    of on or that the their there these this to was were what when where which
+    who why will with you your
+    """.split()
+)
+
+
+class BM25Encoder:
+    """
+    This class is responsible for turning text into BM25 sparse vectors.
+    """
+
+    def __init__(self, k1: float = 1.2, b: float = 0.75, avg_doc_length: float = 256):
+        """
+        Args:
+            k1: Term frequency saturation.
+            b: Document length normalization.
+            avg_doc_length: Assumed average chunk length in tokens; the exact corpus
+                            average is not needed for good ranking.
+        """
+        self.k1 = k1
+        self.b = b
+        self.avg_doc_length = avg_doc_length
+
+    @staticmethod
+    def tokenize(text: str) -> list[str]:
+        """
+        Lowercased terms without stopwords. "SKU-1234" yields "sku-1234", "sku"
+        and "1234", so both the code and its parts match.
+        """
+        tokens = []
+        for match in _TERM.finditer(text.casefold()):
+            term = match.group()
+            parts = _PART.findall(term)
+            if len(parts) > 1:
+                tokens.append(term)
+            tokens.extend(part for part in parts if part not in STOPWORDS)
+        return tokens
+
+    @staticmethod
+    def term_index(term: str) -> int:
+        # Stable across processes (unlike hash()), within Qdrant's uint32 range
+        return zlib.crc32(term.encode("utf-8"))
+
+    def _sparse(self, weights: dict[int, float]) -> models.SparseVector:
+        indices = sorted(weights)
+        return models.SparseVector(indices=indices, values=[weights[i] for i in indices])
+
+    def encode_document(self, text: str) -> models.SparseVector:
+        """BM25 term-frequency weights of a chunk (IDF is applied by Qdrant)."""
+        tokens = self.tokenize(text)
+        length_norm = self.k1 * (1 - self.b + self.b * len(tokens) / self.avg_doc_length)
+        weights: dict[int, float] = {}
+        for term, count in Counter(tokens).items():
+            index = self.term_index(term)
+            # Hash collisions simply add up
+            weights[index] = weights.get(index, 0.0) + count * (self.k1 + 1) / (
+                count + length_norm
+            )
+        return self._sparse(weights)
+
+    def encode_query(self, text: str) -> models.SparseVector:
+        """Each distinct query term weighs 1, so the score is the BM25 sum."""
+        return self._sparse({self.term_index(term): 1.0 for term in set(self.tokenize(text))})
@@ -3,10 +3,11 @@ Flask web UI for the Graph RAG system.
 Acts as a thin frontend that calls the RAG API over HTTP.
 """
 
+import json
 import os
 
 import requests
-from flask import Flask, render_template, request, jsonify
+from flask import Flask, Response, render_template, request, jsonify, stream_with_context
 from dotenv import load_dotenv
 
 
@@ -53,6 +54,44 @@ def chat():
         return jsonify({"error": str(e)}), 502
 
 
+@app.route("/api/chat/stream", methods=["POST"])
+def chat_stream():
+    """Proxy the RAG API's server-sent event chat stream, chunk by chunk, without buffering."""
+    data = request.get_json() or {}
+    user_message = data.get("message", "").strip()
+
+    if not user_message:
+        return jsonify({"error": "Message cannot be empty"}), 400
+
+    try:
+        resp = requests.post(
+            f"{RAG_API_URL}/api/v1/chat/stream",
+            json={"message": user_message},
+            stream=True,
+            # (connect, read) timeouts; the read timeout applies between chunks
+            timeout=(10, 60),
+        )
+        resp.raise_for_status()
+    except requests.RequestException as e:
+        return jsonify({"error": str(e)}), 502
+
+    def relay():
+        try:
+            # chunk_size=None yields data as soon as it arrives
+            for chunk in resp.iter_content(chunk_size=None):
+                yield chunk
+        except requests.RequestException as e:
+            yield f"event: error\ndata: {json.dumps({'detail': str(e)})}\n\n".encode()
+        finally:
+            resp.close()
+
+    return Response(
+        stream_with_context(relay()),
+        mimetype="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+
 @app.route("/health")
 def health():
     """Health check endpoint."""
@@ -20,10 +20,9 @@ admin_bp = Blueprint('admin', __name__)
 def get_qdrant_stats():
     """Get statistics from Qdrant."""
     try:
-        from qdrant_client import QdrantClient
+        from services.rag_api.src.storage.clients import clients
         
-        qdrant_url = f"{os.getenv('QDRANT_URL')}:{os.getenv('QDRANT_HTTP_PORT', '6333')}"
-        client = QdrantClient(url=qdrant_url)
+        client = clients.qdrant_client
         
         collection_name = "QdrantRagCollection"
         try:
@@ -53,12 +52,9 @@ def get_qdrant_stats():
 def get_neo4j_stats():
     """Get statistics from Neo4j."""
     try:
-        from neo4j import GraphDatabase
+        from services.rag_api.src.storage.clients import clients
         
-        neo4j_url = f"{os.getenv('NEO4J_URL')}:{os.getenv('NEO4J_BOLT_PORT')}"
-        neo4j_auth = tuple(os.getenv("NEO4J_AUTH").split("/"))
-        
-        driver = GraphDatabase.driver(neo4j_url, auth=neo4j_auth)
+        driver = clients.neo4j_driver
         
         with driver.session() as session:
             # Count nodes
@@ -69,8 +65,6 @@ def get_neo4j_stats():
             rel_count = session.run("MATCH ()-[r]->() RETURN count(r) as count").single()["count"]
             mentions_count = session.run("MATCH ()-[r:MENTIONS]->() RETURN count(r) as count").single()["count"]
         
-        driver.close()
-        
         return {
             "status": "connected",
             "entity_nodes": entity_count,
@@ -139,14 +133,13 @@ def get_stats():
 @admin_bp.route('/api/clear-data', methods=['POST'])
 def clear_data():
     """Clear all data from databases."""
-    results = {"qdrant": None, "neo4j": None}
+    results = {"qdrant": None, "neo4j": None, "caches": None}
     
     # Clear Qdrant
     try:
-        from qdrant_client import QdrantClient
+        from services.rag_api.src.storage.clients import clients
         
-        qdrant_url = f"{os.getenv('QDRANT_URL')}:{os.getenv('QDRANT_HTTP_PORT', '6333')}"
-        client = QdrantClient(url=qdrant_url)
+        client = clients.qdrant_client
         
         collection_name = "QdrantRagCollection"
         try:
@@ -159,20 +152,33 @@ def clear_data():
     
     # Clear Neo4j
     try:
-        from neo4j import GraphDatabase
-        
-        neo4j_url = f"{os.getenv('NEO4J_URL')}:{os.getenv('NEO4J_BOLT_PORT')}"
-        neo4j_auth = tuple(os.getenv("NEO4J_AUTH").split("/"))
+        from services.rag_api.src.storage.clients import clients
         
-        driver = GraphDatabase.driver(neo4j_url, auth=neo4j_auth)
-        
-        with driver.session() as session:
+        with clients.neo4j_driver.session() as session:
             session.run("MATCH (n) DETACH DELETE n")
         
-        driver.close()
         results["neo4j"] = {"success": True, "message": "All nodes and relationships deleted"}
     except Exception as e:
         results["neo4j"] = {"success": False, "error": str(e)}
     
+    # Forget what was ingested so the next run re-processes every file
+    manifest_path = os.getenv(
+        "INGEST_MANIFEST_PATH",
+        os.path.join(os.getenv("RAW_DATA_FOLDER", "./raw_data"), ".ingest_manifest.json"),
+    )
+    if os.path.exists(manifest_path):
+        os.remove(manifest_path)
+    
+    # The API process still holds answers and entity names from the wiped data
+    try:
+        import requests
+        
+        rag_api_url = os.getenv("RAG_API_URL", "http://rag-api:8000")
+        response = requests.post(f"{rag_api_url}/api/v1/caches/invalidate", timeout=10)
+        response.raise_for_status()
+        results["caches"] = {"success": True, "message": "Answer cache and entity index invalidated"}
+    except Exception as e:
+        results["caches"] = {"success": False, "error": str(e)}
+    
     return jsonify(results)
 
@@ -1,6 +1,6 @@
 """
 File upload routes for the Graph RAG web UI.
-Currently handles local file management only; ingestion is triggered elsewhere.
+Handles local file management and submits (and polls) RAG API ingestion jobs.
 """
 
 import os
@@ -98,37 +98,89 @@ def delete_file(filename):
         return jsonify({'error': str(e)}), 500
 
 
+def _ingest_job_payload(data):
+    """Flatten a RAG API ingestion job status for the upload page."""
+    payload = {
+        'job_id': data['job_id'],
+        'status': data['status'],
+        'stage': data['stage'],
+        'progress': data.get('progress', {}),
+        'error': data.get('error'),
+    }
+    result = data.get('result')
+    if result:
+        payload.update({
+            'files_processed': result['files_processed'],
+            'nodes_created': result['nodes_created'],
+            'relationships_created': result['relationships_created'],
+            'chunks_embedded': result['chunks_embedded'],
+            'extraction_cache_hits': result.get('extraction_cache_hits', 0),
+            'extraction_cache_misses': result.get('extraction_cache_misses', 0),
+            'files_failed': result.get('files_failed', 0)
+        })
+    return payload
+
+
+def _rag_api_error(response, action):
+    try:
+        error_detail = response.json().get('detail', 'Unknown error')
+    except ValueError:
+        error_detail = response.text or 'Unknown error'
+    return jsonify({'error': f'{action} failed: {error_detail}'}), response.status_code
+
+
 @upload_bp.route('/api/ingest', methods=['POST'])
 def trigger_ingestion():
-    """Trigger the ingestion pipeline for uploaded files via RAG API."""
+    """Submit an ingestion job to the RAG API; the page then polls its status."""
     try:
         import requests
         
-        # Call the RAG API's ingestion endpoint
         rag_api_url = os.getenv("RAG_API_URL", "http://rag-api:8000")
-        response = requests.post(f"{rag_api_url}/api/v1/ingest", timeout=300)  # 5 min timeout
+        response = requests.post(f"{rag_api_url}/api/v1/ingest", timeout=30)
         
-        if response.status_code == 200:
-            data = response.json()
-            return jsonify({
-                'success': True,
-                'files_processed': data['files_processed'],
-                'nodes_created': data['nodes_created'],
-                'relationships_created': data['relationships_created'],
-                'chunks_embedded': data['chunks_embedded']
-            })
-        else:
-            error_detail = response.json().get('detail', 'Unknown error')
-            return jsonify({
-                'error': f'Ingestion failed: {error_detail}'
-            }), response.status_code
+        if response.status_code in (200, 202):
+            return jsonify({'success': True, **_ingest_job_payload(response.json())})
+        return _rag_api_error(response, 'Ingestion')
             
-    except requests.exceptions.Timeout:
-        return jsonify({
-            'error': 'Ingestion timed out. The process may still be running in the background.'
-        }), 504
     except Exception as e:
         return jsonify({
             'error': f'Failed to trigger ingestion: {str(e)}'
         }), 500
 
+
+@upload_bp.route('/api/ingest/<job_id>', methods=['GET'])
+def ingestion_status(job_id):
+    """Report the status and progress of an ingestion job."""
+    try:
+        import requests
+        
+        rag_api_url = os.getenv("RAG_API_URL", "http://rag-api:8000")
+        response = requests.get(f"{rag_api_url}/api/v1/ingest/{job_id}", timeout=10)
+        
+        if response.status_code == 200:
+            return jsonify(_ingest_job_payload(response.json()))
+        return _rag_api_error(response, 'Status check')
+            
+    except Exception as e:
+        return jsonify({
+            'error': f'Failed to fetch ingestion status: {str(e)}'
+        }), 500
+
+
+@upload_bp.route('/api/ingest/<job_id>', methods=['DELETE'])
+def cancel_ingestion(job_id):
+    """Cancel an ingestion job."""
+    try:
+        import requests
+        
+        rag_api_url = os.getenv("RAG_API_URL", "http://rag-api:8000")
+        response = requests.delete(f"{rag_api_url}/api/v1/ingest/{job_id}", timeout=10)
+        
+        if response.status_code == 200:
+            return jsonify(_ingest_job_payload(response.json()))
+        return _rag_api_error(response, 'Cancellation')
+            
+    except Exception as e:
+        return jsonify({
+            'error': f'Failed to cancel ingestion: {str(e)}'
+        }), 500